@@ -1,13 +1,6 @@
-import pandas as pd
-import random
-import time
-from datetime import datetime, timedelta
-
-# Старт таймера
-start_time = time.perf_counter()
-
-# Генерация случайных данных
-num_rows = int(input("Введите кол-во строк в таблице: "))
+# Генерация расширенного тестового файла продаж: с типом клиента и отраслью (см. sales_generator.py).
+# Пример: python additional_test_data.py --rows 5000000 --output data_sales(pro).parquet
+from sales_generator import build_parser, run
 
 # Списки данных
 clients = [f"Клиент {i}" for i in range(22, 50)]
@@ -17,48 +10,13 @@ categories = ["Категория 4", "Категория 5", "Категори
 client_types = ["Физическое лицо", "Юр.лицо", "ИП", "Гос.предприятие"]
 industries = ["IT", "Медицина", "Лёгкая промышленность", "Тяжёлая промышленность", "Образование"]
 
-# 1. Создаем связи между сущностями
-client_regions = {client: random.choice(regions) for client in clients}
-product_categories = {product: random.choice(categories) for product in products}
-client_info = {
-    client: (random.choice(client_types), random.choice(industries))
-    for client in clients
-}
-
-# Генерация основных данных
-data = {
-    "Дата продажи": [datetime.now() - timedelta(days=random.randint(0, 365)) for _ in range(num_rows)],
-    "Клиент": [random.choice(clients) for _ in range(num_rows)],
-    "Продукт": [random.choice(products) for _ in range(num_rows)],
-    "Кол-во": [random.randint(1, 100) for _ in range(num_rows)],
-    "Сумма": [round(random.uniform(100, 10000), 2) for _ in range(num_rows)],
-}
-
-df = pd.DataFrame(data)
-
-df["Регион"] = df["Клиент"].map(client_regions)
-df["Категория"] = df["Продукт"].map(product_categories)
-df["Тип клиента"] = df["Клиент"].map(lambda x: client_info[x][0])
-df["Отрасль"] = df["Клиент"].map(lambda x: client_info[x][1])
-
-# Переупорядочиваем колонки
-df = df[["Дата продажи", "Клиент", "Регион", "Тип клиента", "Отрасль",
-         "Продукт", "Категория", "Кол-во", "Сумма"]]
-
-# Сохранение в Excel
-df.to_excel("data_sales(pro).xlsx", index=False)
-
-# Дополнительная проверка
-print("\n🔍 Пример данных:")
-for i in range(min(3, len(clients))):
-    client = clients[i]
-    print(f"Клиент '{client}': {client_regions[client]}, {client_info[client][0]}, {client_info[client][1]}")
-
-# Финиш таймера и вывод времени выполнения
-end_time = time.perf_counter()
-elapsed = end_time - start_time
+if __name__ == '__main__':
+    args = build_parser('Генерация расширенных тестовых продаж', 'data_sales(pro).xlsx').parse_args()
+    generator = run(args, {'clients': clients, 'regions': regions, 'products': products, 'categories': categories,
+                           'client_types': client_types, 'industries': industries})
 
-if elapsed < 60:
-    print(f"\n⏱️ Время генерации таблицы: {elapsed:.2f} секунд")
-else:
-    print(f"\n⏱️ Время генерации таблицы: {elapsed/60:.2f} минут")
\ No newline at end of file
+    # Дополнительная проверка
+    print("\n🔍 Пример данных:")
+    for i in range(min(3, len(generator.dimensions['clients']))):
+        info = generator.client_info(i)
+        print(f"Клиент '{generator.dimensions['clients'][i]}': {info['Регион']}, {info['Тип клиента']}, {info['Отрасль']}")
@@ -0,0 +1,217 @@
+# Генератор синтетических продаж для тестов и нагрузочных замеров.
+# Все столбцы порции строятся векторно (numpy.random.Generator), данные пишутся порциями,
+# поэтому память ограничена размером порции, а не числом строк.
+# Используется скриптами data_test.py и additional_test_data.py.
+import argparse
+import os
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+EXCEL_MAX_ROWS = 1_048_575  # Строк данных на листе Excel (без заголовка)
+# Атрибуты клиента: столбец → список значений в dimensions
+CLIENT_ATTRIBUTES = {'Регион': 'regions', 'Тип клиента': 'client_types', 'Отрасль': 'industries'}
+
+
+def make_names(names, count, prefix):
+    """
+    Список значений измерения: первые count из names, недостающие - '{prefix} N'
+    (номера, уже занятые в names, пропускаются).
+    """
+    if count is None:
+        return list(names)
+    result = list(names)[:count]
+    existing = set(result)
+    number = 1
+    while len(result) < count:
+        name = f"{prefix} {number}"
+        if name not in existing:
+            result.append(name)
+            existing.add(name)
+        number += 1
+    return result
+
+
+def _popularity(rng, size, skew):
+    """Веса популярности значений (закон Ципфа): несколько клиентов/продуктов дают большую часть продаж"""
+    weights = 1.0 / np.arange(1, size + 1) ** skew
+    return rng.permutation(weights / weights.sum())
+
+
+def _day_weights(days, trend, seasonality, weekly):
+    """
+    Интенсивность продаж по дням: рост trend за год, годовая сезонность с пиком в декабре
+    (амплитуда seasonality) и спад в выходные на долю weekly.
+    """
+    t = (days - days[0]).days.to_numpy()
+    weights = (1 + trend) ** (t / 365.25)
+    weights *= 1 + seasonality * np.cos(2 * np.pi * (days.dayofyear.to_numpy() - 350) / 365.25)
+    weights *= np.where(days.dayofweek.to_numpy() >= 5, 1 - weekly, 1.0)
+    weights = np.clip(weights, 1e-6, None)
+    return weights / weights.sum()
+
+
+class SalesGenerator:
+    """
+    Генератор порций продаж с фиксированными связями: клиент → регион (тип клиента, отрасль),
+    продукт → категория и цена. Связи и веса строятся один раз, порции - векторно.
+    """
+
+    def __init__(self, dimensions, seed=42, days=365, end=None, trend=0.15, seasonality=0.25, weekly=0.3,
+                 skew=0.8):
+        self.rng = np.random.default_rng(seed)
+        self.dimensions = dimensions
+
+        end = pd.Timestamp(end or date.today()).normalize()
+        self.days = pd.date_range(end=end, periods=days, freq='D')
+        self.day_weights = _day_weights(self.days, trend, seasonality, weekly)
+
+        clients, products = dimensions['clients'], dimensions['products']
+        self.client_weights = _popularity(self.rng, len(clients), skew)
+        self.product_weights = _popularity(self.rng, len(products), skew)
+
+        # Постоянные атрибуты клиентов и продуктов (индексы в списках измерений)
+        self.client_attributes = {
+            column: self.rng.integers(len(dimensions[key]), size=len(clients))
+            for column, key in CLIENT_ATTRIBUTES.items() if dimensions.get(key)
+        }
+        self.product_category = self.rng.integers(len(dimensions['categories']), size=len(products))
+        self.product_price = np.round(self.rng.lognormal(np.log(100), 0.6, size=len(products)), 2)
+
+    def client_info(self, client_index):
+        """Атрибуты клиента (регион, тип клиента, отрасль) - для проверки связей"""
+        return {column: self.dimensions[CLIENT_ATTRIBUTES[column]][codes[client_index]]
+                for column, codes in self.client_attributes.items()}
+
+    def chunk(self, size):
+        """Порция из size продаж (DataFrame со столбцами в порядке файла данных)"""
+        rng = self.rng
+        day = rng.choice(len(self.days), size=size, p=self.day_weights)
+        # Время продажи - в рабочие часы 9:00-21:00
+        seconds = rng.integers(9 * 3600, 21 * 3600, size=size)
+        client = rng.choice(len(self.client_weights), size=size, p=self.client_weights)
+        product = rng.choice(len(self.product_weights), size=size, p=self.product_weights)
+        quantity = np.minimum(rng.geometric(1 / 15, size=size), 100)
+        amount = np.round(quantity * self.product_price[product] * rng.lognormal(0, 0.1, size=size), 2)
+
+        frame = {
+            'Дата продажи': self.days.values[day] + seconds.astype('timedelta64[s]'),
+            'Клиент': pd.Categorical.from_codes(client, self.dimensions['clients']),
+        }
+        for column, codes in self.client_attributes.items():
+            frame[column] = pd.Categorical.from_codes(codes[client], self.dimensions[CLIENT_ATTRIBUTES[column]])
+        frame['Продукт'] = pd.Categorical.from_codes(product, self.dimensions['products'])
+        frame['Категория'] = pd.Categorical.from_codes(self.product_category[product], self.dimensions['categories'])
+        frame['Кол-во'] = quantity
+        frame['Сумма'] = amount
+        return pd.DataFrame(frame)
+
+    def chunks(self, rows, chunk_size):
+        """Порции общим объемом rows строк"""
+        for start in range(0, rows, chunk_size):
+            yield self.chunk(min(chunk_size, rows - start))
+
+
+def _write_parquet(chunks, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _write_csv(chunks, path):
+    for number, chunk in enumerate(chunks):
+        chunk.to_csv(path, mode='w' if number == 0 else 'a', header=number == 0, index=False)
+
+
+def _write_xlsx(chunks, path):
+    """Запись Excel в потоковом режиме openpyxl (write_only): строки не накапливаются в памяти"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    header_written = False
+    for chunk in chunks:
+        if not header_written:
+            sheet.append(list(chunk.columns))
+            header_written = True
+        for row in chunk.astype(object).itertuples(index=False, name=None):
+            sheet.append(row)
+    workbook.save(path)
+
+
+WRITERS = {
+    '.parquet': _write_parquet,
+    '.csv': _write_csv,
+    '.xlsx': _write_xlsx,
+}
+
+
+def generate_sales(path, rows, generator, chunk_size=500_000):
+    """Генерация rows продаж порциями и запись в path (формат по расширению: .parquet, .csv, .xlsx)"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in WRITERS:
+        raise ValueError(f"Неподдерживаемый формат: '{extension}'. Доступны: {list(WRITERS)}")
+    if extension == '.xlsx' and rows > EXCEL_MAX_ROWS:
+        raise ValueError(f"В Excel помещается не больше {EXCEL_MAX_ROWS:,} строк, используйте .parquet или .csv")
+
+    tmp_path = f"{path}.tmp{extension}"
+    try:
+        WRITERS[extension](generator.chunks(rows, chunk_size), tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def build_parser(description, default_output):
+    """Общие параметры командной строки генераторов"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--rows', type=int, default=1000, help='число строк (по умолчанию 1000)')
+    parser.add_argument('--output', default=default_output,
+                        help=f'файл результата: .xlsx, .parquet или .csv (по умолчанию {default_output})')
+    parser.add_argument('--seed', type=int, default=42, help='зерно генератора (одинаковое зерно - одинаковые данные)')
+    parser.add_argument('--chunk-size', type=int, default=500_000, help='строк в одной порции')
+    parser.add_argument('--days', type=int, default=365, help='период продаж в днях')
+    parser.add_argument('--end', help='последний день периода, ГГГГ-ММ-ДД (по умолчанию сегодня)')
+    parser.add_argument('--clients', type=int, help='число клиентов')
+    parser.add_argument('--regions', type=int, help='число регионов')
+    parser.add_argument('--products', type=int, help='число продуктов')
+    parser.add_argument('--categories', type=int, help='число категорий')
+    parser.add_argument('--trend', type=float, default=0.15, help='рост продаж за год, доля (0.15 = +15%%)')
+    parser.add_argument('--seasonality', type=float, default=0.25, help='амплитуда годовой сезонности, доля')
+    parser.add_argument('--weekly', type=float, default=0.3, help='спад продаж в выходные, доля')
+    return parser
+
+
+def run(args, dimensions):
+    """Генерация по параметрам командной строки; dimensions - списки значений измерений по умолчанию"""
+    start_time = time.perf_counter()
+
+    dimensions = dict(dimensions)
+    for key, prefix in (('clients', 'Клиент'), ('regions', 'Регион'), ('products', 'Продукт'),
+                        ('categories', 'Категория')):
+        dimensions[key] = make_names(dimensions[key], getattr(args, key), prefix)
+
+    generator = SalesGenerator(dimensions, seed=args.seed, days=args.days, end=args.end,
+                               trend=args.trend, seasonality=args.seasonality, weekly=args.weekly)
+    generate_sales(args.output, args.rows, generator, args.chunk_size)
+    print(f"✅ Сгенерировано строк: {args.rows:,} → {args.output}")
+
+    elapsed = time.perf_counter() - start_time
+    if elapsed < 60:
+        print(f"\n⏱️ Время генерации таблицы: {elapsed:.2f} секунд")
+    else:
+        print(f"\n⏱️ Время генерации таблицы: {elapsed/60:.2f} минут")
+    return generator
@@ -1,2 +1,2 @@
-from .read_and_clean import load_data, clean_data, prepare_for_prophet
+from .read_and_clean import load_data, clean_data, load_clean_data, prepare_for_prophet, prepare_series_by_group
 from .analyze import *
\ No newline at end of file
@@ -0,0 +1,121 @@
+import pandas as pd
+
+# Измерения, по которым строятся разрезы анализа
+CUBE_DIMENSIONS = ['Категория', 'Регион', 'Продукт', 'Тип клиента', 'Отрасль']
+# Временные признаки, добавляемые в clean_data
+CUBE_TIME_KEYS = ['Год', 'Месяц', 'День недели']
+# Разрезы, которые заранее считаются в кубе
+CUBE_ROLLUPS = ['Категория', 'Регион', 'Продукт', 'Тип клиента', 'Отрасль',
+                ('Год', 'Месяц'), 'Месяц', 'День недели']
+# Разрезы с числом уникальных клиентов: у клиента одно значение атрибута,
+# поэтому пар (значение, клиент) в базовой таблице не больше, чем клиентов
+CLIENT_ROLLUPS = ['Регион', 'Тип клиента', 'Отрасль']
+# Столбец базовой таблицы с именем разреза, к которому относится строка
+ROLLUP_COLUMN = 'rollup'
+
+
+def _rollup_keys(by):
+    return list(by) if isinstance(by, tuple) else [by]
+
+
+def _rollup_id(keys):
+    return '|'.join(keys)
+
+
+def _aggregate(df, keys):
+    """
+    Группировка исходных строк по набору ключей.
+    Пустые значения ключей сохраняются, чтобы разрезы по другим измерениям их учитывали.
+    """
+    aggregations = {'rows': (keys[0], 'size')}
+    if 'Сумма' in df.columns:
+        aggregations['revenue'] = ('Сумма', 'sum')
+        aggregations['revenue_count'] = ('Сумма', 'count')
+    if 'Кол-во' in df.columns:
+        aggregations['quantity'] = ('Кол-во', 'sum')
+
+    return df.groupby(keys, observed=True, dropna=False, sort=False).agg(**aggregations).reset_index()
+
+
+def _cube_base(df, rollups=CUBE_ROLLUPS):
+    """
+    Базовая таблица куба: для каждого разреза - своя небольшая группировка строк df,
+    результаты собраны в одну таблицу (столбец rollup - имя разреза, ключи других разрезов пустые).
+    Для CLIENT_ROLLUPS добавляются пары (значение, клиент) - из них считается число уникальных клиентов.
+    Размер таблицы - сумма числа групп разрезов и не растет с числом строк. Таблицы порций данных
+    объединяются суммой по совпадающим ключам. Возвращает None, если в df нет ни одного измерения.
+    """
+    key_sets = []
+    for by in rollups:
+        keys = _rollup_keys(by)
+        if all(key in df.columns for key in keys):
+            key_sets.append(keys)
+            if by in CLIENT_ROLLUPS and 'Клиент' in df.columns:
+                key_sets.append(keys + ['Клиент'])
+    if not key_sets:
+        return None
+
+    parts = []
+    for keys in key_sets:
+        part = _aggregate(df, keys)
+        # Целые ключи (год, месяц) - с поддержкой пропусков: в строках других разрезов они пустые
+        for key in keys:
+            if pd.api.types.is_integer_dtype(part[key]):
+                part[key] = part[key].astype('Int64')
+        part.insert(0, ROLLUP_COLUMN, _rollup_id(keys))
+        parts.append(part)
+    return pd.concat(parts, ignore_index=True)
+
+
+def _rollup(base, by):
+    """
+    Разрез из базовой таблицы.
+    Результат: revenue (сумма), quantity (кол-во), rows (число продаж),
+    avg_check (средний чек) и для CLIENT_ROLLUPS - clients (уникальные клиенты).
+    """
+    keys = _rollup_keys(by)
+    part = base[base[ROLLUP_COLUMN] == _rollup_id(keys)].dropna(subset=keys)
+    part = part.astype({key: 'int64' for key in keys if isinstance(part[key].dtype, pd.Int64Dtype)})
+
+    value_columns = [col for col in ('revenue', 'revenue_count', 'quantity', 'rows') if col in base.columns]
+    result = part.groupby(keys, observed=True)[value_columns].sum()
+
+    if 'revenue' in result.columns:
+        result['avg_check'] = result['revenue'] / result['revenue_count']
+
+    pairs = base[base[ROLLUP_COLUMN] == _rollup_id(keys + ['Клиент'])]
+    if len(pairs) > 0:
+        clients = pairs.dropna(subset=keys).groupby(keys, observed=True)['Клиент'].nunique()
+        result['clients'] = clients.reindex(result.index, fill_value=0).to_numpy()
+
+    return result
+
+
+def build_aggregate_cube(df, base=None):
+    """
+    Построение сводного куба: каждый разрез считается одной группировкой по своим ключам,
+    поэтому размер куба и стоимость графиков зависят от числа групп, а не строк.
+    base - готовая базовая таблица (например, из кэша): проход по строкам df пропускается.
+    """
+    computed = base is None
+    if computed:
+        base = _cube_base(df)
+        if base is None:
+            return {}
+    cube = {'base': base}
+
+    rollup_ids = set(base[ROLLUP_COLUMN].unique())
+    for by in CUBE_ROLLUPS:
+        if _rollup_id(_rollup_keys(by)) in rollup_ids:
+            cube[by] = _rollup(base, by)
+
+    if computed:
+        print(f"✅ Сводный куб построен: {len(df)} строк → {len(base)} групп")
+    return cube
+
+
+def get_rollup(df, by, cube=None):
+    """Разрез по измерению: из куба, если он передан, иначе - группировкой по df"""
+    if cube is not None and by in cube:
+        return cube[by]
+    return _rollup(_cube_base(df, [by]), by)
@@ -1,23 +1,142 @@
-import matplotlib.pyplot as plt
-import seaborn as sns
 import pandas as pd
 
+from aggregates import build_aggregate_cube, get_rollup
+from report import render_figure
+from profiling import stage
 
+
+@stage
 def setup_visuals():
     """Настройка стиля графиков"""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
     plt.style.use('default')
     sns.set_palette("husl")
     plt.rcParams['figure.figsize'] = (12, 8)
     plt.rcParams['font.size'] = 12
 
 
-def plot_revenue_by_category(df, top_n=10):
+# Функции рисования получают только небольшие агрегаты, поэтому их можно
+# выполнять в отдельных процессах (см. report.render_figure)
+def _draw_bar_chart(values, title, xlabel, ylabel, color=None, figsize=(14, 8), label_color=None):
+    """Рисование столбчатой диаграммы с подписями значений над столбцами"""
+    import matplotlib.pyplot as plt
+    plt.figure(figsize=figsize)
+
+    bars = plt.bar(range(len(values)), values.values, color=color)
+    plt.title(title, fontsize=16, fontweight='bold')
+    plt.xlabel(xlabel)
+    plt.ylabel(ylabel)
+    plt.xticks(range(len(values)), values.index, rotation=45, ha='right')
+
+    # Добавляем подписи значений на столбцах
+    text_style = {'color': label_color} if label_color else {}
+    for bar in bars:
+        height = bar.get_height()
+        plt.text(bar.get_x() + bar.get_width() / 2., height + height * 0.01,
+                 f'{height:,.0f}', ha='center', va='bottom', fontsize=10, **text_style)
+
+    plt.grid(axis='y', alpha=0.3)
+    plt.tight_layout()
+
+
+def _draw_monthly_revenue_trend(monthly_revenue):
+    """Рисование тренда выручки и помесячного изменения"""
+    import matplotlib.pyplot as plt
+    monthly_revenue = monthly_revenue.copy()
+    plt.figure(figsize=(15, 8))
+
+    # Основной график
+    plt.subplot(2, 1, 1)
+    plt.plot(monthly_revenue['Дата'], monthly_revenue['Сумма'], marker='o', linewidth=2,
+             color='green', markersize=6)
+    plt.title('Тренд выручки по месяцам', fontsize=16, fontweight='bold')
+    plt.xlabel('Дата')
+    plt.ylabel('Выручка, руб.')
+    plt.xticks(rotation=45)
+    plt.grid(True, alpha=0.3)
+
+    # Добавление значений на график
+    for i, (date, revenue) in enumerate(zip(monthly_revenue['Дата'], monthly_revenue['Сумма'])):
+        plt.annotate(f'{revenue:,.0f}',
+                     (date, revenue),
+                     textcoords="offset points",
+                     xytext=(0, 10),
+                     ha='center',
+                     fontsize=9,
+                     bbox=dict(boxstyle="round,pad=0.3", facecolor="yellow", alpha=0.7))
+
+    # График помесячного изменения
+    plt.subplot(2, 1, 2)
+    monthly_revenue['Изменение'] = monthly_revenue['Сумма'].pct_change() * 100
+    colors = ['red' if x < 0 else 'green' for x in monthly_revenue['Изменение']]
+
+    bars = plt.bar(monthly_revenue['Дата'], monthly_revenue['Изменение'], color=colors, alpha=0.7)
+    plt.title('Изменение выручки по месяцам (%)', fontsize=14, fontweight='bold')
+    plt.xlabel('Дата')
+    plt.ylabel('Изменение, %')
+    plt.xticks(rotation=45)
+    plt.grid(True, alpha=0.3)
+
+    # Добавление значений на bars
+    for bar, change in zip(bars, monthly_revenue['Изменение']):
+        if not pd.isna(change):
+            height = bar.get_height()
+            va = 'bottom' if height >= 0 else 'top'
+            color = 'green' if height >= 0 else 'red'
+            plt.text(bar.get_x() + bar.get_width() / 2., height,
+                     f'{change:+.1f}%', ha='center', va=va, fontsize=9, color=color,
+                     bbox=dict(boxstyle="round,pad=0.2", facecolor="white", alpha=0.8))
+
+    plt.tight_layout()
+
+
+def _draw_client_type_share(client_revenue):
+    """Рисование круговой диаграммы долей выручки по типам клиентов"""
+    import matplotlib.pyplot as plt
+    plt.figure(figsize=(10, 8))
+    colors = ['gold', 'lightcoral', 'lightskyblue', 'lightgreen', 'plum']
+    wedges, texts, autotexts = plt.pie(client_revenue.values, labels=client_revenue.index, autopct='%1.1f%%',
+                                       colors=colors[:len(client_revenue)], startangle=90)
+    plt.title('Доля выручки по типам клиентов', fontsize=16, fontweight='bold')
+    plt.axis('equal')
+    plt.tight_layout()
+
+
+def _draw_monthly_sales(monthly_sales):
+    """Рисование динамики продаж по месяцам"""
+    import matplotlib.pyplot as plt
+    plt.figure(figsize=(15, 6))
+    plt.plot(monthly_sales['Месяц_год'], monthly_sales['Сумма'], marker='o', linewidth=2, color='blue')
+    plt.title('Динамика продаж по месяцам', fontsize=16, fontweight='bold')
+    plt.xlabel('Месяц-Год')
+    plt.ylabel('Выручка, руб.')
+    plt.xticks(rotation=45)
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+
+
+def _draw_weekday_sales(weekday_sales, days):
+    """Рисование продаж по дням недели"""
+    import matplotlib.pyplot as plt
+    plt.figure(figsize=(10, 6))
+    plt.bar(range(len(weekday_sales)), weekday_sales.values, color='red')
+    plt.title('Продажи по дням недели', fontsize=16, fontweight='bold')
+    plt.xlabel('День недели')
+    plt.ylabel('Выручка, руб.')
+    plt.xticks(range(len(weekday_sales)), days[:len(weekday_sales)])
+    plt.grid(axis='y', alpha=0.3)
+    plt.tight_layout()
+
+
+@stage
+def plot_revenue_by_category(df, top_n=10, cube=None):
     """Выручка по категориям - какие направления приносят больше прибыли"""
     if 'Категория' not in df.columns or 'Сумма' not in df.columns:
         print("❌ Отсутствуют необходимые столбцы для анализа выручки по категориям")
         return
 
-    category_revenue = df.groupby('Категория')['Сумма'].sum().sort_values(ascending=False)
+    category_revenue = get_rollup(df, 'Категория', cube)['revenue'].sort_values(ascending=False)
 
     if len(category_revenue) > top_n:
         top_categories = category_revenue.head(top_n)
@@ -26,23 +145,8 @@ def plot_revenue_by_category(df, top_n=10):
     else:
         top_categories = category_revenue
 
-    plt.figure(figsize=(14, 8))
-
-    bars = plt.bar(range(len(top_categories)), top_categories.values)
-    plt.title('Выручка по категориям товаров', fontsize=16, fontweight='bold')
-    plt.xlabel('Категория')
-    plt.ylabel('Выручка, руб.')
-    plt.xticks(range(len(top_categories)), top_categories.index, rotation=45, ha='right')
-
-    # Добавляем подписи значений на столбцах
-    for bar in bars:
-        height = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width() / 2., height + height * 0.01,
-                 f'{height:,.0f}', ha='center', va='bottom', fontsize=10)
-
-    plt.grid(axis='y', alpha=0.3)
-    plt.tight_layout()
-    plt.show()
+    render_figure('revenue_by_category', _draw_bar_chart, top_categories,
+                  'Выручка по категориям товаров', 'Категория', 'Выручка, руб.')
 
     # Выводим статистику
     print("📊 Выручка по категориям:")
@@ -50,13 +154,14 @@ def plot_revenue_by_category(df, top_n=10):
         print(f"{i}. {category}: {revenue:,.0f} руб.")
 
 
-def plot_quantity_by_category(df, top_n=10):
+@stage
+def plot_quantity_by_category(df, top_n=10, cube=None):
     """Количество продаж по категориям - сколько заказов было в каждой группе"""
     if 'Категория' not in df.columns or 'Кол-во' not in df.columns:
         print("❌ Отсутствуют необходимые столбцы для анализа количества по категориям")
         return
 
-    category_quantity = df.groupby('Категория')['Кол-во'].sum().sort_values(ascending=False)
+    category_quantity = get_rollup(df, 'Категория', cube)['quantity'].sort_values(ascending=False)
 
     if len(category_quantity) > top_n:
         top_categories = category_quantity.head(top_n)
@@ -65,101 +170,59 @@ def plot_quantity_by_category(df, top_n=10):
     else:
         top_categories = category_quantity
 
-    plt.figure(figsize=(14, 8))
-
-    bars = plt.bar(range(len(top_categories)), top_categories.values, color='lightgreen')
-    plt.title('Количество продаж по категориям', fontsize=16, fontweight='bold')
-    plt.xlabel('Категория')
-    plt.ylabel('Количество, шт.')
-    plt.xticks(range(len(top_categories)), top_categories.index, rotation=45, ha='right')
-
-    # Добавляем подписи значений
-    for bar in bars:
-        height = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width() / 2., height + height * 0.01,
-                 f'{height:,.0f}', ha='center', va='bottom', fontsize=10)
-
-    plt.grid(axis='y', alpha=0.3)
-    plt.tight_layout()
-    plt.show()
+    render_figure('quantity_by_category', _draw_bar_chart, top_categories,
+                  'Количество продаж по категориям', 'Категория', 'Количество, шт.', color='lightgreen')
 
     print("📦 Количество продаж по категориям:")
     for i, (category, quantity) in enumerate(top_categories.items(), 1):
         print(f"{i}. {category}: {quantity:,.0f} шт.")
 
 
-def plot_avg_check_by_region(df, top_n=15):
+@stage
+def plot_avg_check_by_region(df, top_n=15, cube=None):
     """Средний чек по регионам - насколько отличаются суммы покупок"""
     if 'Регион' not in df.columns or 'Сумма' not in df.columns:
         print("❌ Отсутствуют необходимые столбцы для анализа среднего чека по регионам")
         return
 
-    region_avg_check = df.groupby('Регион')['Сумма'].mean().sort_values(ascending=False)
+    region_avg_check = get_rollup(df, 'Регион', cube)['avg_check'].sort_values(ascending=False)
 
     if len(region_avg_check) > top_n:
         top_regions = region_avg_check.head(top_n)
     else:
         top_regions = region_avg_check
 
-    plt.figure(figsize=(14, 8))
-
-    bars = plt.bar(range(len(top_regions)), top_regions.values, color='orange')
-    plt.title('Средний чек по регионам', fontsize=16, fontweight='bold')
-    plt.xlabel('Регион')
-    plt.ylabel('Средний чек, руб.')
-    plt.xticks(range(len(top_regions)), top_regions.index, rotation=45, ha='right')
-
-    # Добавляем подписи значений
-    for bar in bars:
-        height = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width() / 2., height + height * 0.01,
-                 f'{height:,.0f}', ha='center', va='bottom', fontsize=10)
-
-    plt.grid(axis='y', alpha=0.3)
-    plt.tight_layout()
-    plt.show()
+    render_figure('avg_check_by_region', _draw_bar_chart, top_regions,
+                  'Средний чек по регионам', 'Регион', 'Средний чек, руб.', color='orange')
 
     print("💰 Средний чек по регионам:")
     for i, (region, avg_check) in enumerate(top_regions.items(), 1):
         print(f"{i}. {region}: {avg_check:,.0f} руб.")
 
 
-def plot_sales_frequency_by_product(df, top_n=15):
+@stage
+def plot_sales_frequency_by_product(df, top_n=15, cube=None):
     """Частота продаж по продуктам - что популярнее всего"""
     if 'Продукт' not in df.columns:
         print("❌ Отсутствует столбец 'Продукт' для анализа частоты продаж")
         return
 
-    product_frequency = df['Продукт'].value_counts().head(top_n)
-
-    plt.figure(figsize=(14, 8))
+    product_frequency = get_rollup(df, 'Продукт', cube)['rows'].sort_values(ascending=False).head(top_n)
 
-    bars = plt.bar(range(len(product_frequency)), product_frequency.values, color='purple')
-    plt.title('Частота продаж по продуктам (Топ-15)', fontsize=16, fontweight='bold')
-    plt.xlabel('Продукт')
-    plt.ylabel('Количество продаж')
-    plt.xticks(range(len(product_frequency)), product_frequency.index, rotation=45, ha='right')
-
-    # Добавляем подписи значений
-    for bar in bars:
-        height = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width() / 2., height + height * 0.01,
-                 f'{height:,.0f}', ha='center', va='bottom', fontsize=10)
-
-    plt.grid(axis='y', alpha=0.3)
-    plt.tight_layout()
-    plt.show()
+    render_figure('sales_frequency_by_product', _draw_bar_chart, product_frequency,
+                  'Частота продаж по продуктам (Топ-15)', 'Продукт', 'Количество продаж', color='purple')
 
     print("🏆 Самые популярные продукты:")
     for i, (product, count) in enumerate(product_frequency.items(), 1):
         print(f"{i}. {product}: {count} продаж")
 
 
-def plot_monthly_revenue_trend(df):
+@stage
+def plot_monthly_revenue_trend(df, cube=None):
     """Тренд выручки по месяцам с детальной статистикой"""
     if 'Дата продажи' in df.columns and 'Сумма' in df.columns:
         # Агрегация по месяцам
-        monthly_revenue = df.groupby(['Год', 'Месяц'])['Сумма'].sum().reset_index()
+        monthly_revenue = get_rollup(df, ('Год', 'Месяц'), cube)['revenue'].rename('Сумма').reset_index()
 
         # Создание даты для графика
         monthly_revenue['Дата'] = monthly_revenue.apply(
@@ -214,57 +277,12 @@ def plot_monthly_revenue_trend(df):
                 print(f"• Общий рост за период: {total_growth:+.1f}%")
 
         # 4. ГРАФИК
-        plt.figure(figsize=(15, 8))
-
-        # Основной график
-        plt.subplot(2, 1, 1)
-        plt.plot(monthly_revenue['Дата'], monthly_revenue['Сумма'], marker='o', linewidth=2,
-                 color='green', markersize=6)
-        plt.title('Тренд выручки по месяцам', fontsize=16, fontweight='bold')
-        plt.xlabel('Дата')
-        plt.ylabel('Выручка, руб.')
-        plt.xticks(rotation=45)
-        plt.grid(True, alpha=0.3)
-
-        # Добавление значений на график
-        for i, (date, revenue) in enumerate(zip(monthly_revenue['Дата'], monthly_revenue['Сумма'])):
-            plt.annotate(f'{revenue:,.0f}',
-                         (date, revenue),
-                         textcoords="offset points",
-                         xytext=(0, 10),
-                         ha='center',
-                         fontsize=9,
-                         bbox=dict(boxstyle="round,pad=0.3", facecolor="yellow", alpha=0.7))
-
-        # График помесячного изменения
-        plt.subplot(2, 1, 2)
-        monthly_revenue['Изменение'] = monthly_revenue['Сумма'].pct_change() * 100
-        colors = ['red' if x < 0 else 'green' for x in monthly_revenue['Изменение']]
-
-        bars = plt.bar(monthly_revenue['Дата'], monthly_revenue['Изменение'], color=colors, alpha=0.7)
-        plt.title('Изменение выручки по месяцам (%)', fontsize=14, fontweight='bold')
-        plt.xlabel('Дата')
-        plt.ylabel('Изменение, %')
-        plt.xticks(rotation=45)
-        plt.grid(True, alpha=0.3)
-
-        # Добавление значений на bars
-        for bar, change in zip(bars, monthly_revenue['Изменение']):
-            if not pd.isna(change):
-                height = bar.get_height()
-                va = 'bottom' if height >= 0 else 'top'
-                color = 'green' if height >= 0 else 'red'
-                plt.text(bar.get_x() + bar.get_width() / 2., height,
-                         f'{change:+.1f}%', ha='center', va=va, fontsize=9, color=color,
-                         bbox=dict(boxstyle="round,pad=0.2", facecolor="white", alpha=0.8))
-
-        plt.tight_layout()
-        plt.show()
+        render_figure('monthly_revenue_trend', _draw_monthly_revenue_trend, monthly_revenue)
 
         # 5. СЕЗОННОСТЬ
         print("\n🌡️ АНАЛИЗ СЕЗОННОСТИ:")
         # Средняя выручка по месяцам (игнорируя год)
-        monthly_avg = df.groupby('Месяц')['Сумма'].mean()
+        monthly_avg = get_rollup(df, 'Месяц', cube)['avg_check']
         months_ru = ['Янв', 'Фев', 'Мар', 'Апр', 'Май', 'Июн', 'Июл', 'Авг', 'Сен', 'Окт', 'Ноя', 'Дек']
 
         if len(monthly_avg) > 0:
@@ -277,59 +295,30 @@ def plot_monthly_revenue_trend(df):
             seasonality_ratio = monthly_avg.max() / monthly_avg.min() if monthly_avg.min() > 0 else 0
             print(f"• Коэффициент сезонности: {seasonality_ratio:.1f}x")
 
-def plot_client_type_analysis(df):
+@stage
+def plot_client_type_analysis(df, cube=None):
     """Анализ продаж по типу клиента"""
     print("\n" + "=" * 50)
     print("АНАЛИЗ ПО ТИПУ КЛИЕНТА")
     print("=" * 50)
 
-    # Выручка по типам клиентов
-    client_revenue = df.groupby('Тип клиента')['Сумма'].sum().sort_values(ascending=False)
+    client_rollup = get_rollup(df, 'Тип клиента', cube)
 
-    plt.figure(figsize=(12, 8))
-    bars = plt.bar(range(len(client_revenue)), client_revenue.values, color='teal')
-    plt.title('Выручка по типам клиентов', fontsize=16, fontweight='bold')
-    plt.xlabel('Тип клиента')
-    plt.ylabel('Выручка, руб.')
-    plt.xticks(range(len(client_revenue)), client_revenue.index, rotation=45, ha='right')
-
-    for bar in bars:
-        height = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width() / 2., height + height * 0.01,
-                 f'{height:,.0f}', ha='center', va='bottom', fontsize=10)
+    # Выручка по типам клиентов
+    client_revenue = client_rollup['revenue'].sort_values(ascending=False)
 
-    plt.grid(axis='y', alpha=0.3)
-    plt.tight_layout()
-    plt.show()
+    render_figure('client_type_revenue', _draw_bar_chart, client_revenue,
+                  'Выручка по типам клиентов', 'Тип клиента', 'Выручка, руб.', color='teal', figsize=(12, 8))
 
     # Количество сделок по типам клиентов
-    client_count = df['Тип клиента'].value_counts()
-
-    plt.figure(figsize=(12, 8))
-    bars = plt.bar(range(len(client_count)), client_count.values, color='orange')
-    plt.title('Количество сделок по типам клиентов', fontsize=16, fontweight='bold')
-    plt.xlabel('Тип клиента')
-    plt.ylabel('Количество сделок')
-    plt.xticks(range(len(client_count)), client_count.index, rotation=45, ha='right')
-
-    for bar in bars:
-        height = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width() / 2., height + height * 0.01,
-                 f'{height:,.0f}', ha='center', va='bottom', fontsize=10)
+    client_count = client_rollup['rows'].sort_values(ascending=False)
 
-    plt.grid(axis='y', alpha=0.3)
-    plt.tight_layout()
-    plt.show()
+    render_figure('client_type_deals', _draw_bar_chart, client_count,
+                  'Количество сделок по типам клиентов', 'Тип клиента', 'Количество сделок',
+                  color='orange', figsize=(12, 8))
 
     # Доля по типам клиентов (круговая диаграмма)
-    plt.figure(figsize=(10, 8))
-    colors = ['gold', 'lightcoral', 'lightskyblue', 'lightgreen', 'plum']
-    wedges, texts, autotexts = plt.pie(client_revenue.values, labels=client_revenue.index, autopct='%1.1f%%',
-                                       colors=colors[:len(client_revenue)], startangle=90)
-    plt.title('Доля выручки по типам клиентов', fontsize=16, fontweight='bold')
-    plt.axis('equal')
-    plt.tight_layout()
-    plt.show()
+    render_figure('client_type_share', _draw_client_type_share, client_revenue)
 
     # Статистика
     print("📊 Статистика по типам клиентов:")
@@ -342,71 +331,37 @@ def plot_client_type_analysis(df):
             f"{i}. {client_type}: {revenue:,.0f} руб. ({percentage:.1f}%), {count} сделок, ср.чек: {avg_check:,.0f} руб.")
 
 
-def plot_industry_analysis(df):
+@stage
+def plot_industry_analysis(df, cube=None):
     """Анализ выручки по отраслям"""
     print("\n" + "=" * 50)
     print("АНАЛИЗ ПО ОТРАСЛЯМ")
     print("=" * 50)
 
+    industry_rollup = get_rollup(df, 'Отрасль', cube)
+
     # Выручка по отраслям
-    industry_revenue = df.groupby('Отрасль')['Сумма'].sum().sort_values(ascending=False)
+    industry_revenue = industry_rollup['revenue'].sort_values(ascending=False)
 
     # Топ-10 отраслей
     top_industries = industry_revenue.head(10)
 
-    plt.figure(figsize=(14, 8))
-    bars = plt.bar(range(len(top_industries)), top_industries.values, color='navy')
-    plt.title('Выручка по отраслям (Топ-10)', fontsize=16, fontweight='bold')
-    plt.xlabel('Отрасль')
-    plt.ylabel('Выручка, руб.')
-    plt.xticks(range(len(top_industries)), top_industries.index, rotation=45, ha='right')
-
-    for bar in bars:
-        height = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width() / 2., height + height * 0.01,
-                 f'{height:,.0f}', ha='center', va='bottom', fontsize=10, color='white')
-
-    plt.grid(axis='y', alpha=0.3)
-    plt.tight_layout()
-    plt.show()
+    render_figure('industry_revenue', _draw_bar_chart, top_industries,
+                  'Выручка по отраслям (Топ-10)', 'Отрасль', 'Выручка, руб.',
+                  color='navy', label_color='white')
 
     # Количество клиентов по отраслям
-    industry_clients = df.groupby('Отрасль')['Клиент'].nunique().sort_values(ascending=False).head(10)
+    industry_clients = industry_rollup['clients'].sort_values(ascending=False).head(10)
 
-    plt.figure(figsize=(14, 8))
-    bars = plt.bar(range(len(industry_clients)), industry_clients.values, color='darkgreen')
-    plt.title('Количество клиентов по отраслям (Топ-10)', fontsize=16, fontweight='bold')
-    plt.xlabel('Отрасль')
-    plt.ylabel('Количество клиентов')
-    plt.xticks(range(len(industry_clients)), industry_clients.index, rotation=45, ha='right')
-
-    for bar in bars:
-        height = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width() / 2., height + height * 0.01,
-                 f'{height:,.0f}', ha='center', va='bottom', fontsize=10)
-
-    plt.grid(axis='y', alpha=0.3)
-    plt.tight_layout()
-    plt.show()
+    render_figure('industry_clients', _draw_bar_chart, industry_clients,
+                  'Количество клиентов по отраслям (Топ-10)', 'Отрасль', 'Количество клиентов',
+                  color='darkgreen')
 
     # Средний чек по отраслям
-    industry_avg_check = df.groupby('Отрасль')['Сумма'].mean().sort_values(ascending=False).head(10)
-
-    plt.figure(figsize=(14, 8))
-    bars = plt.bar(range(len(industry_avg_check)), industry_avg_check.values, color='darkred')
-    plt.title('Средний чек по отраслям (Топ-10)', fontsize=16, fontweight='bold')
-    plt.xlabel('Отрасль')
-    plt.ylabel('Средний чек, руб.')
-    plt.xticks(range(len(industry_avg_check)), industry_avg_check.index, rotation=45, ha='right')
+    industry_avg_check = industry_rollup['avg_check'].sort_values(ascending=False).head(10)
 
-    for bar in bars:
-        height = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width() / 2., height + height * 0.01,
-                 f'{height:,.0f}', ha='center', va='bottom', fontsize=10)
-
-    plt.grid(axis='y', alpha=0.3)
-    plt.tight_layout()
-    plt.show()
+    render_figure('industry_avg_check', _draw_bar_chart, industry_avg_check,
+                  'Средний чек по отраслям (Топ-10)', 'Отрасль', 'Средний чек, руб.', color='darkred')
 
     # Статистика
     print("📊 Статистика по отраслям:")
@@ -418,82 +373,71 @@ def plot_industry_analysis(df):
         print(
             f"{i}. {industry}: {revenue:,.0f} руб. ({percentage:.1f}%), {clients_count} клиентов, ср.чек: {avg_check:,.0f} руб.")
 
-def plot_additional_analysis(df):
+@stage
+def plot_additional_analysis(df, cube=None):
     """Дополнительные графики анализа"""
     # Динамика продаж по месяцам
     if 'Дата продажи' in df.columns and 'Сумма' in df.columns:
-        monthly_sales = df.groupby(['Год', 'Месяц'])['Сумма'].sum().reset_index()
+        monthly_sales = get_rollup(df, ('Год', 'Месяц'), cube)['revenue'].rename('Сумма').reset_index()
         monthly_sales['Месяц_год'] = monthly_sales['Месяц'].astype(str) + '-' + monthly_sales['Год'].astype(str)
 
-        plt.figure(figsize=(15, 6))
-        plt.plot(monthly_sales['Месяц_год'], monthly_sales['Сумма'], marker='o', linewidth=2, color='blue')
-        plt.title('Динамика продаж по месяцам', fontsize=16, fontweight='bold')
-        plt.xlabel('Месяц-Год')
-        plt.ylabel('Выручка, руб.')
-        plt.xticks(rotation=45)
-        plt.grid(True, alpha=0.3)
-        plt.tight_layout()
-        plt.show()
+        render_figure('monthly_sales', _draw_monthly_sales, monthly_sales)
 
     # Продажи по дням недели
     if 'День недели' in df.columns and 'Сумма' in df.columns:
-        weekday_sales = df.groupby('День недели')['Сумма'].sum()
+        weekday_sales = get_rollup(df, 'День недели', cube)['revenue']
         days = ['Пн', 'Вт', 'Ср', 'Чт', 'Пт', 'Сб', 'Вс']
 
-        plt.figure(figsize=(10, 6))
-        plt.bar(range(len(weekday_sales)), weekday_sales.values, color='red')
-        plt.title('Продажи по дням недели', fontsize=16, fontweight='bold')
-        plt.xlabel('День недели')
-        plt.ylabel('Выручка, руб.')
-        plt.xticks(range(len(weekday_sales)), days[:len(weekday_sales)])
-        plt.grid(axis='y', alpha=0.3)
-        plt.tight_layout()
-        plt.show()
+        render_figure('weekday_sales', _draw_weekday_sales, weekday_sales, days)
 
     # Анализ по типу клиента (если есть столбец)
     if 'Тип клиента' in df.columns:
-        plot_client_type_analysis(df)
+        plot_client_type_analysis(df, cube)
 
     # Анализ по отраслям (если есть столбец)
     if 'Отрасль' in df.columns:
-        plot_industry_analysis(df)
+        plot_industry_analysis(df, cube)
 
 
-def plot_all_analysis(df):
-    """Построение всех графиков анализа"""
+@stage
+def plot_all_analysis(df, cube=None):
+    """Построение всех графиков анализа (все разрезы берутся из одного сводного куба)"""
     print("📈 Запуск полного анализа данных...")
 
     setup_visuals()
 
+    if cube is None:
+        cube = build_aggregate_cube(df)
+
     # Основные графики
     print("\n" + "=" * 50)
     print("ВЫРУЧКА ПО КАТЕГОРИЯМ")
     print("=" * 50)
-    plot_revenue_by_category(df)
+    plot_revenue_by_category(df, cube=cube)
 
     print("\n" + "=" * 50)
     print("КОЛИЧЕСТВО ПРОДАЖ ПО КАТЕГОРИЯМ")
     print("=" * 50)
-    plot_quantity_by_category(df)
+    plot_quantity_by_category(df, cube=cube)
 
     print("\n" + "=" * 50)
     print("СРЕДНИЙ ЧЕК ПО РЕГИОНАМ")
     print("=" * 50)
-    plot_avg_check_by_region(df)
+    plot_avg_check_by_region(df, cube=cube)
 
     print("\n" + "=" * 50)
     print("ЧАСТОТА ПРОДАЖ ПО ПРОДУКТАМ")
     print("=" * 50)
-    plot_sales_frequency_by_product(df)
+    plot_sales_frequency_by_product(df, cube=cube)
 
     # Дополнительные графики (включая анализ по типу клиента и отраслям)
     print("\n" + "=" * 50)
     print("ДОПОЛНИТЕЛЬНЫЙ АНАЛИЗ")
     print("=" * 50)
-    plot_additional_analysis(df)
+    plot_additional_analysis(df, cube=cube)
 
     # Тренд выручки
     print("\n" + "=" * 50)
     print("ТРЕНД ВЫРУЧКИ")
     print("=" * 50)
-    plot_monthly_revenue_trend(df)
\ No newline at end of file
+    plot_monthly_revenue_trend(df, cube=cube)
\ No newline at end of file
@@ -0,0 +1,255 @@
+import contextlib
+import io
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from config import DATA_FILE_PATH, PROPHET_CONFIG, PARALLEL_CONFIG, CACHE_CONFIG, BACKTEST_CONFIG
+from model_forecast import create_prophet_model
+from model_store import fold_cache_key, load_fold_forecast, save_fold_forecast
+
+
+def _mape(y, yhat):
+    """MAPE, %: периоды с нулевыми продажами пропускаются"""
+    mask = y != 0
+    return np.mean(np.abs(y[mask] - yhat[mask]) / np.abs(y[mask])) * 100 if mask.any() else np.nan
+
+
+def _smape(y, yhat):
+    """Симметричный MAPE, % (0-200): устойчив к нулевым значениям факта"""
+    denominator = np.abs(y) + np.abs(yhat)
+    mask = denominator != 0
+    return np.mean(2 * np.abs(y[mask] - yhat[mask]) / denominator[mask]) * 100 if mask.any() else np.nan
+
+
+def _mae(y, yhat):
+    return np.mean(np.abs(y - yhat)) if len(y) else np.nan
+
+
+def _rmse(y, yhat):
+    return np.sqrt(np.mean((y - yhat) ** 2)) if len(y) else np.nan
+
+
+def _coverage(y, yhat, lower, upper):
+    """Доля фактических значений внутри интервала прогноза, %"""
+    return np.mean((y >= lower) & (y <= upper)) * 100 if len(y) else np.nan
+
+
+# Метрики бэктеста: имя → функция (факт, прогноз)
+METRICS = {
+    'mape': _mape,
+    'smape': _smape,
+    'mae': _mae,
+    'rmse': _rmse,
+}
+
+
+def make_cutoffs(n_periods, initial, horizon, step):
+    """
+    Начала прогноза фолдов (индексы в ряду): последний фолд заканчивается на последней точке,
+    предыдущие сдвигаются назад на step, пока обучающая выборка не короче initial.
+    """
+    cutoffs = []
+    cutoff = n_periods - horizon
+    while cutoff >= initial:
+        cutoffs.append(cutoff)
+        cutoff -= step
+    return sorted(cutoffs)
+
+
+def fit_fold(key, cutoff, train, test, config):
+    """
+    Обучение на train и прогноз на даты test для одного фолда.
+    Выполняется в процессе пула, поэтому ошибки возвращаются, а не выбрасываются.
+    """
+    fold_config = {**config, "forecast_params": {**config.get("forecast_params", {}), "periods": len(test)}}
+    try:
+        # Сообщения об обучении сотен моделей фолдов не выводим
+        with contextlib.redirect_stdout(io.StringIO()):
+            model, forecast = create_prophet_model(train, fold_config, use_cache=False)
+        if model is None or forecast is None:
+            return key, cutoff, None, "модель не обучена"
+
+        fold_forecast = test[['ds', 'y']].merge(forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']],
+                                                on='ds', how='left')
+        fold_forecast['cutoff'] = train['ds'].iloc[-1]
+        fold_forecast['step'] = np.arange(1, len(fold_forecast) + 1)
+        return key, cutoff, fold_forecast, None
+    except Exception as e:
+        return key, cutoff, None, str(e)
+
+
+def evaluate_backtest(predictions, metrics=None):
+    """
+    Метрики по прогнозам фолдов (DataFrame из run_backtest()['predictions']).
+    Прогнозы не пересчитываются, поэтому новые метрики считаются без переобучения моделей.
+    Возвращает (метрики по фолдам, итоговые метрики по рядам).
+    """
+    metrics = list(metrics or BACKTEST_CONFIG.get("metrics", ['mape', 'smape', 'mae']))
+    unknown = [name for name in metrics if name not in METRICS and name != 'coverage']
+    if unknown:
+        raise ValueError(f"Неизвестные метрики: {unknown}. Доступны: {list(METRICS) + ['coverage']}")
+
+    def _score(group):
+        y, yhat = group['y'].to_numpy(), group['yhat'].to_numpy()
+        scores = {'points': len(group)}
+        for name in metrics:
+            if name == 'coverage':
+                scores[name] = _coverage(y, yhat, group['yhat_lower'].to_numpy(), group['yhat_upper'].to_numpy())
+            else:
+                scores[name] = METRICS[name](y, yhat)
+        return pd.Series(scores)
+
+    valid = predictions.dropna(subset=['yhat'])
+    fold_metrics = valid.groupby(['series', 'cutoff'], sort=False)[list(valid.columns)].apply(_score)
+    summary = valid.groupby('series', sort=False)[list(valid.columns)].apply(_score)
+    summary['folds'] = fold_metrics.groupby(level='series', sort=False).size()
+    fold_metrics['points'] = fold_metrics['points'].astype(int)
+    summary['points'] = summary['points'].astype(int)
+    return fold_metrics.reset_index(), summary
+
+
+def run_backtest(tasks, config=PROPHET_CONFIG, initial=None, horizon=None, step=None,
+                 workers=None, metrics=None, use_cache=None, file_path=DATA_FILE_PATH):
+    """
+    Бэктест со скользящим началом прогноза для набора рядов [(ключ, df_prophet), ...].
+    Для каждого фолда модель обучается только на данных до начала прогноза и проверяется
+    на следующих horizon периодах, поэтому метрики честнее, чем MAPE на обучающих данных.
+    Фолды всех рядов обучаются в пуле из workers процессов (по умолчанию PARALLEL_CONFIG["forecast_workers"]);
+    прогнозы фолдов сохраняются в кэш (CACHE_CONFIG["model_cache"]) рядом с файлом данных file_path
+    и при повторном запуске не пересчитываются.
+    Возвращает словарь:
+        'predictions' - прогнозы всех фолдов (series, cutoff, step, ds, y, yhat, yhat_lower, yhat_upper);
+        'folds' - метрики по фолдам;
+        'summary' - итоговые метрики по рядам.
+    """
+    initial = initial or BACKTEST_CONFIG.get("initial", 180)
+    horizon = horizon or BACKTEST_CONFIG.get("horizon", 30)
+    step = step or BACKTEST_CONFIG.get("step", horizon)
+    if workers is None:
+        workers = PARALLEL_CONFIG.get("forecast_workers", 0) or 0
+    if use_cache is None:
+        use_cache = CACHE_CONFIG.get("model_cache", False)
+
+    # 1. Фолды всех рядов; готовые прогнозы берутся из кэша
+    jobs, fold_forecasts, cached = [], [], 0
+    for key, df_prophet in tasks:
+        df_prophet = df_prophet.reset_index(drop=True)
+        cutoffs = make_cutoffs(len(df_prophet), initial, horizon, step)
+        if not cutoffs:
+            print(f"⚠️ Недостаточно данных для бэктеста '{key}': {len(df_prophet)} точек "
+                  f"(требуется > {initial + horizon})")
+            continue
+
+        for cutoff in cutoffs:
+            train = df_prophet.iloc[:cutoff]
+            test = df_prophet.iloc[cutoff:cutoff + horizon]
+            cache_key = fold_cache_key(train, test['ds'], config) if use_cache else None
+            fold_forecast = load_fold_forecast(cache_key, file_path) if cache_key else None
+            if fold_forecast is not None:
+                fold_forecasts.append(fold_forecast.assign(series=key))
+                cached += 1
+            else:
+                jobs.append((key, cutoff, train, test, cache_key))
+
+    if not jobs and not fold_forecasts:
+        print("❌ Нет фолдов для бэктеста")
+        return None
+
+    print(f"🧪 Бэктест: {len(jobs) + cached} фолдов (initial={initial}, horizon={horizon}, step={step}), "
+          f"из кэша: {cached}")
+
+    # 2. Обучение оставшихся фолдов (параллельно, если задано)
+    cache_keys = {(key, cutoff): cache_key for key, cutoff, _, _, cache_key in jobs}
+    if workers <= 0 or len(jobs) <= 1:
+        fitted = [fit_fold(key, cutoff, train, test, config) for key, cutoff, train, test, _ in jobs]
+    else:
+        print(f"⚙️ Обучение {len(jobs)} фолдов в {min(workers, len(jobs))} процессах...")
+        fitted = []
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            futures = {pool.submit(fit_fold, key, cutoff, train, test, config): (key, cutoff)
+                       for key, cutoff, train, test, _ in jobs}
+            for future in as_completed(futures):
+                try:
+                    fitted.append(future.result())
+                except Exception as e:
+                    fitted.append((*futures[future], None, str(e)))
+
+    errors = []
+    for key, cutoff, fold_forecast, error in fitted:
+        if error is not None:
+            errors.append(f"{key} (фолд {cutoff}): {error}")
+            continue
+        if cache_keys[(key, cutoff)]:
+            save_fold_forecast(cache_keys[(key, cutoff)], fold_forecast, file_path)
+        fold_forecasts.append(fold_forecast.assign(series=key))
+
+    if errors:
+        print(f"⚠️ Ошибки в {len(errors)} фолдах: {'; '.join(errors[:3])}{' ...' if len(errors) > 3 else ''}")
+    if not fold_forecasts:
+        print("❌ Ни один фолд не обучен")
+        return None
+
+    # 3. Метрики
+    # Фолды из пула приходят в порядке завершения - возвращаем порядок рядов и дат
+    order = {key: position for position, (key, _) in enumerate(tasks)}
+    predictions = pd.concat(fold_forecasts, ignore_index=True)
+    predictions = predictions.sort_values(['series', 'cutoff', 'step'], ignore_index=True,
+                                          key=lambda col: col.map(order) if col.name == 'series' else col)
+    predictions = predictions[['series', 'cutoff', 'step', 'ds', 'y', 'yhat', 'yhat_lower', 'yhat_upper']]
+    folds, summary = evaluate_backtest(predictions, metrics)
+
+    return {'predictions': predictions, 'folds': folds, 'summary': summary}
+
+
+def backtest_model(df_prophet, config=PROPHET_CONFIG, **kwargs):
+    """Бэктест одного ряда (итоговые продажи): печатает метрики по фолдам и итог"""
+    results = run_backtest([('total', df_prophet)], config, **kwargs)
+    if results is not None:
+        print_backtest_summary(results)
+    return results
+
+
+def print_backtest_summary(results):
+    """Вывод метрик бэктеста по фолдам и итоговых метрик по рядам"""
+    folds, summary = results['folds'], results['summary']
+    metric_columns = [col for col in summary.columns if col not in ('points', 'folds')]
+
+    print("\n" + "=" * 60)
+    print("🧪 РЕЗУЛЬТАТЫ БЭКТЕСТА (вне обучающей выборки)")
+    print("=" * 60)
+
+    if summary.shape[0] == 1:
+        display_folds = folds.copy()
+        display_folds['cutoff'] = display_folds['cutoff'].dt.strftime('%Y-%m-%d')
+        print("📋 Метрики по фолдам (cutoff - последний день обучения):")
+        print(display_folds[['cutoff', 'points'] + metric_columns].round(2).to_string(index=False))
+
+    print("\n📊 Итоговые метрики:")
+    print(summary[['folds', 'points'] + metric_columns].round(2).to_string())
+
+
+def backtest_category_forecasts(results, config=PROPHET_CONFIG, **kwargs):
+    """
+    Бэктест рядов из результатов forecast_by_category.
+    MAPE в результатах заменяется на MAPE вне обучающей выборки (исходный сохраняется в 'mape_in_sample'),
+    поэтому analyze_category_forecasts показывает честную точность прогнозов.
+    """
+    if not results:
+        print("❌ Нет результатов для бэктеста")
+        return None
+
+    backtest_results = run_backtest([(key, data['df_prophet']) for key, data in results.items()], config, **kwargs)
+    if backtest_results is None:
+        return None
+
+    summary = backtest_results['summary']
+    for key, data in results.items():
+        if key in summary.index and 'mape' in summary.columns:
+            data['mape_in_sample'] = data['mape']
+            data['mape'] = summary.loc[key, 'mape']
+            print(f"🧪 '{key}': MAPE на обучении {data['mape_in_sample']:.1f}% → в бэктесте {data['mape']:.1f}%")
+
+    print_backtest_summary(backtest_results)
+    return backtest_results
@@ -1,19 +1,192 @@
-def calculate_basic_stats(df):
-    """Расчет базовой статистики"""
-    stats = {}
+from concurrent.futures import ProcessPoolExecutor
 
-    if df is not None:
-        stats['total_revenue'] = df['Сумма'].sum() if 'Сумма' in df.columns else 0
-        stats['total_quantity'] = df['Кол-во'].sum() if 'Кол-во' in df.columns else 0
+import numpy as np
+import pandas as pd
+
+from config import STATS_CONFIG
+from profiling import stage
+from read_and_clean import iter_data_chunks, iter_clean_chunks
+
+# Ключ статистики → столбец данных
+SUM_COLUMNS = {'total_revenue': 'Сумма', 'total_quantity': 'Кол-во'}
+UNIQUE_COLUMNS = {
+    'unique_categories': 'Категория',
+    'unique_products': 'Продукт',
+    'unique_regions': 'Регион',
+    'unique_clients': 'Клиент',
+}
+UNIQUE_METHODS = ('exact', 'hll')
+
+
+class HyperLogLog:
+    """
+    Приближенный подсчет уникальных значений (HyperLogLog): 2**precision однобайтовых регистров,
+    относительная погрешность около 1.04 / sqrt(2**precision). Состояния объединяются поэлементным максимумом.
+    """
+
+    def __init__(self, precision=14):
+        if not 4 <= precision <= 18:
+            raise ValueError(f"Точность HyperLogLog должна быть от 4 до 18, получено {precision}")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, values):
+        """Добавление значений (повторы не меняют состояние)"""
+        if len(values) == 0:
+            return
+        # Хэш pandas не зависит от процесса, поэтому состояния разных процессов можно объединять
+        hashes = pd.util.hash_array(np.asarray(values, dtype=object))
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.intp)
+        # Оставшиеся биты со сторожевой единицей: число ведущих нулей не больше 64 - precision
+        rest = (hashes << np.uint64(self.precision)) | np.uint64(1 << (self.precision - 1))
+
+        leading_zeros = np.zeros(len(rest), dtype=np.uint8)
+        for shift in (32, 16, 8, 4, 2, 1):
+            mask = (rest >> np.uint64(64 - shift)) == 0
+            leading_zeros[mask] += shift
+            rest[mask] <<= np.uint64(shift)
+        np.maximum.at(self.registers, index, leading_zeros + 1)
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError(f"Нельзя объединить HyperLogLog с точностью {self.precision} и {other.precision}")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        """Оценка числа уникальных значений"""
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        empty = int(np.count_nonzero(self.registers == 0))
+        # Малые количества - линейный подсчет по пустым регистрам
+        if estimate <= 2.5 * size and empty:
+            estimate = size * np.log(size / empty)
+        return int(round(estimate))
+
+
+def _unique_values(column):
+    """Уникальные непустые значения столбца; для категориального - только встречающиеся категории"""
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        codes = column.cat.codes.to_numpy()
+        present = np.bincount(codes[codes >= 0], minlength=len(column.cat.categories)) > 0
+        return column.cat.categories[present]
+    # Пропуски убираются из уже найденных уникальных значений, а не из всего столбца
+    values = column.unique()
+    return values[~pd.isna(values)]
+
+
+class StatsAccumulator:
+    """
+    Накопитель базовой статистики: суммы и уникальные значения обновляются по порциям данных
+    за один проход. Частичные состояния (например, посчитанные в разных процессах по частям
+    набора данных) объединяются через merge.
+    Уникальные значения считаются точно (множества) или приближенно (HyperLogLog) - STATS_CONFIG["unique_method"].
+    """
+
+    def __init__(self, unique_method=None, precision=None):
+        self.unique_method = unique_method or STATS_CONFIG.get("unique_method", 'exact')
+        if self.unique_method not in UNIQUE_METHODS:
+            raise ValueError(f"Неизвестный метод подсчета уникальных значений: '{self.unique_method}'. "
+                             f"Доступны: {list(UNIQUE_METHODS)}")
+        self.precision = precision or STATS_CONFIG.get("hll_precision", 14)
+
+        self.rows = 0
+        self.totals = {column: 0 for column in SUM_COLUMNS.values()}
+        self.uniques = {
+            column: set() if self.unique_method == 'exact' else HyperLogLog(self.precision)
+            for column in UNIQUE_COLUMNS.values()
+        }
+
+    def update(self, df):
+        """Учет порции данных"""
+        self.rows += len(df)
+        for column in self.totals:
+            if column in df.columns:
+                self.totals[column] += df[column].sum()
+        for column, state in self.uniques.items():
+            if column in df.columns:
+                state.update(_unique_values(df[column]))
+        return self
+
+    def merge(self, other):
+        """Объединение с частичным состоянием другого накопителя"""
+        if other.unique_method != self.unique_method:
+            raise ValueError(f"Нельзя объединить накопители с методами '{self.unique_method}' и '{other.unique_method}'")
+
+        self.rows += other.rows
+        for column, value in other.totals.items():
+            self.totals[column] += value
+        for column, state in other.uniques.items():
+            if self.unique_method == 'exact':
+                self.uniques[column].update(state)
+            else:
+                self.uniques[column].merge(state)
+        return self
+
+    def result(self):
+        """Статистика в формате calculate_basic_stats"""
+        stats = {key: self.totals[column] for key, column in SUM_COLUMNS.items()}
         stats['avg_check'] = stats['total_revenue'] / stats['total_quantity'] if stats['total_quantity'] > 0 else 0
-        stats['unique_categories'] = df['Категория'].nunique() if 'Категория' in df.columns else 0
-        stats['unique_products'] = df['Продукт'].nunique() if 'Продукт' in df.columns else 0
-        stats['unique_regions'] = df['Регион'].nunique() if 'Регион' in df.columns else 0
-        stats['unique_clients'] = df['Клиент'].nunique() if 'Клиент' in df.columns else 0
+        for key, column in UNIQUE_COLUMNS.items():
+            state = self.uniques[column]
+            stats[key] = len(state) if self.unique_method == 'exact' else state.count()
+        return stats
+
+
+@stage
+def calculate_basic_stats(df, unique_method=None):
+    """Расчет базовой статистики (unique_method: 'exact' или 'hll', по умолчанию из STATS_CONFIG)"""
+    if df is None:
+        return {}
+    return StatsAccumulator(unique_method).update(df).result()
+
+
+def accumulate_stats(chunks, unique_method=None, precision=None):
+    """Накопитель статистики, заполненный порциями данных (частичное состояние для merge)"""
+    accumulator = StatsAccumulator(unique_method, precision)
+    for chunk in chunks:
+        accumulator.update(chunk)
+    return accumulator
+
+
+@stage
+def calculate_basic_stats_from_chunks(chunks, unique_method=None):
+    """Расчет базовой статистики по порциям данных (см. iter_clean_chunks)"""
+    return accumulate_stats(chunks, unique_method).result()
+
+
+def _file_stats(file_path, unique_method, precision):
+    """Частичное состояние по одному файлу: потоковая загрузка и очистка (выполняется в процессе пула)"""
+    return accumulate_stats(iter_clean_chunks(iter_data_chunks(file_path)), unique_method, precision)
+
+
+@stage
+def calculate_basic_stats_from_files(file_paths, workers=None, unique_method=None):
+    """
+    Расчет базовой статистики по набору данных, разбитому на файлы (части).
+    Каждый файл читается порциями в пуле из workers процессов (по умолчанию STATS_CONFIG["workers"]),
+    частичные состояния объединяются.
+    """
+    if workers is None:
+        workers = STATS_CONFIG.get("workers", 0) or 0
+    # Метод и точность передаются явно: процессы пула видят только исходный STATS_CONFIG
+    accumulator = StatsAccumulator(unique_method)
+    args = (accumulator.unique_method, accumulator.precision)
+
+    if workers <= 0 or len(file_paths) <= 1:
+        partials = [_file_stats(file_path, *args) for file_path in file_paths]
+    else:
+        print(f"⚙️ Статистика по {len(file_paths)} файлам в {min(workers, len(file_paths))} процессах...")
+        with ProcessPoolExecutor(max_workers=min(workers, len(file_paths))) as pool:
+            partials = list(pool.map(_file_stats, file_paths, *[[arg] * len(file_paths) for arg in args]))
 
-    return stats
+    for partial in partials:
+        accumulator.merge(partial)
+    return accumulator.result()
 
 
+@stage
 def print_basic_stats(stats):
     """Вывод базовой статистики"""
     print("📊 ОСНОВНАЯ СТАТИСТИКА:")
@@ -0,0 +1,300 @@
+# Командная строка для отдельных этапов анализа. Каждая команда выполняет только свой этап:
+# очищенные данные и сводный куб берутся из кэша (CACHE_CONFIG), если уже посчитаны.
+# Запуск из папки EDA_functions:
+#   python cli.py ingest                          - загрузка, очистка и сводный куб (заполняет кэш)
+#   python cli.py stats                           - основная статистика
+#   python cli.py eda --report ../report          - графики анализа (с --report - в HTML-отчет)
+#   python cli.py forecast --engine fourier       - прогноз итоговых продаж
+#   python cli.py forecast-by --dim Регион        - прогнозы по значениям измерения
+#   python cli.py backtest --dim Категория        - бэктест итогового ряда или рядов измерения
+#   python cli.py tune --search random            - подбор параметров Prophet (tuning.py)
+#   python cli.py run --targets evaluate          - пайплайн этапов с сохранением результатов (pipeline.py)
+#   python cli.py incremental                     - статистика и куб с учетом только новых строк (incremental.py)
+#   python cli.py --profile forecast              - замеры этапов (время, CPU, строки, память) - profiling.py
+import argparse
+import contextlib
+import copy
+import os
+import sys
+
+from config import DATA_FILE_PATH, CACHE_CONFIG, PROPHET_CONFIG
+from read_and_clean import (load_clean_data, prepare_for_prophet, prepare_series_by_group,
+                            _cache_path, _read_cache, _write_cache)
+from aggregates import ROLLUP_COLUMN, build_aggregate_cube
+from basic_stats import (UNIQUE_METHODS, calculate_basic_stats, calculate_basic_stats_from_files,
+                         print_basic_stats)
+from forecasters import FAST_ENGINES
+
+
+def _use_cache(args):
+    return CACHE_CONFIG.get("enabled", False) and not args.no_cache
+
+
+def _load_clean(args):
+    """Очищенные данные (из кэша, если он актуален)"""
+    return load_clean_data(args.data, use_cache=_use_cache(args))
+
+
+def _load_cube(df_clean, args):
+    """Сводный куб: базовая таблица куба кэшируется рядом с очищенными данными"""
+    cache_path = _cache_path(args.data, 'cube') if _use_cache(args) else None
+    if cache_path and os.path.exists(cache_path):
+        try:
+            base = _read_cache(cache_path)
+            # Базовая таблица в прежнем формате (без имени разреза) строится заново
+            if ROLLUP_COLUMN in base.columns:
+                cube = build_aggregate_cube(df_clean, base=base)
+                print("✅ Сводный куб загружен из кэша")
+                return cube
+        except Exception as e:
+            print(f"⚠️ Не удалось прочитать кэш сводного куба: {e}")
+
+    cube = build_aggregate_cube(df_clean)
+    if cache_path and cube:
+        _write_cache(cube['base'], cache_path)
+    return cube
+
+
+def _forecast_config(args):
+    """Конфиг прогноза: PROPHET_CONFIG (или подобранные параметры) с параметрами командной строки"""
+    if args.tuned is not None:
+        from tuning import load_tuned_config
+        config = copy.deepcopy(load_tuned_config(args.tuned or None))
+    else:
+        config = copy.deepcopy(PROPHET_CONFIG)
+
+    if args.engine:
+        config["engine"] = args.engine
+    if args.periods:
+        config["forecast_params"] = {**config.get("forecast_params", {}), "periods": args.periods}
+    return config
+
+
+def cmd_ingest(args):
+    """Загрузка, очистка и построение сводного куба: результаты сохраняются в кэш для остальных команд"""
+    df_clean = _load_clean(args)
+    if df_clean is None:
+        return 1
+
+    _load_cube(df_clean, args)
+    if _use_cache(args):
+        print(f"💾 Промежуточные данные в кэше: {os.path.dirname(_cache_path(args.data, 'clean'))}")
+    return 0
+
+
+def cmd_stats(args):
+    """Основная статистика по очищенным данным (с --files - по частям набора данных, порциями)"""
+    if args.files:
+        missing = [file_path for file_path in args.files if not os.path.exists(file_path)]
+        if missing:
+            print(f"❌ Файлы не найдены: {', '.join(missing)}")
+            return 1
+        print_basic_stats(calculate_basic_stats_from_files(args.files, workers=args.workers,
+                                                           unique_method=args.unique))
+        return 0
+
+    df_clean = _load_clean(args)
+    if df_clean is None:
+        return 1
+
+    print_basic_stats(calculate_basic_stats(df_clean, unique_method=args.unique))
+    return 0
+
+
+def cmd_eda(args):
+    """Графики исследовательского анализа по сводному кубу"""
+    from analyze import plot_all_analysis
+
+    df_clean = _load_clean(args)
+    if df_clean is None:
+        return 1
+
+    plot_all_analysis(df_clean, cube=_load_cube(df_clean, args))
+    return 0
+
+
+def cmd_forecast(args):
+    """Прогноз итоговых продаж с оценкой качества"""
+    from model_forecast import create_prophet_model, plot_prophet_forecast, evaluate_prophet_model
+
+    df_clean = _load_clean(args)
+    if df_clean is None:
+        return 1
+
+    df_prophet = prepare_for_prophet(df_clean)
+    if df_prophet is None or len(df_prophet) < 100:
+        print("❌ Недостаточно данных для построения прогноза")
+        return 1
+
+    model, forecast = create_prophet_model(df_prophet, _forecast_config(args), series_key='total', file_path=args.data)
+    if model is None or forecast is None:
+        return 1
+
+    plot_prophet_forecast(model, forecast, df_prophet)
+    evaluate_prophet_model(model, forecast, df_prophet)
+    return 0
+
+
+def cmd_forecast_by(args):
+    """Прогнозы по значениям измерения (--dim) и их сравнение"""
+    from model_forecast import forecast_by_category, analyze_category_forecasts
+
+    df_clean = _load_clean(args)
+    if df_clean is None:
+        return 1
+
+    results = forecast_by_category(df_clean, _forecast_config(args), workers=args.workers, group_column=args.dim,
+                                   file_path=args.data)
+    if not results:
+        return 1
+
+    analyze_category_forecasts(results)
+    return 0
+
+
+def cmd_backtest(args):
+    """Бэктест итогового ряда или (с --dim) рядов по значениям измерения"""
+    from backtest import run_backtest, print_backtest_summary
+
+    df_clean = _load_clean(args)
+    if df_clean is None:
+        return 1
+
+    if args.dim:
+        if args.dim not in df_clean.columns:
+            print(f"❌ Отсутствует столбец '{args.dim}'")
+            return 1
+        tasks = list((prepare_series_by_group(df_clean, args.dim) or {}).items())
+    else:
+        tasks = [('total', prepare_for_prophet(df_clean))]
+
+    results = run_backtest(tasks, _forecast_config(args), initial=args.initial, horizon=args.horizon,
+                           step=args.step, workers=args.workers, file_path=args.data)
+    if results is None:
+        return 1
+
+    print_backtest_summary(results)
+    return 0
+
+
+def cmd_tune(args):
+    """Подбор параметров Prophet на фолдах бэктеста: лучшие сохраняются в JSON для --tuned"""
+    from tuning import tune_prophet_params
+
+    df_clean = _load_clean(args)
+    if df_clean is None:
+        return 1
+
+    best_params, _ = tune_prophet_params(prepare_for_prophet(df_clean), search=args.search,
+                                         n_candidates=args.candidates, metric=args.metric, workers=args.workers,
+                                         initial=args.initial, horizon=args.horizon, step=args.step,
+                                         output_file=args.output, file_path=args.data)
+    return 0 if best_params is not None else 1
+
+
+def cmd_run(args):
+    """Пайплайн этапов: выполняются только этапы, входы или настройки которых изменились"""
+    from pipeline import run_pipeline
+
+    results = run_pipeline(args.targets, args.force or (), file_path=args.data, config=_forecast_config(args),
+                           workers=args.workers, memoize=False if args.no_cache else None)
+    return 0 if results is not None else 1
+
+
+def cmd_incremental(args):
+    """Статистика и графики по сохраненному состоянию, в которое добавляются только новые строки файла"""
+    from incremental import run_incremental
+
+    result = run_incremental(args.data, rebuild=args.rebuild, plots=args.plots)
+    return 0 if result is not None else 1
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Анализ и прогнозирование продаж')
+    parser.add_argument('--data', default=DATA_FILE_PATH, help='файл с данными (по умолчанию DATA_FILE_PATH)')
+    parser.add_argument('--no-cache', action='store_true', help='не использовать кэш промежуточных данных')
+    parser.add_argument('--report', metavar='DIR',
+                        help='пакетный режим: графики и вывод сохраняются в HTML-отчет в папке DIR')
+    parser.add_argument('--profile', action='store_true', help='замеры этапов с итоговой таблицей в конце')
+    parser.add_argument('--profile-log', metavar='FILE', help='журнал замеров (JSON lines); включает --profile')
+    parser.add_argument('--profile-dir', metavar='DIR',
+                        help='профили cProfile/pyinstrument этапов (PROFILING_CONFIG["profile_stages"]) в папку DIR; '
+                             'включает --profile')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    # Общие параметры команд прогнозирования
+    forecast_options = argparse.ArgumentParser(add_help=False)
+    forecast_options.add_argument('--engine', choices=['prophet', *FAST_ENGINES],
+                                  help='движок прогноза (по умолчанию PROPHET_CONFIG["engine"])')
+    forecast_options.add_argument('--periods', type=int, help='горизонт прогноза, периодов')
+    forecast_options.add_argument('--tuned', nargs='?', const='', metavar='JSON',
+                                  help='использовать подобранные параметры (по умолчанию TUNING_CONFIG["output_file"])')
+    forecast_options.add_argument('--workers', type=int, help='число параллельных процессов или потоков (по умолчанию из конфига)')
+
+    subparsers.add_parser('ingest', help='загрузка, очистка и сводный куб').set_defaults(func=cmd_ingest)
+
+    stats = subparsers.add_parser('stats', help='основная статистика')
+    stats.add_argument('--unique', choices=UNIQUE_METHODS,
+                       help='подсчет уникальных значений: точно или HyperLogLog (по умолчанию STATS_CONFIG)')
+    stats.add_argument('--files', nargs='+', metavar='FILE',
+                       help='части набора данных: каждая читается порциями, результаты объединяются (вместо --data)')
+    stats.add_argument('--workers', type=int, help='число процессов для --files (по умолчанию STATS_CONFIG["workers"])')
+    stats.set_defaults(func=cmd_stats)
+
+    subparsers.add_parser('eda', help='графики анализа').set_defaults(func=cmd_eda)
+    subparsers.add_parser('forecast', parents=[forecast_options],
+                          help='прогноз итоговых продаж').set_defaults(func=cmd_forecast)
+
+    forecast_by = subparsers.add_parser('forecast-by', parents=[forecast_options],
+                                        help='прогнозы по значениям измерения')
+    forecast_by.add_argument('--dim', default='Категория', help='измерение (по умолчанию Категория)')
+    forecast_by.set_defaults(func=cmd_forecast_by)
+
+    backtest = subparsers.add_parser('backtest', parents=[forecast_options], help='бэктест прогнозов')
+    backtest.add_argument('--dim', help='измерение: бэктест рядов по его значениям вместо итогового ряда')
+    backtest.add_argument('--initial', type=int, help='минимальная длина обучения (по умолчанию из BACKTEST_CONFIG)')
+    backtest.add_argument('--horizon', type=int, help='горизонт фолда (по умолчанию из BACKTEST_CONFIG)')
+    backtest.add_argument('--step', type=int, help='сдвиг между фолдами (по умолчанию из BACKTEST_CONFIG)')
+    backtest.set_defaults(func=cmd_backtest)
+
+    tune = subparsers.add_parser('tune', help='подбор параметров Prophet (TUNING_CONFIG)')
+    tune.add_argument('--search', choices=['grid', 'random'], help='перебор (по умолчанию из TUNING_CONFIG)')
+    tune.add_argument('--candidates', type=int, help='число кандидатов случайного поиска')
+    tune.add_argument('--metric', help='метрика отбора (по умолчанию из TUNING_CONFIG)')
+    tune.add_argument('--initial', type=int, help='минимальная длина обучения (по умолчанию из BACKTEST_CONFIG)')
+    tune.add_argument('--horizon', type=int, help='горизонт фолда (по умолчанию из BACKTEST_CONFIG)')
+    tune.add_argument('--step', type=int, help='сдвиг между фолдами (по умолчанию из BACKTEST_CONFIG)')
+    tune.add_argument('--output', metavar='JSON', help='файл лучших параметров (по умолчанию TUNING_CONFIG["output_file"])')
+    tune.add_argument('--workers', type=int, help='число процессов (по умолчанию из конфига)')
+    tune.set_defaults(func=cmd_tune)
+
+    run = subparsers.add_parser('run', parents=[forecast_options], help='пайплайн этапов с сохранением результатов')
+    run.add_argument('--targets', nargs='+', metavar='STAGE',
+                     help='нужные этапы (по умолчанию все): load, clean, aggregates, prepare_series, fit, '
+                          'evaluate, render_eda, render_forecast')
+    run.add_argument('--force', nargs='+', metavar='STAGE', help='пересчитать этапы, даже если результат сохранен')
+    run.set_defaults(func=cmd_run)
+
+    incremental = subparsers.add_parser('incremental', help='статистика и куб с учетом только новых строк')
+    incremental.add_argument('--rebuild', action='store_true', help='построить состояние заново по всему файлу')
+    incremental.add_argument('--plots', action='store_true', help='графики анализа по сводному кубу')
+    incremental.set_defaults(func=cmd_incremental)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    with contextlib.ExitStack() as stack:
+        if args.report:
+            from report import batch_report
+            stack.enter_context(batch_report(args.report))
+        if args.profile or args.profile_log or args.profile_dir:
+            from profiling import profiling
+            stack.enter_context(profiling(log_file=args.profile_log, profile_dir=args.profile_dir))
+        return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
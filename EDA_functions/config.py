@@ -4,6 +4,29 @@
 # DATA_FILE_PATH = "C:/Users/Joker/PycharmProjects/Practice/Data/sales_data.xlsx"
 DATA_FILE_PATH = "../Data/sales_data.xlsx"
 
+# Настройки кэширования загруженных данных
+CACHE_CONFIG = {
+    "enabled": True,     # Хранить копию Excel-файла в колоночном формате
+    "format": "parquet", # 'parquet' или 'feather'
+    "cache_dir": None,   # None - папка .cache рядом с файлом данных
+    "model_cache": True,       # Хранить обученные модели Prophet и не переобучать их на тех же данных
+    "model_cache_dir": None,   # None - папка .cache/models рядом с файлом данных
+    "model_cache_keep": 3,     # Сколько последних моделей хранить для каждого ряда (0 - все)
+    "warm_start": True,        # Дообучать модель с параметров предыдущей, если в ряд добавились новые дни
+}
+
+# Настройки потоковой (порционной) обработки больших файлов
+STREAMING_CONFIG = {
+    "chunk_size": 100_000,  # Количество строк в одной порции
+}
+
+# Расчет основной статистики - см. basic_stats.StatsAccumulator
+STATS_CONFIG = {
+    "unique_method": "exact",  # Подсчет уникальных значений: 'exact' (точно) или 'hll' (HyperLogLog, приближенно)
+    "hll_precision": 14,       # Точность HyperLogLog: 2**14 регистров (16 КБ на столбец), погрешность ~0.8%
+    "workers": 0,              # Процессы для расчета по нескольким файлам (0 - последовательно)
+}
+
 # Настройки очистки данных
 CLEANING_CONFIG = {
     # Удаление строк с определенными значениями в столбцах
@@ -25,6 +48,87 @@ CLEANING_CONFIG = {
     "required_columns": ["Дата продажи", "Кол-во", "Сумма"]
 }
 
+# Настройки пакетного (headless) отчета - см. report.batch_report
+REPORT_CONFIG = {
+    "output_dir": "../report",  # Папка для графиков и итогового отчета
+    "image_format": "png",      # Формат графиков: 'png' или 'svg'
+    "report_format": "html",    # Итоговый отчет: 'html' или 'pdf'
+    "dpi": 100,
+    "render_workers": 0,        # Число процессов для параллельной отрисовки графиков (0 - без пула)
+}
+
+# Оптимизация типов данных после очистки (экономия памяти и ускорение группировок)
+DTYPE_CONFIG = {
+    # Столбцы с небольшим числом уникальных значений, которые хранятся как 'category'
+    "categorical_columns": ["Категория", "Регион", "Продукт", "Клиент", "Тип клиента", "Отрасль"],
+    # Сжатие 'Кол-во' и временных признаков ('Год', 'Месяц', ...) до компактных целых типов
+    "downcast_integers": True,
+}
+
+# Параллельное обучение моделей
+PARALLEL_CONFIG = {
+    "forecast_workers": 0,  # Число процессов для обучения моделей по категориям (0 - последовательно)
+}
+
+# Иерархический прогноз - см. hierarchy.forecast_hierarchy
+HIERARCHY_CONFIG = {
+    "levels": ["Регион", "Категория", "Продукт"],  # Уровни иерархии сверху вниз
+    "method": "mint_shrink",  # Согласование: 'bottom_up', 'ols', 'wls_struct', 'wls_var', 'mint_shrink'
+}
+
+# Бэктест (скользящее начало прогноза) - см. backtest.run_backtest
+# Размеры задаются в периодах ряда (в днях при freq='D')
+BACKTEST_CONFIG = {
+    "initial": 180,  # Минимальная длина обучающей выборки первого фолда
+    "horizon": 30,   # Горизонт прогноза в каждом фолде
+    "step": 30,      # Сдвиг начала прогноза между фолдами
+    "metrics": ["mape", "smape", "mae"],
+}
+
+# Подбор параметров PROPHET_CONFIG["model_params"] на фолдах бэктеста - см. tuning.tune_prophet_params
+TUNING_CONFIG = {
+    "search": "grid",  # 'grid' - все комбинации, 'random' - n_candidates случайных комбинаций
+    "n_candidates": 20,
+    # Значения параметров: список - варианты, (min, max) - диапазон для случайного поиска
+    "param_grid": {
+        "changepoint_prior_scale": [0.001, 0.01, 0.05, 0.1, 0.5],
+        "seasonality_prior_scale": [0.1, 1.0, 10.0],
+        "seasonality_mode": ["additive", "multiplicative"],
+    },
+    "metric": "mape",         # Метрика отбора (см. BACKTEST_CONFIG["metrics"]), меньше - лучше
+    "reduction_factor": 3,    # На каждом этапе дальше проходит 1/3 лучших кандидатов
+    "seed": 42,
+    "output_file": "best_prophet_params.json",  # Куда сохранить лучшие параметры
+}
+
+# Хранилище прогнозов (SQLite) для дашбордов и скриптов - см. forecast_store.py
+FORECAST_STORE_CONFIG = {
+    "enabled": True,
+    "db_path": None,  # None - forecasts.sqlite рядом с файлом данных
+    "keep_runs": 5,   # Сколько последних запусков хранить для каждого ряда (0 - все)
+}
+
+# Пайплайн этапов анализа (граф зависимостей) - см. pipeline.py
+PIPELINE_CONFIG = {
+    "memoize": True,   # Сохранять результаты этапов на диск и не пересчитывать их на тех же входах
+    "cache_dir": None, # None - папка .cache/pipeline рядом с файлом данных
+    "workers": 2,      # Потоки для независимых веток (например, графики EDA и обучение модели); 0 - по очереди
+}
+
+# Инкрементальный пересчет статистики и сводного куба по новым строкам - см. incremental.py
+INCREMENTAL_CONFIG = {
+    "state_dir": None,  # None - папка .cache/incremental рядом с файлом данных
+}
+
+# Замеры этапов (время, CPU, строки, память) - см. profiling.py
+PROFILING_CONFIG = {
+    "enabled": False,      # Записывать замеры публичных функций загрузки, очистки, анализа и прогноза
+    "log_file": None,      # Файл JSON Lines для замеров (None - только в памяти и в итоговой таблице)
+    "profile_dir": None,   # Папка для профилей этапов (None - профили не сохраняются)
+    "profile_stages": [],  # Этапы для профилирования, например ["clean_data", "create_prophet_model"]; [] - все
+    "profiler": "cprofile",  # 'cprofile' (.prof) или 'pyinstrument' (.html, если установлен)
+}
+
 # Конфигурация для модели Prophet
 PROPHET_CONFIG = {
     "model_params": {
@@ -49,5 +153,15 @@ PROPHET_CONFIG = {
         # 'lower_window': 0, # За сколько дней ДО события начинается эффект
         # 'upper_window': 6, # Сколько дней ПОСЛЕ начала события длится эффект (то есть продолжительность)
         # }),
-    ]
+    ],
+    # Движок прогноза: 'prophet' или быстрые 'fourier' / 'seasonal_naive' (см. forecasters.py)
+    "engine": "prophet",
+    "fast_engine_params": {
+        "ridge_alpha": 1.0,           # Сила регуляризации ridge-регрессии
+        "weekly_fourier_order": 3,    # Число гармоник недельной сезонности
+        "yearly_fourier_order": 10,   # Число гармоник годовой сезонности
+        "n_changepoints": 10,         # Число точек излома тренда
+        "changepoint_range": 0.8,     # Доля истории, в которой расставляются точки излома
+        "interval_width": 0.8,        # Ширина интервала прогноза
+    },
 }
\ No newline at end of file
@@ -0,0 +1,177 @@
+import contextlib
+import os
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+
+from config import DATA_FILE_PATH, FORECAST_STORE_CONFIG
+
+# Модуль не импортирует Prophet: дашборды и скрипты читают прогнозы, не загружая модели.
+# dataset - абсолютный путь к файлу данных: одноименные ряды разных файлов ('total') хранятся раздельно
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dataset TEXT NOT NULL DEFAULT '',
+    series_key TEXT NOT NULL,
+    model_version TEXT,
+    run_at TEXT NOT NULL,
+    history_end TEXT
+);
+CREATE TABLE IF NOT EXISTS forecasts (
+    series_key TEXT NOT NULL,
+    run_id INTEGER NOT NULL,
+    ds TEXT NOT NULL,
+    yhat REAL,
+    yhat_lower REAL,
+    yhat_upper REAL,
+    PRIMARY KEY (series_key, run_id, ds)
+) WITHOUT ROWID;
+"""
+
+_DATE_FORMAT = '%Y-%m-%d'
+
+
+def _db_path(file_path=DATA_FILE_PATH):
+    """Файл хранилища: FORECAST_STORE_CONFIG["db_path"] или forecasts.sqlite рядом с файлом данных file_path"""
+    return FORECAST_STORE_CONFIG.get("db_path") or os.path.join(
+        os.path.dirname(os.path.abspath(file_path)), 'forecasts.sqlite')
+
+
+def _dataset(file_path):
+    return os.path.abspath(file_path)
+
+
+@contextlib.contextmanager
+def _connect(db_path):
+    """
+    Подключение к хранилищу: изменения фиксируются одной транзакцией при выходе из блока.
+    Режим WAL - чтение дашбордами не блокируется записью новых прогнозов.
+    """
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    connection = sqlite3.connect(db_path, timeout=30)
+    try:
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(_SCHEMA)
+        # Хранилища, созданные до появления столбца dataset: старые запуски не привязаны к файлу данных
+        if 'dataset' not in [row[1] for row in connection.execute("PRAGMA table_info(runs)")]:
+            connection.execute("ALTER TABLE runs ADD COLUMN dataset TEXT NOT NULL DEFAULT ''")
+        connection.execute("CREATE INDEX IF NOT EXISTS runs_dataset_series ON runs (dataset, series_key, run_id)")
+        with connection:
+            yield connection
+    finally:
+        connection.close()
+
+
+def save_forecasts(forecasts, model_version=None, history_end=None, db_path=None, file_path=DATA_FILE_PATH):
+    """
+    Сохранение прогнозов {ключ ряда: DataFrame(ds, yhat, yhat_lower, yhat_upper)} одной транзакцией.
+    Каждое сохранение - новый запуск (run) ряда файла данных file_path; хранятся последние
+    FORECAST_STORE_CONFIG["keep_runs"] запусков. history_end - последний день истории ({ключ: дата} или одна дата).
+    """
+    if not forecasts or not FORECAST_STORE_CONFIG.get("enabled", True):
+        return
+
+    run_at = datetime.now().isoformat(timespec='seconds')
+    keep_runs = FORECAST_STORE_CONFIG.get("keep_runs", 5)
+    dataset = _dataset(file_path)
+
+    try:
+        with _connect(db_path or _db_path(file_path)) as connection:
+            for series_key, forecast in forecasts.items():
+                series_key = str(series_key)
+                series_end = history_end.get(series_key) if isinstance(history_end, dict) else history_end
+                run_id = connection.execute(
+                    "INSERT INTO runs (dataset, series_key, model_version, run_at, history_end) VALUES (?, ?, ?, ?, ?)",
+                    (dataset, series_key, model_version, run_at,
+                     pd.Timestamp(series_end).strftime(_DATE_FORMAT) if series_end is not None else None)
+                ).lastrowid
+
+                # Границы интервала могут отсутствовать (например, у согласованных прогнозов иерархии)
+                missing = [None] * len(forecast)
+                rows = zip(pd.to_datetime(forecast['ds']).dt.strftime(_DATE_FORMAT),
+                           forecast['yhat'].astype(float),
+                           forecast['yhat_lower'].astype(float) if 'yhat_lower' in forecast.columns else missing,
+                           forecast['yhat_upper'].astype(float) if 'yhat_upper' in forecast.columns else missing)
+                connection.executemany(
+                    "INSERT OR REPLACE INTO forecasts VALUES (?, ?, ?, ?, ?, ?)",
+                    ((series_key, run_id, ds, yhat, lower, upper) for ds, yhat, lower, upper in rows))
+
+                if keep_runs:
+                    old_runs = [row[0] for row in connection.execute(
+                        "SELECT run_id FROM runs WHERE dataset = ? AND series_key = ? "
+                        "ORDER BY run_id DESC LIMIT -1 OFFSET ?",
+                        (dataset, series_key, keep_runs))]
+                    if old_runs:
+                        placeholders = ','.join('?' * len(old_runs))
+                        connection.execute(f"DELETE FROM forecasts WHERE series_key = ? AND run_id IN ({placeholders})",
+                                           (series_key, *old_runs))
+                        connection.execute(f"DELETE FROM runs WHERE run_id IN ({placeholders})", old_runs)
+    except sqlite3.Error as e:
+        print(f"⚠️ Не удалось сохранить прогнозы в хранилище: {e}")
+
+
+def save_forecast(series_key, forecast, model_version=None, history_end=None, db_path=None, file_path=DATA_FILE_PATH):
+    """Сохранение прогноза одного ряда (см. save_forecasts)"""
+    save_forecasts({series_key: forecast}, model_version, history_end, db_path, file_path)
+
+
+def load_forecast(series_key, start=None, end=None, run_id=None, future_only=False, db_path=None,
+                  file_path=DATA_FILE_PATH):
+    """
+    Прогноз ряда файла данных file_path из хранилища без обучения модели: DataFrame(ds, yhat, yhat_lower, yhat_upper).
+    По умолчанию - последний запуск; start/end ограничивают даты, future_only - только даты после истории.
+    Возвращает None, если прогноза нет.
+    """
+    db_path = db_path or _db_path(file_path)
+    if not os.path.exists(db_path):
+        print(f"❌ Хранилище прогнозов не найдено: {db_path}")
+        return None
+
+    with _connect(db_path) as connection:
+        if run_id is None:
+            row = connection.execute("SELECT MAX(run_id) FROM runs WHERE dataset = ? AND series_key = ?",
+                                     (_dataset(file_path), str(series_key))).fetchone()
+            run_id = row[0] if row else None
+        if run_id is None:
+            print(f"❌ Нет сохраненного прогноза для '{series_key}'")
+            return None
+
+        query = "SELECT ds, yhat, yhat_lower, yhat_upper FROM forecasts WHERE series_key = ? AND run_id = ?"
+        params = [str(series_key), run_id]
+        if future_only:
+            history_end = connection.execute("SELECT history_end FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            if history_end and history_end[0]:
+                query += " AND ds > ?"
+                params.append(history_end[0])
+        if start is not None:
+            query += " AND ds >= ?"
+            params.append(pd.Timestamp(start).strftime(_DATE_FORMAT))
+        if end is not None:
+            query += " AND ds <= ?"
+            params.append(pd.Timestamp(end).strftime(_DATE_FORMAT))
+
+        forecast = pd.read_sql_query(query + " ORDER BY ds", connection, params=params)
+
+    forecast['ds'] = pd.to_datetime(forecast['ds'])
+    forecast[['yhat', 'yhat_lower', 'yhat_upper']] = forecast[['yhat', 'yhat_lower', 'yhat_upper']].astype('float64')
+    return forecast
+
+
+def list_forecasts(db_path=None, file_path=DATA_FILE_PATH):
+    """
+    Ряды в хранилище с информацией о последнем запуске (файл данных, ключ, версия модели, время, конец истории).
+    В общем хранилище (FORECAST_STORE_CONFIG["db_path"]) перечисляются ряды всех файлов данных.
+    """
+    db_path = db_path or _db_path(file_path)
+    if not os.path.exists(db_path):
+        return pd.DataFrame(columns=['dataset', 'series_key', 'run_id', 'model_version', 'run_at', 'history_end'])
+
+    with _connect(db_path) as connection:
+        return pd.read_sql_query(
+            "SELECT dataset, series_key, run_id, model_version, run_at, history_end FROM runs "
+            "WHERE run_id IN (SELECT MAX(run_id) FROM runs GROUP BY dataset, series_key) ORDER BY dataset, series_key",
+            connection)
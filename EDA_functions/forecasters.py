@@ -0,0 +1,308 @@
+from abc import ABC, abstractmethod
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+# Параметры быстрых движков по умолчанию (переопределяются PROPHET_CONFIG["fast_engine_params"])
+DEFAULT_FAST_PARAMS = {
+    "ridge_alpha": 1.0,
+    "weekly_fourier_order": 3,
+    "yearly_fourier_order": 10,
+    "n_changepoints": 10,
+    "changepoint_range": 0.8,
+    "interval_width": 0.8,
+}
+
+WEEKDAY_NAMES = ['Пн', 'Вт', 'Ср', 'Чт', 'Пт', 'Сб', 'Вс']
+
+
+class FastForecaster(ABC):
+    """
+    Базовый класс быстрых моделей. Повторяет ту часть интерфейса Prophet, которая используется
+    в проекте: history, make_future_dataframe, predict, plot и plot_components.
+    Прогноз содержит столбцы ds, yhat, yhat_lower, yhat_upper и компоненты модели.
+    """
+    # Компоненты прогноза (столбцы predict), которые рисует plot_components
+    components = ['trend']
+
+    def __init__(self, history, freq, interval_width):
+        self.history = history
+        self.freq = freq
+        self.interval_width = interval_width
+
+    def make_future_dataframe(self, periods, freq='D', include_history=True):
+        """Даты истории и periods будущих периодов (как Prophet.make_future_dataframe)"""
+        last_date = self.history['ds'].max()
+        dates = pd.date_range(start=last_date, periods=periods + 1, freq=freq)
+        dates = dates[dates > last_date][:periods]
+        if include_history:
+            dates = np.concatenate([self.history['ds'].to_numpy(), dates.to_numpy()])
+        return pd.DataFrame({'ds': dates})
+
+    @abstractmethod
+    def predict(self, future):
+        """Прогноз на даты future['ds']: DataFrame(ds, yhat, yhat_lower, yhat_upper, компоненты)"""
+
+    def _interval(self, ds, sigma):
+        """Полуширина интервала прогноза: растет с удалением от конца истории"""
+        z = NormalDist().inv_cdf(0.5 + self.interval_width / 2)
+        steps = np.maximum(((ds - self.history['ds'].max()) / pd.Timedelta(days=1)).to_numpy(), 0)
+        return z * sigma * np.sqrt(1 + steps / len(self.history))
+
+    def plot(self, forecast, ax=None, xlabel='ds', ylabel='y', figsize=(10, 6)):
+        """График прогноза в стиле Prophet: факт, прогноз и интервал"""
+        import matplotlib.pyplot as plt
+        if ax is None:
+            fig, ax = plt.subplots(figsize=figsize)
+        else:
+            fig = ax.get_figure()
+
+        ax.plot(self.history['ds'], self.history['y'], 'k.', label='Observed data points')
+        ax.plot(forecast['ds'], forecast['yhat'], ls='-', c='#0072B2', label='Forecast')
+        ax.fill_between(forecast['ds'], forecast['yhat_lower'], forecast['yhat_upper'],
+                        color='#0072B2', alpha=0.2, label='Uncertainty interval')
+        ax.grid(True, which='major', c='gray', ls='-', lw=1, alpha=0.2)
+        ax.set_xlabel(xlabel)
+        ax.set_ylabel(ylabel)
+        fig.tight_layout()
+        return fig
+
+    def plot_components(self, forecast, figsize=None):
+        """Компоненты прогноза: тренд, недельная и годовая сезонность"""
+        import matplotlib.pyplot as plt
+        components = [name for name in self.components if name in forecast.columns]
+        fig, axes = plt.subplots(len(components), 1, figsize=figsize or (9, 3 * len(components)), squeeze=False)
+
+        for ax, name in zip(axes[:, 0], components):
+            if name == 'weekly':
+                values = forecast.groupby(forecast['ds'].dt.dayofweek)[name].mean()
+                ax.plot([WEEKDAY_NAMES[day] for day in values.index], values.to_numpy(), ls='-', c='#0072B2')
+                ax.set_xlabel('День недели')
+            elif name == 'yearly':
+                year = forecast[forecast['ds'] < forecast['ds'].iloc[0] + pd.Timedelta(days=365)]
+                ax.plot(year['ds'], year[name], ls='-', c='#0072B2')
+                ax.set_xlabel('Дата')
+            else:
+                ax.plot(forecast['ds'], forecast[name], ls='-', c='#0072B2')
+                ax.set_xlabel('ds')
+            ax.set_ylabel(name)
+            ax.grid(True, which='major', c='gray', ls='-', lw=1, alpha=0.2)
+
+        fig.tight_layout()
+        return fig
+
+
+class FourierForecaster(FastForecaster):
+    """
+    Линейная модель на признаках Фурье: кусочно-линейный тренд + недельная и годовая сезонность
+    + праздники. Коэффициенты находятся ridge-регрессией в замкнутой форме сразу для всех рядов
+    с общими датами (см. fit_fourier_batch). Модель всегда аддитивная: seasonality_mode не учитывается,
+    т.к. обучение на log(y) дает заниженный прогноз для разреженных дневных рядов с нулевыми днями.
+    """
+    components = ['trend', 'weekly', 'yearly', 'holidays']
+
+    def __init__(self, history, freq, interval_width, design, coefficients, sigma):
+        super().__init__(history, freq, interval_width)
+        self.design = design
+        self.coefficients = coefficients
+        self.sigma = sigma
+
+    def predict(self, future):
+        ds = pd.to_datetime(future['ds'])
+        X = self.design.matrix(ds)
+        return _forecast_frame(ds, X, self.design, self.coefficients, self.sigma, self._interval(ds, 1.0))
+
+
+class SeasonalNaiveForecaster(FastForecaster):
+    """Сезонный наивный прогноз: значение за тот же день прошлой недели (для дневных данных)"""
+
+    def __init__(self, history, freq, interval_width, season_length, sigma):
+        super().__init__(history, freq, interval_width)
+        self.season_length = season_length
+        self.sigma = sigma
+
+    def predict(self, future):
+        ds = pd.to_datetime(future['ds']).reset_index(drop=True)
+        y = self.history['y'].to_numpy()
+        step = self.history['ds'].iloc[1] - self.history['ds'].iloc[0]
+        position = np.round((ds - self.history['ds'].iloc[0]) / step).astype('int64').to_numpy()
+
+        in_history = (position >= self.season_length) & (position < len(y))
+        lagged = np.where(in_history, y[np.clip(position - self.season_length, 0, len(y) - 1)], np.nan)
+        # Будущее: последний полный сезон повторяется
+        last_season = y[-self.season_length:]
+        future_values = last_season[(position - len(y)) % self.season_length]
+        yhat = np.where(position >= len(y), future_values, lagged)
+
+        width = self._interval(ds, self.sigma)
+        return pd.DataFrame({'ds': ds, 'trend': yhat, 'yhat_lower': yhat - width,
+                             'yhat_upper': yhat + width, 'yhat': yhat})
+
+
+class _FourierDesign:
+    """Построение матрицы признаков для заданных дат (общая для всех рядов одного пакета)"""
+
+    def __init__(self, ds, params, model_params, holiday_dates):
+        self.start = ds.iloc[0]
+        self.scale = max((ds.iloc[-1] - ds.iloc[0]) / pd.Timedelta(days=1), 1.0)
+        step_days = (ds.iloc[1] - ds.iloc[0]) / pd.Timedelta(days=1) if len(ds) > 1 else 1.0
+
+        n_changepoints = params["n_changepoints"]
+        self.changepoints = np.linspace(0, params["changepoint_range"], n_changepoints + 2)[1:-1]
+        # Недельная сезонность имеет смысл только для данных чаще, чем раз в неделю
+        self.weekly_order = params["weekly_fourier_order"] if (
+            model_params.get("weekly_seasonality", True) and step_days < 7) else 0
+        # Годовая сезонность - только при истории от двух лет: на одном году гармоники неотличимы
+        # от изломов тренда, и без априорных ограничений Prophet прогноз уходит в сторону
+        self.yearly_order = params["yearly_fourier_order"] if (
+            model_params.get("yearly_seasonality", True) and self.scale >= 730) else 0
+        self.holiday_dates = holiday_dates
+
+        # Индексы столбцов каждого компонента
+        n_trend = 2 + len(self.changepoints)
+        n_weekly = 2 * self.weekly_order
+        n_yearly = 2 * self.yearly_order
+        n_holidays = 1 if holiday_dates is not None else 0
+        self.slices = {
+            'trend': slice(0, n_trend),
+            'weekly': slice(n_trend, n_trend + n_weekly),
+            'yearly': slice(n_trend + n_weekly, n_trend + n_weekly + n_yearly),
+            'holidays': slice(n_trend + n_weekly + n_yearly, n_trend + n_weekly + n_yearly + n_holidays),
+        }
+
+    @staticmethod
+    def _fourier(days, period, order):
+        angles = 2 * np.pi * np.outer(days / period, np.arange(1, order + 1))
+        return np.hstack([np.sin(angles), np.cos(angles)])
+
+    def matrix(self, ds):
+        days = ((ds - pd.Timestamp('1970-01-01')) / pd.Timedelta(days=1)).to_numpy()
+        t = ((ds - self.start) / pd.Timedelta(days=1)).to_numpy() / self.scale
+
+        columns = [np.ones_like(t), t, np.maximum(0.0, t[:, None] - self.changepoints[None, :])]
+        if self.weekly_order:
+            columns.append(self._fourier(days, 7.0, self.weekly_order))
+        if self.yearly_order:
+            columns.append(self._fourier(days, 365.25, self.yearly_order))
+        if self.holiday_dates is not None:
+            columns.append(ds.dt.normalize().isin(self.holiday_dates).to_numpy(dtype='float64'))
+        return np.column_stack(columns)
+
+
+def _holiday_dates(country, ds, periods):
+    """Даты праздников страны на период истории и прогноза (None, если пакет holidays недоступен)"""
+    if not country:
+        return None
+    try:
+        import holidays
+        years = range(ds.iloc[0].year, ds.iloc[-1].year + 2 + periods // 365)
+        return pd.to_datetime(list(holidays.country_holidays(country, years=years).keys()))
+    except Exception as e:
+        print(f"⚠️ Не удалось добавить праздники: {e}")
+        return None
+
+
+def _forecast_frame(ds, X, design, coefficients, sigma, interval_scale):
+    """
+    Прогноз и компоненты для одного или нескольких рядов.
+    coefficients - вектор (один ряд) или матрица признаки × ряды; возвращается DataFrame или список.
+    """
+    single = coefficients.ndim == 1
+    B = coefficients[:, None] if single else coefficients
+    sigma = np.atleast_1d(sigma)
+
+    fitted = X @ B
+    parts = {name: X[:, part] @ B[part] for name, part in design.slices.items() if part.stop > part.start}
+    width = interval_scale[:, None] * sigma[None, :]
+
+    yhat, lower, upper = fitted, fitted - width, fitted + width
+
+    # Один конструктор на ряд: добавление столбцов по одному для тысяч рядов в разы медленнее
+    ds = ds.to_numpy()
+    frames = [pd.DataFrame({'ds': ds, **{name: values[:, i] for name, values in parts.items()},
+                            'yhat_lower': lower[:, i], 'yhat_upper': upper[:, i], 'yhat': yhat[:, i]})
+              for i in range(B.shape[1])]
+    return frames[0] if single else frames
+
+
+def fit_fourier_batch(ds, Y, config, periods):
+    """
+    Обучение моделей Фурье для всех столбцов Y (периоды × ряды) с общими датами ds
+    одной ridge-регрессией: B = (X'X + αI)⁻¹ X'Y.
+    Возвращает список (модель, прогноз на историю + periods будущих периодов).
+    """
+    params = {**DEFAULT_FAST_PARAMS, **config.get("fast_engine_params", {})}
+    model_params = config.get("model_params", {})
+    freq = config.get("forecast_params", {}).get("freq", 'D')
+
+    design = _FourierDesign(ds, params, model_params, _holiday_dates(config.get("country_holidays"), ds, periods))
+    X = design.matrix(ds)
+
+    penalty = params["ridge_alpha"] * np.eye(X.shape[1])
+    penalty[0, 0] = 0.0  # Свободный член не штрафуется
+    B = np.linalg.solve(X.T @ X + penalty, X.T @ Y)
+    sigma = np.sqrt(np.mean((Y - X @ B) ** 2, axis=0))
+
+    interval_width = params["interval_width"]
+    models = []
+    for i in range(Y.shape[1]):
+        history = pd.DataFrame({'ds': ds.to_numpy(), 'y': Y[:, i]})
+        models.append(FourierForecaster(history, freq, interval_width, design, B[:, i], sigma[i]))
+
+    future_ds = pd.to_datetime(models[0].make_future_dataframe(periods, freq)['ds'])
+    forecasts = _forecast_frame(future_ds, design.matrix(future_ds), design, B, sigma,
+                                models[0]._interval(future_ds, 1.0))
+    return list(zip(models, forecasts))
+
+
+def fit_seasonal_naive_batch(ds, Y, config, periods):
+    """Сезонные наивные модели для всех столбцов Y (сезон - неделя для дневных данных, иначе 1 период)"""
+    params = {**DEFAULT_FAST_PARAMS, **config.get("fast_engine_params", {})}
+    freq = config.get("forecast_params", {}).get("freq", 'D')
+    step_days = (ds.iloc[1] - ds.iloc[0]) / pd.Timedelta(days=1)
+    season_length = 7 if step_days < 7 and len(ds) > 7 else 1
+
+    errors = Y[season_length:] - Y[:-season_length]
+    sigma = np.sqrt(np.mean(errors ** 2, axis=0))
+
+    results = []
+    for i in range(Y.shape[1]):
+        history = pd.DataFrame({'ds': ds.to_numpy(), 'y': Y[:, i]})
+        model = SeasonalNaiveForecaster(history, freq, params["interval_width"], season_length, sigma[i])
+        results.append((model, model.predict(model.make_future_dataframe(periods, freq))))
+    return results
+
+
+# Быстрые движки прогноза: имя → функция обучения пакета рядов (ds, Y, config, periods)
+FAST_ENGINES = {
+    'fourier': fit_fourier_batch,
+    'seasonal_naive': fit_seasonal_naive_batch,
+}
+
+
+def fit_forecast_batch(tasks, config):
+    """
+    Обучение быстрых моделей для набора рядов [(ключ, df_prophet), ...] движком config["engine"].
+    Ряды с одинаковыми датами обучаются одной матричной операцией.
+    Возвращает {ключ: (модель, прогноз)} - прогноз в формате Prophet (ds, yhat, yhat_lower, yhat_upper, ...).
+    """
+    engine = config.get("engine", 'prophet')
+    if engine not in FAST_ENGINES:
+        raise ValueError(f"Неизвестный движок прогноза: '{engine}'. Доступны: {['prophet'] + list(FAST_ENGINES)}")
+
+    periods = config.get("forecast_params", {}).get("periods", 30)
+
+    # Пакеты рядов с одинаковыми датами
+    batches = {}
+    for key, df_prophet in tasks:
+        ds = df_prophet['ds']
+        batches.setdefault((ds.iloc[0], ds.iloc[-1], len(ds)), []).append((key, df_prophet))
+
+    results = {}
+    for batch in batches.values():
+        ds = pd.to_datetime(batch[0][1]['ds']).reset_index(drop=True)
+        Y = np.column_stack([df_prophet['y'].to_numpy(dtype='float64') for _, df_prophet in batch])
+        for (key, _), fitted in zip(batch, FAST_ENGINES[engine](ds, Y, config, periods)):
+            results[key] = fitted
+    return results
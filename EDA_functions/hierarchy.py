@@ -0,0 +1,305 @@
+import numpy as np
+import pandas as pd
+
+from config import DATA_FILE_PATH, PROPHET_CONFIG, PARALLEL_CONFIG, HIERARCHY_CONFIG
+from model_forecast import _fit_series_models
+from forecast_store import save_forecasts
+from report import show_figure
+
+# Название верхнего узла иерархии (сумма всех рядов)
+TOTAL_LABEL = 'Итого'
+# Методы согласования прогнозов
+RECONCILIATION_METHODS = ['bottom_up', 'ols', 'wls_struct', 'wls_var', 'mint_shrink']
+
+
+def _node_label(key):
+    """Название узла иерархии: значения уровней через ' / ' (например, 'Москва / Электроника')"""
+    key = key if isinstance(key, tuple) else (key,)
+    return ' / '.join(str(value) for value in key)
+
+
+def _aggregate_levels(leaf_table, levels):
+    """
+    Ряды всех узлов иерархии из рядов листьев (столбцы - MultiIndex по levels).
+    Порядок столбцов: итог, затем узлы первого уровня, второго и т.д. до листьев.
+    """
+    frames = [leaf_table.sum(axis=1).rename(TOTAL_LABEL).to_frame()]
+    for depth in range(1, len(levels) + 1):
+        part = leaf_table.T.groupby(level=list(range(depth)), observed=True, sort=True).sum().T
+        part.columns = [_node_label(key) for key in part.columns]
+        frames.append(part)
+    return pd.concat(frames, axis=1)
+
+
+def build_hierarchy(df, levels=None, target_column='Сумма', freq=None):
+    """
+    Построение иерархии рядов (например, Регион → Категория → Продукт) одной группировкой по (уровни, день).
+    Все ряды приводятся к общему диапазону дат, чтобы сумма рядов уровня совпадала с рядом уровня выше.
+    Возвращает словарь:
+        'levels' - уровни иерархии;
+        'series' - DataFrame (ds × узлы) с фактическими значениями всех узлов;
+        'node_depth' - {узел: глубина} (0 - итог, len(levels) - листья);
+        'leaves' - названия листьев.
+    """
+    levels = list(levels or HIERARCHY_CONFIG.get("levels", []))
+    if df is None or not levels or any(col not in df.columns for col in ['Дата продажи', target_column] + levels):
+        print(f"❌ Недостаточно данных для иерархии {' → '.join(levels)}")
+        return None
+
+    if freq is None:
+        freq = PROPHET_CONFIG.get("forecast_params", {}).get("freq", 'D')
+
+    dates = df['Дата продажи']
+    valid = dates.notna()
+    for level in levels:
+        valid &= df[level].notna()
+    if not valid.all():
+        df, dates = df[valid], dates[valid]
+
+    keys = [df[level] for level in levels] + [dates.dt.normalize().rename('ds')]
+    totals = df[target_column].groupby(keys, observed=True, sort=False).sum()
+    if len(totals) == 0:
+        print(f"❌ Недостаточно данных для иерархии {' → '.join(levels)}")
+        return None
+
+    # Листья: таблица периоды × комбинации уровней, пропущенные периоды - нули
+    leaf_table = totals.unstack(levels, fill_value=0).sort_index().sort_index(axis=1)
+    leaf_table = leaf_table.resample(freq).sum().astype('float64')
+
+    series = _aggregate_levels(leaf_table, levels)
+    node_depth = {TOTAL_LABEL: 0}
+    for depth in range(1, len(levels) + 1):
+        for key in leaf_table.columns.droplevel(list(range(depth, len(levels)))).unique():
+            node_depth[_node_label(key)] = depth
+
+    print(f"✅ Иерархия {' → '.join(levels)}: {len(series.columns)} рядов, "
+          f"из них {leaf_table.shape[1]} листьев, {len(series)} периодов")
+    return {
+        'levels': levels,
+        'series': series,
+        'leaf_table': leaf_table,
+        'node_depth': node_depth,
+        'leaves': [_node_label(key) for key in leaf_table.columns],
+    }
+
+
+def summing_matrix(hierarchy):
+    """Суммирующая матрица S (узлы × листья): ряд узла = S @ ряды листьев"""
+    leaf_table = hierarchy['leaf_table']
+    identity = pd.DataFrame(np.eye(leaf_table.shape[1]), columns=leaf_table.columns)
+    return _aggregate_levels(identity, hierarchy['levels']).to_numpy().T
+
+
+def _shrunk_covariance(residuals):
+    """
+    Ковариация ошибок с усадкой к диагонали (Schäfer & Strimmer), как в MinT(shrink).
+    residuals - массив периоды × узлы.
+    """
+    n = residuals.shape[0]
+    centered = residuals - residuals.mean(axis=0)
+    covariance = centered.T @ centered / n
+
+    variance = np.diag(covariance).copy()
+    # Ряды без ошибок (например, нулевые) не должны делать матрицу вырожденной
+    variance[variance <= 0] = variance[variance > 0].min() * 1e-6 if (variance > 0).any() else 1.0
+    std = np.sqrt(variance)
+
+    scaled = centered / std
+    correlation = scaled.T @ scaled / n
+    np.fill_diagonal(correlation, 0)
+    correlation_var = (scaled ** 2).T @ (scaled ** 2) / (n * (n - 1)) - correlation ** 2 / (n - 1)
+    np.fill_diagonal(correlation_var, 0)
+
+    denominator = (correlation ** 2).sum()
+    shrinkage = min(max(correlation_var.sum() / denominator, 0.0), 1.0) if denominator > 0 else 1.0
+
+    target = np.diag(variance)
+    shrunk = shrinkage * target + (1 - shrinkage) * (correlation * np.outer(std, std) + target)
+    return shrunk, shrinkage
+
+
+def reconcile_forecasts(base_forecasts, S, method='mint_shrink', residuals=None):
+    """
+    Согласование прогнозов: y_rec = S @ G @ y_base, где G = (S' W⁻¹ S)⁻¹ S' W⁻¹.
+    base_forecasts - массив периоды × узлы (порядок узлов как в строках S).
+    Методы (W - ковариация ошибок базовых прогнозов):
+        'bottom_up' - только прогнозы листьев, суммируются вверх;
+        'ols' - W = I;
+        'wls_struct' - W = diag(число листьев в узле);
+        'wls_var' - W = diag(дисперсия ошибок на истории);
+        'mint_shrink' - W = ковариация ошибок с усадкой к диагонали.
+    """
+    n_nodes, n_leaves = S.shape
+
+    if method == 'bottom_up':
+        return base_forecasts[:, n_nodes - n_leaves:] @ S.T
+
+    if method == 'ols':
+        W = np.eye(n_nodes)
+    elif method == 'wls_struct':
+        W = np.diag(S.sum(axis=1))
+    elif method in ('wls_var', 'mint_shrink'):
+        if residuals is None:
+            raise ValueError(f"Для метода '{method}' нужны ошибки базовых прогнозов на истории")
+        if method == 'wls_var':
+            variance = np.mean(residuals ** 2, axis=0)
+            variance[variance <= 0] = variance[variance > 0].min() * 1e-6 if (variance > 0).any() else 1.0
+            W = np.diag(variance)
+        else:
+            W, shrinkage = _shrunk_covariance(residuals)
+            print(f"📐 MinT(shrink): коэффициент усадки {shrinkage:.3f}")
+    else:
+        raise ValueError(f"Неизвестный метод согласования: '{method}'. Доступны: {RECONCILIATION_METHODS}")
+
+    W_inv_S = np.linalg.solve(W, S)
+    G = np.linalg.solve(S.T @ W_inv_S, W_inv_S.T)
+    return base_forecasts @ (S @ G).T
+
+
+def _level_mape(actual, predicted, node_depth):
+    """Средний MAPE (%) по уровням иерархии на истории (периоды с нулевыми продажами пропускаются)"""
+    result = {}
+    for depth in sorted(set(node_depth.values())):
+        nodes = [node for node, node_level in node_depth.items() if node_level == depth]
+        y = actual[nodes].to_numpy()
+        yhat = predicted[nodes].to_numpy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ape = np.where(y > 0, np.abs(y - yhat) / y * 100, np.nan)
+        result[depth] = np.nanmean(np.nanmean(ape, axis=0)) if np.isfinite(ape).any() else float('nan')
+    return result
+
+
+def forecast_hierarchy(df_clean, config=PROPHET_CONFIG, levels=None, method=None, workers=None,
+                       file_path=DATA_FILE_PATH):
+    """
+    Иерархический прогноз (по умолчанию Регион → Категория → Продукт, см. HIERARCHY_CONFIG).
+    1. Ряды всех узлов строятся одной группировкой;
+    2. Базовые модели обучаются параллельно (для 'bottom_up' - только листья);
+    3. Прогнозы согласуются, поэтому прогноз каждого узла равен сумме прогнозов его потомков.
+    Возвращает словарь с фактом ('actual'), базовыми ('base') и согласованными ('reconciled')
+    прогнозами - DataFrame (ds × узлы) - или None. file_path - файл данных df_clean (см. create_prophet_model).
+    """
+    method = method or HIERARCHY_CONFIG.get("method", 'mint_shrink')
+    if method not in RECONCILIATION_METHODS:
+        print(f"❌ Неизвестный метод согласования: '{method}'. Доступны: {RECONCILIATION_METHODS}")
+        return None
+
+    if workers is None:
+        workers = PARALLEL_CONFIG.get("forecast_workers", 0) or 0
+
+    hierarchy = build_hierarchy(df_clean, levels)
+    if hierarchy is None:
+        return None
+
+    actual = hierarchy['series']
+    if len(actual) <= 30:
+        print(f"⚠️ Недостаточно данных для прогноза: {len(actual)} точек (требуется > 30)")
+        return None
+
+    # 1. Базовые прогнозы: для bottom_up достаточно листьев
+    nodes = hierarchy['leaves'] if method == 'bottom_up' else list(actual.columns)
+    tasks = [(node, pd.DataFrame({'ds': actual.index, 'y': actual[node].to_numpy()})) for node in nodes]
+
+    series_prefix = ' → '.join(hierarchy['levels'])
+    print(f"📊 Иерархический прогноз: {len(tasks)} моделей, согласование '{method}'")
+    # Базовые прогнозы хранятся под своими ключами: под ключом узла - только согласованный прогноз
+    fitted_models = _fit_series_models(tasks, config, workers, series_prefix=f"base:{series_prefix}",
+                                       file_path=file_path)
+
+    forecast_params = config.get("forecast_params", {})
+    future_index = pd.date_range(actual.index[0], periods=len(actual) + forecast_params.get("periods", 30),
+                                 freq=forecast_params.get("freq", 'D'))
+
+    base = pd.DataFrame(0.0, index=future_index, columns=actual.columns)
+    failed = []
+    for node, df_prophet in tasks:
+        fitted, error = fitted_models.get(node, (None, None))
+        if fitted is None:
+            # Запасной прогноз: среднее за последние 30 периодов
+            failed.append(node if error is None else f"{node} ({error})")
+            base[node] = df_prophet['y'].iloc[-30:].mean()
+        else:
+            base[node] = fitted[1]['yhat'].to_numpy()
+
+    if failed:
+        print(f"⚠️ Модели не обучены для {len(failed)} рядов, используется среднее за 30 периодов: "
+              f"{', '.join(failed[:5])}{' ...' if len(failed) > 5 else ''}")
+
+    # 2. Согласование
+    S = summing_matrix(hierarchy)
+    residuals = (actual - base.loc[actual.index]).to_numpy() if method in ('wls_var', 'mint_shrink') else None
+
+    try:
+        reconciled_values = reconcile_forecasts(base.to_numpy(), S, method, residuals)
+    except np.linalg.LinAlgError as e:
+        print(f"❌ Ошибка при согласовании прогнозов: {e}")
+        return None
+    reconciled = pd.DataFrame(reconciled_values, index=base.index, columns=base.columns)
+
+    if method == 'bottom_up':
+        # Для верхних уровней базовых моделей нет - их прогноз равен сумме листьев
+        upper_nodes = [node for node in base.columns if node not in set(hierarchy['leaves'])]
+        base[upper_nodes] = reconciled[upper_nodes]
+
+    # Согласованные прогнозы - последний запуск каждого узла в хранилище прогнозов
+    reconciled_forecasts = {f"{series_prefix}={node}": pd.DataFrame({'ds': reconciled.index,
+                                                                      'yhat': reconciled[node].to_numpy()})
+                            for node in reconciled.columns}
+    save_forecasts(reconciled_forecasts, model_version=f"reconciled:{method}", history_end=actual.index[-1],
+                   file_path=file_path)
+
+    results = {
+        'method': method,
+        'levels': hierarchy['levels'],
+        'node_depth': hierarchy['node_depth'],
+        'actual': actual,
+        'base': base,
+        'reconciled': reconciled,
+    }
+    print_hierarchy_summary(results)
+    plot_hierarchy_forecast(results)
+    return results
+
+
+def print_hierarchy_summary(results):
+    """Сводка по уровням: число рядов, точность и согласованность прогнозов"""
+    actual, base, reconciled = results['actual'], results['base'], results['reconciled']
+    node_depth = results['node_depth']
+    level_names = [TOTAL_LABEL] + [' / '.join(results['levels'][:depth]) for depth in range(1, len(results['levels']) + 1)]
+
+    history = actual.index
+    base_mape = _level_mape(actual, base.loc[history], node_depth)
+    reconciled_mape = _level_mape(actual, reconciled.loc[history], node_depth)
+
+    print("\n" + "=" * 60)
+    print(f"🌳 ИЕРАРХИЧЕСКИЙ ПРОГНОЗ ({results['method']})")
+    print("=" * 60)
+    for depth, level_name in enumerate(level_names):
+        count = sum(1 for node_level in node_depth.values() if node_level == depth)
+        print(f"{level_name}: {count} рядов, MAPE базовый {base_mape[depth]:.1f}% → "
+              f"согласованный {reconciled_mape[depth]:.1f}%")
+
+    leaves = [node for node, depth in node_depth.items() if depth == len(results['levels'])]
+    base_gap = (base[TOTAL_LABEL] - base[leaves].sum(axis=1)).abs().max()
+    reconciled_gap = (reconciled[TOTAL_LABEL] - reconciled[leaves].sum(axis=1)).abs().max()
+    print(f"Расхождение итога и суммы листьев: {base_gap:,.2f} → {reconciled_gap:,.2f}")
+
+
+def plot_hierarchy_forecast(results):
+    """График итогового ряда: факт, сумма базовых прогнозов и согласованный прогноз"""
+    import matplotlib.pyplot as plt
+    actual, base, reconciled = results['actual'], results['base'], results['reconciled']
+
+    plt.figure(figsize=(14, 7))
+    plt.plot(actual.index, actual[TOTAL_LABEL], 'k.', markersize=3, label='Факт')
+    plt.plot(base.index, base[TOTAL_LABEL], color='orange', alpha=0.7, label='Базовый прогноз итога')
+    plt.plot(reconciled.index, reconciled[TOTAL_LABEL], color='blue', linewidth=2, label='Согласованный прогноз')
+    plt.axvline(actual.index[-1], color='red', linestyle='--', alpha=0.7, label='Начало прогноза')
+    plt.title(f"Иерархический прогноз: {' → '.join(results['levels'])} ({results['method']})",
+              fontsize=16, fontweight='bold')
+    plt.xlabel('Дата')
+    plt.ylabel('Выручка, руб.')
+    plt.legend()
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+    show_figure('hierarchy_forecast')
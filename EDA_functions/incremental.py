@@ -0,0 +1,237 @@
+# Инкрементальный пересчет статистики и сводного куба для файла, в который каждый день дописываются продажи.
+# Состояние (базовая таблица куба по месяцам, накопитель статистики, watermark - последняя учтенная
+# 'Дата продажи') хранится на диске. Каждый запуск читает только строки позже watermark, очищает их
+# и добавляет в состояние; перезаписываются только затронутые месяцы.
+# Строки с датой не позже watermark, добавленные задним числом, не учитываются - для них нужен rebuild=True.
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime
+
+import pandas as pd
+
+from config import DATA_FILE_PATH, CLEANING_CONFIG, DTYPE_CONFIG, STATS_CONFIG, STREAMING_CONFIG, INCREMENTAL_CONFIG
+from read_and_clean import iter_data_chunks, iter_clean_chunks, _source_format, _source_id
+from aggregates import _cube_base, build_aggregate_cube
+from basic_stats import StatsAccumulator
+from profiling import stage
+
+STATE_VERSION = 2
+DATE_COLUMN = 'Дата продажи'
+VALUE_COLUMNS = ['rows', 'revenue', 'revenue_count', 'quantity']
+
+
+def _state_dir(file_path):
+    """
+    Папка состояния файла данных. Ключ - путь к файлу и настройки, от которых зависит результат
+    (очистка, типы, метод подсчета уникальных значений): после их изменения состояние строится заново.
+    """
+    settings = json.dumps([os.path.abspath(file_path), CLEANING_CONFIG, DTYPE_CONFIG,
+                           STATS_CONFIG.get("unique_method"), STATS_CONFIG.get("hll_precision"), STATE_VERSION],
+                          sort_keys=True, ensure_ascii=False, default=str)
+    key = hashlib.sha1(settings.encode('utf-8')).hexdigest()[:16]
+
+    state_root = INCREMENTAL_CONFIG.get("state_dir") or os.path.join(
+        os.path.dirname(os.path.abspath(file_path)), '.cache', 'incremental')
+    # Префикс до ключа - имя и хэш пути файла: при очистке удаляются только состояния этого же файла
+    return os.path.join(state_root, f"{_source_id(file_path)}_{key}")
+
+
+def _load_state(state_dir):
+    """Описание состояния (state.json) или None, если состояния нет или оно повреждено"""
+    try:
+        with open(os.path.join(state_dir, 'state.json'), 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get('version') != STATE_VERSION:
+        return None
+    state['dir'] = state_dir
+    state['watermark'] = pd.Timestamp(state['watermark']) if state.get('watermark') else None
+    return state
+
+
+def _new_state(state_dir):
+    return {'version': STATE_VERSION, 'dir': state_dir, 'generation': 0, 'watermark': None, 'rows': 0,
+            'columns': None, 'stats': None, 'partitions': {}, 'updated_at': None}
+
+
+def load_state_stats(state):
+    """Накопитель статистики из состояния"""
+    if not state.get('stats'):
+        return StatsAccumulator()
+    return pd.read_pickle(os.path.join(state['dir'], state['stats']))
+
+
+def _read_partition(state, month):
+    return pd.read_parquet(os.path.join(state['dir'], state['partitions'][month]))
+
+
+def _merge_bases(bases):
+    """Объединение базовых таблиц куба: суммы по совпадающим ключам"""
+    bases = [base for base in bases if base is not None and len(base) > 0]
+    if len(bases) <= 1:
+        return bases[0] if bases else None
+    base = pd.concat(bases, ignore_index=True)
+    keys = [col for col in base.columns if col not in VALUE_COLUMNS]
+    return base.groupby(keys, observed=True, dropna=False, sort=False).sum().reset_index()
+
+
+def _iter_new_chunks(file_path, watermark):
+    """
+    Порции исходных строк с 'Дата продажи' позже watermark.
+    Из parquet-файла с датой в формате timestamp группы строк отбираются по статистике файла (без чтения старых данных).
+    """
+    if watermark is not None and _source_format(file_path) == 'parquet':
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        dataset = ds.dataset(file_path)
+        if DATE_COLUMN in dataset.schema.names and pa.types.is_timestamp(dataset.schema.field(DATE_COLUMN).type):
+            batches = dataset.to_batches(filter=ds.field(DATE_COLUMN) > pa.scalar(watermark.to_pydatetime()),
+                                         batch_size=STREAMING_CONFIG.get("chunk_size", 100_000))
+            for batch in batches:
+                if batch.num_rows:
+                    yield batch.to_pandas()
+            return
+
+    for chunk in iter_data_chunks(file_path):
+        if watermark is not None and DATE_COLUMN in chunk.columns:
+            dates = pd.to_datetime(chunk[DATE_COLUMN], errors='coerce')
+            chunk = chunk[(dates > watermark).to_numpy()]
+        if len(chunk) > 0:
+            yield chunk
+
+
+def _save_state(state, stats, partitions):
+    """
+    Запись нового поколения состояния: сначала файлы месяцев и статистики, последним - state.json.
+    Если запись прервется, state.json указывает на предыдущее поколение целиком.
+    """
+    state_dir = state['dir']
+    os.makedirs(state_dir, exist_ok=True)
+    generation = state['generation'] + 1
+
+    for (year, month), base in partitions.items():
+        file_name = f"base_{year}_{month:02d}_{generation}.parquet"
+        base.to_parquet(os.path.join(state_dir, file_name), index=False)
+        state['partitions'][f"{year}-{month:02d}"] = file_name
+    state['stats'] = f"stats_{generation}.pkl"
+    pd.to_pickle(stats, os.path.join(state_dir, state['stats']))
+
+    state['generation'] = generation
+    state['updated_at'] = datetime.now().isoformat(timespec='seconds')
+    payload = {key: value for key, value in state.items() if key != 'dir'}
+    payload['watermark'] = state['watermark'].isoformat() if state['watermark'] is not None else None
+    tmp_path = os.path.join(state_dir, 'state.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, os.path.join(state_dir, 'state.json'))
+
+    # Файлы предыдущих поколений и состояния с другими настройками больше не нужны
+    used = set(state['partitions'].values()) | {state['stats'], 'state.json'}
+    for file_name in os.listdir(state_dir):
+        if file_name not in used:
+            os.remove(os.path.join(state_dir, file_name))
+    state_root, name = os.path.split(state_dir)
+    for other in os.listdir(state_root):
+        if other != name and other.rsplit('_', 1)[0] == name.rsplit('_', 1)[0]:
+            shutil.rmtree(os.path.join(state_root, other), ignore_errors=True)
+
+
+@stage
+def update_incremental_state(file_path=DATA_FILE_PATH, rebuild=False):
+    """
+    Учет новых строк файла (с 'Дата продажи' позже сохраненного watermark) в сохраненном состоянии.
+    rebuild=True - состояние строится заново по всему файлу. Возвращает описание состояния или None.
+    """
+    if not os.path.exists(file_path):
+        print(f"❌ Файл не найден: {file_path}")
+        return None
+
+    state_dir = _state_dir(file_path)
+    state = _load_state(state_dir)
+    if state is None or rebuild:
+        # Номер поколения продолжается: файлы действующего состояния не перезаписываются до замены state.json
+        generation = state['generation'] if state else 0
+        state = _new_state(state_dir)
+        state['generation'] = generation
+    else:
+        print(f"📂 Состояние загружено: {state['rows']:,} строк, данные по {state['watermark']}")
+
+    stats = load_state_stats(state)
+    new_parts = {}
+    new_rows = 0
+    watermark = state['watermark']
+
+    for chunk in iter_clean_chunks(_iter_new_chunks(file_path, state['watermark'])):
+        if DATE_COLUMN not in chunk.columns:
+            print(f"❌ Для инкрементального обновления нужен столбец '{DATE_COLUMN}'")
+            return None
+        if state['columns'] is not None and list(chunk.columns) != state['columns']:
+            print("⚠️ Изменился набор столбцов данных - состояние строится заново")
+            return update_incremental_state(file_path, rebuild=True)
+        state['columns'] = list(chunk.columns)
+        # Строки с нераспознанной датой нельзя сравнить с watermark - они не учитываются
+        chunk = chunk[chunk[DATE_COLUMN].notna()]
+
+        stats.update(chunk)
+        for month, rows in chunk.groupby(['Год', 'Месяц'], observed=True, sort=False):
+            part = _cube_base(rows)
+            if part is not None:
+                new_parts.setdefault(tuple(int(value) for value in month), []).append(part)
+
+        new_rows += len(chunk)
+        chunk_max = chunk[DATE_COLUMN].max()
+        if pd.notna(chunk_max) and (watermark is None or chunk_max > watermark):
+            watermark = chunk_max
+
+    if new_rows == 0:
+        print(f"ℹ️ Новых строк нет (данные по {state['watermark']})")
+        return state
+
+    # Сливаются только месяцы, в которые попали новые строки
+    partitions = {}
+    for (year, month), parts in new_parts.items():
+        key = f"{year}-{month:02d}"
+        stored = _read_partition(state, key) if key in state['partitions'] else None
+        partitions[(year, month)] = _merge_bases([stored, *parts])
+
+    state['watermark'] = watermark
+    state['rows'] += new_rows
+    _save_state(state, stats, partitions)
+    print(f"✅ Учтено новых строк: {new_rows:,} (месяцев обновлено: {len(partitions)}), данные по {watermark}")
+    return state
+
+
+def load_incremental_cube(state):
+    """Сводный куб из сохраненного состояния (см. aggregates.build_aggregate_cube)"""
+    if not state['partitions']:
+        return {}
+    # Разрезы суммируются по ключам при свертке, поэтому части месяцев просто склеиваются
+    base = pd.concat([_read_partition(state, month) for month in sorted(state['partitions'])], ignore_index=True)
+    return build_aggregate_cube(base, base=base)
+
+
+def run_incremental(file_path=DATA_FILE_PATH, rebuild=False, plots=False):
+    """
+    Обновление состояния и вывод основной статистики по всем данным файла; plots=True - графики анализа
+    по сводному кубу. Возвращает (статистика, куб) или None.
+    """
+    from basic_stats import print_basic_stats
+
+    state = update_incremental_state(file_path, rebuild=rebuild)
+    if state is None or not state['partitions']:
+        return None
+
+    stats = load_state_stats(state).result()
+    print_basic_stats(stats)
+
+    cube = load_incremental_cube(state)
+    if plots:
+        from analyze import plot_all_analysis
+
+        # Графики берут все разрезы из куба, от данных нужен только набор столбцов
+        plot_all_analysis(pd.DataFrame(columns=state['columns']), cube=cube)
+    return stats, cube
@@ -1,29 +1,129 @@
-import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
-from prophet import Prophet
-from prophet.plot import plot_plotly, plot_components_plotly
 import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 warnings.filterwarnings('ignore')
 
 # Импортируем наши функции и конфиг
-from config import PROPHET_CONFIG
-from read_and_clean import load_data, clean_data, prepare_for_prophet
+# Prophet и matplotlib импортируются внутри функций: импорт модуля не загружает тяжелые библиотеки,
+# пока не запрошено обучение модели или построение графика
+from config import DATA_FILE_PATH, PROPHET_CONFIG, PARALLEL_CONFIG, CACHE_CONFIG
+from read_and_clean import load_data, clean_data, prepare_for_prophet, prepare_series_by_group
 from analyze import plot_all_analysis
+from report import show_figure, output_path
+from model_store import (model_cache_key, load_cached_model, save_model,
+                         load_latest_model, save_latest, warm_start_params)
+from forecasters import FastForecaster, fit_forecast_batch
+from forecast_store import save_forecast, save_forecasts
+from profiling import stage
 
 
-def create_prophet_model(df_prophet, config=PROPHET_CONFIG):
+@stage
+def create_prophet_model(df_prophet, config=PROPHET_CONFIG, use_cache=None, series_key=None, file_path=DATA_FILE_PATH):
     """
     Создает и обучает модель Prophet на основе конфигурации.
+    Обученные модели сохраняются в хранилище (model_store): если ни ряд, ни параметры
+    обучения не изменились, модель загружается оттуда и сразу строится прогноз.
+    Если задан series_key (например, 'total'), то при дописывании новых дней в ряд
+    обучение стартует с параметров предыдущей модели этого ряда (warm start),
+    а сохраненный прогноз ряда обновляется на месте. Прогноз ряда с series_key также
+    записывается в хранилище прогнозов (forecast_store) для дашбордов.
+    При config["engine"] != 'prophet' вместо Prophet используется быстрый движок из forecasters.py
+    ('fourier', 'seasonal_naive') - прогноз возвращается в том же формате.
+    file_path - файл данных, из которого построен ряд: модели хранятся рядом с ним, а предыдущая
+    модель ряда для warm start ищется только среди моделей этого файла.
     """
 
     if df_prophet is None:
         print("❌ Нет данных для обучения модели")
         return None, None
 
-    model_params = config.get("model_params", {}).copy()  # Делаем копию, чтобы не менять оригинал
+    engine = config.get("engine", 'prophet')
+    if engine != 'prophet':
+        print(f"⚡ Быстрый прогноз (движок '{engine}')...")
+        model, forecast = fit_forecast_batch([(None, df_prophet)], config)[None]
+        if series_key is not None:
+            save_forecast(series_key, forecast, model_version=engine, history_end=df_prophet['ds'].max(),
+                          file_path=file_path)
+        return model, forecast
+
     forecast_params = config.get("forecast_params", {})
 
+    if use_cache is None:
+        use_cache = CACHE_CONFIG.get("model_cache", False)
+
+    cache_key = model_cache_key(df_prophet, config) if use_cache else None
+    model = load_cached_model(cache_key, file_path, series_key) if cache_key else None
+
+    if model is not None:
+        print("✅ Модель Prophet загружена из кэша, обучение пропущено")
+    else:
+        init = None
+        if series_key is not None and use_cache and CACHE_CONFIG.get("warm_start", False):
+            init = _warm_start_init(series_key, df_prophet, config, file_path)
+
+        try:
+            model = _fit_prophet(df_prophet, config, init=init)
+        except Exception as e:
+            if init is None:
+                raise
+            # Например, изменилось число сезонных/праздничных признаков - обучаем с нуля
+            print(f"⚠️ Warm start не удался ({e}), обучаю модель с нуля")
+            model = _fit_prophet(df_prophet, config)
+
+        if cache_key:
+            save_model(model, cache_key, file_path, series_key)
+
+    # 5. Создание датафрейма для будущего
+    periods = forecast_params.get("periods", 30)
+    freq = forecast_params.get("freq", 'D')
+
+    future = model.make_future_dataframe(periods=periods, freq=freq)
+
+    # 6. Построение прогноза
+    print("🔮 Строю прогноз...")
+    forecast = model.predict(future)
+
+    if series_key is not None and use_cache:
+        save_latest(series_key, config, model, forecast, file_path)
+
+    if series_key is not None:
+        save_forecast(series_key, forecast, model_version=f"prophet:{cache_key}" if cache_key else 'prophet',
+                      history_end=df_prophet['ds'].max(), file_path=file_path)
+
+    return model, forecast
+
+
+def _warm_start_init(series_key, df_prophet, config, file_path=DATA_FILE_PATH):
+    """
+    Начальные значения для обучения по предыдущей модели ряда.
+    Используются, только если ряд был продолжен: история предыдущей модели совпадает с началом нового ряда
+    по датам и значениям (исправленные задним числом продажи - повод обучить модель с нуля).
+    """
+    previous_model = load_latest_model(series_key, config, file_path)
+    if previous_model is None or previous_model.history is None:
+        return None
+
+    # Prophet хранит в истории только строки с известным y, упорядоченные по дате
+    previous_history = previous_model.history
+    history = df_prophet[df_prophet['y'].notna()].sort_values('ds')
+    n = len(previous_history)
+    if (n >= len(history)
+            or not np.array_equal(previous_history['ds'].to_numpy(), history['ds'].to_numpy()[:n])
+            or not np.allclose(previous_history['y'].to_numpy(dtype=float), history['y'].to_numpy(dtype=float)[:n])):
+        return None
+
+    print(f"♻️ Warm start: дообучение с параметров предыдущей модели "
+          f"(+{(df_prophet['ds'].max() - previous_history['ds'].max()).days} дн.)")
+    return warm_start_params(previous_model)
+
+
+def _fit_prophet(df_prophet, config, init=None):
+    """Инициализация и обучение модели Prophet по конфигурации (init - начальные значения параметров)"""
+    from prophet import Prophet
+    model_params = config.get("model_params", {}).copy()  # Делаем копию, чтобы не менять оригинал
+
     # 1. Инициализация модели с параметрами из конфига
     model = Prophet(**model_params)
 
@@ -55,23 +155,18 @@ def create_prophet_model(df_prophet, config=PROPHET_CONFIG):
 
     # 4. Обучение модели
     print("🔄 Обучаю модель Prophet...")
-    model.fit(df_prophet)
+    if init is not None:
+        model.fit(df_prophet, init=init)
+    else:
+        model.fit(df_prophet)
 
-    # 5. Создание датафрейма для будущего
-    periods = forecast_params.get("periods", 30)
-    freq = forecast_params.get("freq", 'D')
-
-    future = model.make_future_dataframe(periods=periods, freq=freq)
-
-    # 6. Построение прогноза
-    print("🔮 Строю прогноз...")
-    forecast = model.predict(future)
-
-    return model, forecast
+    return model
 
 
+@stage
 def plot_prophet_forecast(model, forecast, df_prophet=None):
     """Визуализация результатов прогноза Prophet"""
+    import matplotlib.pyplot as plt
     if model is None or forecast is None:
         return
 
@@ -90,13 +185,13 @@ def plot_prophet_forecast(model, forecast, df_prophet=None):
     plt.ylabel('Выручка')
     plt.grid(True, alpha=0.3)
     plt.tight_layout()
-    plt.show()
+    show_figure('prophet_forecast')
 
     # График 2: Компоненты прогноза
     fig2 = model.plot_components(forecast)
     plt.suptitle('Компоненты прогноза: тренд и сезонность', fontsize=16, fontweight='bold')
     plt.tight_layout()
-    plt.show()
+    show_figure('prophet_components')
 
     # Выводим статистику прогноза
     print("\n" + "=" * 50)
@@ -117,6 +212,7 @@ def plot_prophet_forecast(model, forecast, df_prophet=None):
     total_forecast = future_forecast['yhat'].sum()
     print(f"\n💰 Суммарный прогноз на {len(future_forecast)} дней: {total_forecast:,.0f} руб.")
 
+@stage
 def run_full_analysis():
     """
     Запускает полный анализ: EDA + прогнозирование
@@ -155,7 +251,7 @@ def run_full_analysis():
     print("\n" + "=" * 60)
     print("ЭТАП 3: ПОСТРОЕНИЕ И ОЦЕНКА МОДЕЛИ PROPHET")
     print("=" * 60)
-    model, forecast = create_prophet_model(df_prophet)
+    model, forecast = create_prophet_model(df_prophet, series_key='total')
 
     if model and forecast is not None:
         # Визуализация результатов
@@ -166,27 +262,30 @@ def run_full_analysis():
 
         print("\n✅ Прогнозирование завершено успешно!")
 
-        # Дополнительно: интерактивные графики
-        try:
-            import plotly.offline as py
-            print("\n🌐 Генерация интерактивных графиков...")
-            fig_plotly = plot_plotly(model, forecast)
-            fig_components = plot_components_plotly(model, forecast)
+        # Дополнительно: интерактивные графики (только для моделей Prophet)
+        if not isinstance(model, FastForecaster):
+            try:
+                import plotly.offline as py
+                from prophet.plot import plot_plotly, plot_components_plotly
+                print("\n🌐 Генерация интерактивных графиков...")
+                fig_plotly = plot_plotly(model, forecast)
+                fig_components = plot_components_plotly(model, forecast)
 
-            # Сохранение в HTML файлы
-            py.plot(fig_plotly, filename='prophet_forecast.html', auto_open=False)
-            py.plot(fig_components, filename='prophet_components.html', auto_open=False)
-            print("💾 Интерактивные графики сохранены как 'prophet_forecast.html' и 'prophet_components.html'")
+                # Сохранение в HTML файлы
+                py.plot(fig_plotly, filename=output_path('prophet_forecast.html'), auto_open=False)
+                py.plot(fig_components, filename=output_path('prophet_components.html'), auto_open=False)
+                print("💾 Интерактивные графики сохранены как 'prophet_forecast.html' и 'prophet_components.html'")
 
-        except ImportError:
-            py = None
-            print("ℹ️  Для интерактивных графиков установите plotly: `pip install plotly`")
+            except ImportError:
+                py = None
+                print("ℹ️  Для интерактивных графиков установите plotly: `pip install plotly`")
 
         return model, forecast, df_clean, mape
 
     return None, None, df_clean, None
 
 
+@stage
 def run_only_forecast():
     """
     Запускает только прогнозирование без EDA
@@ -208,7 +307,7 @@ def run_only_forecast():
         print("❌ Недостаточно данных для построения прогноза")
         return None, None, None
 
-    model, forecast = create_prophet_model(df_prophet)
+    model, forecast = create_prophet_model(df_prophet, series_key='total')
 
     if model and forecast is not None:
         plot_prophet_forecast(model, forecast, df_prophet)
@@ -218,75 +317,158 @@ def run_only_forecast():
     return None, None, None
 
 
-def forecast_by_category(df_clean, config=PROPHET_CONFIG):
+def _fit_series_model(key, df_prophet, config, series_prefix=None, file_path=DATA_FILE_PATH):
     """
-    Прогноз продаж по отдельным категориям товаров
-    Строит отдельную модель Prophet для каждой категории
+    Обучение модели и оценка качества для одного ряда.
+    Выполняется в процессе пула, поэтому ошибки возвращаются, а не выбрасываются.
     """
-    if 'Категория' not in df_clean.columns:
-        print("❌ Отсутствует столбец 'Категория'")
-        return {}
+    try:
+        series_key = f"{series_prefix}={key}" if series_prefix else None
+        model, forecast = create_prophet_model(df_prophet, config, series_key=series_key, file_path=file_path)
+        if model is None or forecast is None:
+            return key, None, None
+        mape = evaluate_prophet_model(model, forecast, df_prophet)
+        return key, (model, forecast, mape), None
+    except Exception as e:
+        return key, None, str(e)
+
+
+def _fit_series_models(tasks, config, workers=0, series_prefix=None, file_path=DATA_FILE_PATH):
+    """
+    Обучение моделей для набора рядов [(ключ, df_prophet), ...].
+    series_prefix - имя измерения, из которого строится ключ ряда для warm start (например, 'Категория').
+    При workers > 0 модели обучаются в пуле процессов; ошибка одного ряда не влияет на остальные.
+    Возвращает {ключ: (результат или None, текст ошибки или None)}.
+    """
+    engine = config.get("engine", 'prophet')
+    if engine != 'prophet':
+        return _fit_fast_models(tasks, config, series_prefix, file_path)
+
+    if workers <= 0 or len(tasks) <= 1:
+        return {key: (fitted, error) for key, fitted, error in
+                (_fit_series_model(key, df_prophet, config, series_prefix, file_path)
+                 for key, df_prophet in tasks)}
+
+    print(f"⚙️ Обучение {len(tasks)} моделей в {min(workers, len(tasks))} процессах...")
+    fitted_models = {}
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        futures = {pool.submit(_fit_series_model, key, df_prophet, config, series_prefix, file_path): key
+                   for key, df_prophet in tasks}
+        for future in as_completed(futures):
+            try:
+                key, fitted, error = future.result()
+            except Exception as e:
+                key, fitted, error = futures[future], None, str(e)
+            fitted_models[key] = (fitted, error)
+    return fitted_models
 
-    categories = df_clean['Категория'].unique()
-    print(f"📊 Прогнозирование для {len(categories)} категорий")
+
+def _fit_fast_models(tasks, config, series_prefix=None, file_path=DATA_FILE_PATH):
+    """
+    Обучение быстрых моделей (config["engine"] != 'prophet') для всех рядов сразу:
+    ряды с одинаковыми датами обучаются одной матричной операцией, пул процессов не нужен.
+    При заданном series_prefix прогнозы записываются в хранилище одной транзакцией.
+    """
+    print(f"⚡ Быстрое обучение {len(tasks)} моделей (движок '{config.get('engine')}')...")
+    try:
+        fitted_models = fit_forecast_batch(tasks, config)
+    except Exception as e:
+        return {key: (None, str(e)) for key, _ in tasks}
 
     results = {}
+    for key, df_prophet in tasks:
+        model, forecast = fitted_models[key]
+        results[key] = ((model, forecast, evaluate_prophet_model(model, forecast, df_prophet)), None)
+
+    if series_prefix:
+        save_forecasts({f"{series_prefix}={key}": fitted_models[key][1] for key, _ in tasks},
+                       model_version=config.get('engine'),
+                       history_end={f"{series_prefix}={key}": df_prophet['ds'].max() for key, df_prophet in tasks},
+                       file_path=file_path)
+    return results
 
-    for category in categories:
-        print(f"\n🔍 Анализируем категорию: {category}")
 
-        # Фильтруем данные по категории
-        df_category = df_clean[df_clean['Категория'] == category]
+@stage
+def forecast_by_category(df_clean, config=PROPHET_CONFIG, workers=None, group_column='Категория',
+                         file_path=DATA_FILE_PATH):
+    """
+    Прогноз продаж по отдельным категориям товаров
+    Строит отдельную модель Prophet для каждой категории.
+    Вместо категории можно прогнозировать по другому измерению: group_column='Регион', 'Продукт', 'Отрасль'.
+    Ряды всех групп готовятся одной группировкой (prepare_series_by_group).
+    Модели обучаются в пуле из workers процессов (по умолчанию PARALLEL_CONFIG["forecast_workers"]),
+    графики строятся в основном процессе. file_path - файл данных df_clean (см. create_prophet_model).
+    """
+    import matplotlib.pyplot as plt
+    if group_column not in df_clean.columns:
+        print(f"❌ Отсутствует столбец '{group_column}'")
+        return {}
 
-        # Подготавливаем данные для Prophet
-        df_prophet = prepare_for_prophet(df_category)
+    if workers is None:
+        workers = PARALLEL_CONFIG.get("forecast_workers", 0) or 0
 
-        # Проверяем, достаточно ли данных для прогноза
-        if df_prophet is not None and len(df_prophet) > 30:
-            try:
-                # Создаем и обучаем модель для категории
-                model, forecast = create_prophet_model(df_prophet, config)
-
-                if model and forecast is not None:
-                    # Оцениваем качество прогноза
-                    mape = evaluate_prophet_model(model, forecast, df_prophet)
-
-                    # Сохраняем результаты
-                    results[category] = {
-                        'model': model,
-                        'forecast': forecast,
-                        'last_actual_value': df_prophet['y'].iloc[-1] if len(df_prophet) > 0 else 0,
-                        'data_points': len(df_prophet),
-                        'mape': mape,
-                        'df_prophet': df_prophet
-                    }
-
-                    # Визуализируем прогноз для категории
-                    plt.figure(figsize=(12, 6))
-                    model.plot(forecast)
-                    plt.title(f'Прогноз продаж для категории: {category}\nMAPE: {mape:.1f}%',
-                              fontsize=14, fontweight='bold')
-                    plt.xlabel('Дата')
-                    plt.ylabel('Выручка, руб.')
-                    plt.grid(True, alpha=0.3)
-                    plt.tight_layout()
-                    plt.show()
-
-                    print(f"✅ Прогноз для '{category}' готов ({len(df_prophet)} точек данных, MAPE: {mape:.1f}%)")
+    # 1. Подготовка рядов для всех групп за один проход по данным
+    group_series = prepare_series_by_group(df_clean, group_column) or {}
+    print(f"📊 Прогнозирование для {len(group_series)} значений '{group_column}'")
 
-            except Exception as e:
-                print(f"❌ Ошибка при прогнозировании категории '{category}': {e}")
+    tasks = []
+    for category, df_prophet in group_series.items():
+        print(f"\n🔍 Анализируем {group_column}: {category}")
+
+        # Проверяем, достаточно ли данных для прогноза
+        if len(df_prophet) > 30:
+            tasks.append((category, df_prophet))
         else:
-            data_points = len(df_prophet) if df_prophet is not None else 0
-            print(f"⚠️ Недостаточно данных для категории '{category}': {data_points} точек (требуется > 30)")
+            print(f"⚠️ Недостаточно данных для '{category}': {len(df_prophet)} точек (требуется > 30)")
+
+    # 2. Обучение моделей (параллельно, если задано)
+    fitted_models = _fit_series_models(tasks, config, workers, series_prefix=group_column, file_path=file_path)
+
+    # 3. Сбор результатов и графики - в исходном порядке категорий
+    results = {}
+
+    for category, df_prophet in tasks:
+        fitted, error = fitted_models.get(category, (None, None))
+        if error is not None:
+            print(f"❌ Ошибка при прогнозировании '{category}': {error}")
+            continue
+        if fitted is None:
+            continue
+
+        model, forecast, mape = fitted
+
+        # Сохраняем результаты
+        results[category] = {
+            'model': model,
+            'forecast': forecast,
+            'last_actual_value': df_prophet['y'].iloc[-1] if len(df_prophet) > 0 else 0,
+            'data_points': len(df_prophet),
+            'mape': mape,
+            'df_prophet': df_prophet
+        }
+
+        # Визуализируем прогноз для категории
+        fig, ax = plt.subplots(figsize=(12, 6))
+        model.plot(forecast, ax=ax)
+        plt.title(f'Прогноз продаж ({group_column}): {category}\nMAPE: {mape:.1f}%',
+                  fontsize=14, fontweight='bold')
+        plt.xlabel('Дата')
+        plt.ylabel('Выручка, руб.')
+        plt.grid(True, alpha=0.3)
+        plt.tight_layout()
+        show_figure(f'forecast_{category}')
+
+        print(f"✅ Прогноз для '{category}' готов ({len(df_prophet)} точек данных, MAPE: {mape:.1f}%)")
 
     return results
 
 
+@stage
 def analyze_category_forecasts(results):
     """
     Анализ и сравнение прогнозов по категориям
     """
+    import matplotlib.pyplot as plt
     if not results:
         print("❌ Нет результатов для анализа")
         return None
@@ -379,7 +561,7 @@ def analyze_category_forecasts(results):
     plt.grid(axis='y', alpha=0.3)
 
     plt.tight_layout()
-    plt.show()
+    show_figure('category_forecasts')
 
     # Вывод рекомендаций
     print("\n💡 РЕКОМЕНДАЦИИ:")
@@ -397,6 +579,7 @@ def analyze_category_forecasts(results):
     return df_analysis
 
 
+@stage
 def evaluate_prophet_model(model, forecast, df_prophet):
     """
     Оценка качества модели Prophet на исторических данных.
@@ -0,0 +1,250 @@
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from config import DATA_FILE_PATH, CACHE_CONFIG
+from read_and_clean import _source_id
+
+# Ключи конфига, влияющие на обучение модели (forecast_params влияют только на predict)
+_FIT_CONFIG_KEYS = ['model_params', 'country_holidays', 'custom_holidays']
+
+
+def _json_default(value):
+    """Сериализация значений конфига, которые не поддерживает json (DataFrame, даты)"""
+    if isinstance(value, pd.DataFrame):
+        return value.to_json(orient='records', date_format='iso')
+    return str(value)
+
+
+def _model_cache_dir(file_path=DATA_FILE_PATH):
+    """Папка хранилища моделей: CACHE_CONFIG["model_cache_dir"] или .cache/models рядом с файлом данных file_path"""
+    return CACHE_CONFIG.get("model_cache_dir") or os.path.join(
+        os.path.dirname(os.path.abspath(file_path)), '.cache', 'models')
+
+
+def _fit_config_hash(config):
+    """Хэш параметров обучения из конфига"""
+    fit_config = {key: config.get(key) for key in _FIT_CONFIG_KEYS}
+    fit_config_json = json.dumps(fit_config, sort_keys=True, default=_json_default)
+    return hashlib.sha256(fit_config_json.encode('utf-8')).hexdigest()
+
+
+def model_cache_key(df_prophet, config):
+    """Ключ модели: хэш ряда ds/y, параметров обучения из конфига и версии Prophet"""
+    from prophet import __version__ as prophet_version
+
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(df_prophet[['ds', 'y']], index=False).values.tobytes())
+
+    digest.update(_fit_config_hash(config).encode('utf-8'))
+    digest.update(prophet_version.encode('utf-8'))
+    return digest.hexdigest()[:24]
+
+
+def _series_name(series_key):
+    """Ключ ряда в виде, допустимом в имени файла"""
+    return re.sub(r'\W+', '_', str(series_key)).strip('_') or 'series'
+
+
+def _model_path(key, file_path, series_key):
+    """
+    Файл модели. Модели ряда series_key хранятся с префиксом файла данных и ряда:
+    по нему удаляются модели ряда сверх CACHE_CONFIG["model_cache_keep"].
+    """
+    if series_key is None:
+        name = f"{key}.json"
+    else:
+        name = f"model_{_source_id(file_path)}_{_series_name(series_key)}_{key}.json"
+    return os.path.join(_model_cache_dir(file_path), name)
+
+
+def _prune_models(path):
+    """Удаление моделей того же ряда, кроме последних использованных CACHE_CONFIG["model_cache_keep"]"""
+    keep = CACHE_CONFIG.get("model_cache_keep", 3)
+    if not keep:
+        return
+
+    cache_dir, name = os.path.split(path)
+    prefix = name.rsplit('_', 1)[0]
+    models = [os.path.join(cache_dir, file_name) for file_name in os.listdir(cache_dir)
+              if file_name.endswith('.json') and file_name.rsplit('_', 1)[0] == prefix]
+    models.sort(key=os.path.getmtime, reverse=True)
+    for old_path in models[keep:]:
+        try:
+            os.remove(old_path)
+        except OSError:
+            pass
+
+
+def load_cached_model(key, file_path=DATA_FILE_PATH, series_key=None):
+    """Загрузка обученной модели из хранилища (None, если модели нет или файл поврежден)"""
+    from prophet.serialize import model_from_json
+
+    path = _model_path(key, file_path, series_key)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            model = model_from_json(f.read())
+        # Время изменения - время последнего использования: при очистке остаются нужные модели
+        os.utime(path)
+        return model
+    except Exception as e:
+        print(f"⚠️ Не удалось загрузить модель из кэша: {e}")
+        return None
+
+
+def save_model(model, key, file_path=DATA_FILE_PATH, series_key=None):
+    """
+    Сохранение обученной модели в хранилище (JSON-сериализатор Prophet).
+    Для ряда series_key хранятся только последние модели: при ежедневном дописывании данных
+    ключ меняется каждый день, и без очистки хранилище росло бы без ограничений.
+    """
+    from prophet.serialize import model_to_json
+
+    path = _model_path(key, file_path, series_key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(model_to_json(model))
+        os.replace(tmp_path, path)
+    except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        print(f"⚠️ Не удалось сохранить модель в кэш: {e}")
+        return
+
+    if series_key is not None:
+        _prune_models(path)
+
+
+def _latest_paths(series_key, config, file_path=DATA_FILE_PATH):
+    """
+    Пути к последней модели и прогнозу ряда (перезаписываются на месте при каждом обновлении).
+    Имя включает файл данных: ряды 'total' разных файлов не перезаписывают друг друга.
+    """
+    name = _series_name(series_key)
+    digest = hashlib.sha256(f"{series_key}|{_fit_config_hash(config)}".encode('utf-8')).hexdigest()[:12]
+    base = os.path.join(_model_cache_dir(file_path), f"latest_{_source_id(file_path)}_{name}_{digest}")
+    return f"{base}.json", f"{base}_forecast.parquet"
+
+
+def load_latest_model(series_key, config, file_path=DATA_FILE_PATH):
+    """Последняя обученная модель ряда series_key файла данных file_path с теми же параметрами обучения (или None)"""
+    model_path, _ = _latest_paths(series_key, config, file_path)
+    if not os.path.exists(model_path):
+        return None
+
+    from prophet.serialize import model_from_json
+    try:
+        with open(model_path, 'r', encoding='utf-8') as f:
+            return model_from_json(f.read())
+    except Exception as e:
+        print(f"⚠️ Не удалось загрузить предыдущую модель: {e}")
+        return None
+
+
+def load_latest_forecast(series_key, config, file_path=DATA_FILE_PATH):
+    """Последний сохраненный прогноз ряда series_key (или None)"""
+    _, forecast_path = _latest_paths(series_key, config, file_path)
+    if not os.path.exists(forecast_path):
+        return None
+    return pd.read_parquet(forecast_path)
+
+
+def save_latest(series_key, config, model, forecast, file_path=DATA_FILE_PATH):
+    """Обновление последней модели и прогноза ряда на месте"""
+    from prophet.serialize import model_to_json
+
+    model_path, forecast_path = _latest_paths(series_key, config, file_path)
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+
+    try:
+        tmp_path = f"{model_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(model_to_json(model))
+        os.replace(tmp_path, model_path)
+
+        tmp_path = f"{forecast_path}.{os.getpid()}.tmp"
+        forecast.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, forecast_path)
+    except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        print(f"⚠️ Не удалось обновить сохраненный прогноз '{series_key}': {e}")
+
+
+def warm_start_params(model):
+    """
+    Параметры обученной модели в виде начальных значений для нового обучения
+    (рецепт из документации Prophet: "Updating fitted models").
+    """
+    params = {}
+    for name in ['k', 'm', 'sigma_obs']:
+        if model.mcmc_samples == 0:
+            params[name] = model.params[name][0][0]
+        else:
+            params[name] = np.mean(model.params[name])
+    for name in ['delta', 'beta']:
+        if model.mcmc_samples == 0:
+            params[name] = model.params[name][0]
+        else:
+            params[name] = np.mean(model.params[name], axis=0)
+    return params
+
+
+def _backtest_cache_dir(file_path=DATA_FILE_PATH):
+    """Папка с прогнозами фолдов бэктеста (рядом с хранилищем моделей)"""
+    return os.path.join(os.path.dirname(_model_cache_dir(file_path).rstrip(os.sep)), 'backtest')
+
+
+def fold_cache_key(train, test_ds, config):
+    """Ключ прогноза фолда: обучающий ряд, даты проверки, движок и параметры обучения"""
+    engine = config.get("engine", 'prophet')
+
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(train[['ds', 'y']], index=False).values.tobytes())
+    digest.update(pd.util.hash_pandas_object(pd.Series(test_ds), index=False).values.tobytes())
+    digest.update(_fit_config_hash(config).encode('utf-8'))
+    digest.update(engine.encode('utf-8'))
+    if engine == 'prophet':
+        from prophet import __version__ as prophet_version
+        digest.update(prophet_version.encode('utf-8'))
+    else:
+        digest.update(json.dumps(config.get("fast_engine_params", {}), sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()[:24]
+
+
+def load_fold_forecast(key, file_path=DATA_FILE_PATH):
+    """Сохраненный прогноз фолда (или None)"""
+    path = os.path.join(_backtest_cache_dir(file_path), f"{key}.parquet")
+    if not os.path.exists(path):
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        print(f"⚠️ Не удалось загрузить прогноз фолда из кэша: {e}")
+        return None
+
+
+def save_fold_forecast(key, fold_forecast, file_path=DATA_FILE_PATH):
+    """Сохранение прогноза фолда, чтобы новые метрики считались без переобучения"""
+    cache_dir = _backtest_cache_dir(file_path)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    path = os.path.join(cache_dir, f"{key}.parquet")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        fold_forecast.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        print(f"⚠️ Не удалось сохранить прогноз фолда в кэш: {e}")
@@ -1,7 +1,6 @@
-from read_and_clean import *
-from analyze import *
-from basic_stats import *
-from model_forecast import *
+from read_and_clean import load_data, clean_data, prepare_for_prophet
+from analyze import setup_visuals, plot_all_analysis
+from model_forecast import run_full_analysis
 
 data = load_data()
 data = clean_data(data)
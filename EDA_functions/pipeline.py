@@ -0,0 +1,317 @@
+import hashlib
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+import pandas as pd
+
+from config import DATA_FILE_PATH, CLEANING_CONFIG, DTYPE_CONFIG, PROPHET_CONFIG, PIPELINE_CONFIG
+from model_store import _json_default
+
+
+class Stage:
+    """
+    Узел пайплайна.
+    func(*входы) вызывается с результатами узлов deps; params() - настройки, от которых зависит результат
+    (входят в ключ вместе с хэшами входов). memoize=False - результат не сохраняется (графики, вывод);
+    main_thread=True - узел выполняется в основном потоке (matplotlib не потокобезопасен).
+    """
+
+    def __init__(self, name, func, deps=(), params=None, memoize=True, main_thread=False, version=1):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.params = params
+        self.memoize = memoize
+        self.main_thread = main_thread
+        self.version = version
+
+
+def _update_digest(digest, value):
+    """Хэш содержимого результата; TypeError - для объектов без стабильного представления (модели)"""
+    if isinstance(value, pd.DataFrame):
+        digest.update(repr(list(zip(value.columns, value.dtypes.astype(str)))).encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    elif isinstance(value, pd.Series):
+        digest.update(f"{value.name}|{value.dtype}".encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(f"{value.dtype}|{value.shape}".encode('utf-8'))
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        for key in sorted(value, key=repr):
+            digest.update(repr(key).encode('utf-8'))
+            _update_digest(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}{len(value)}".encode('utf-8'))
+        for item in value:
+            _update_digest(digest, item)
+    elif value is None or isinstance(value, (str, bytes, bool, int, float, np.generic, pd.Timestamp)):
+        digest.update(repr(value).encode('utf-8'))
+    else:
+        raise TypeError(type(value).__name__)
+
+
+def content_hash(value):
+    """Хэш содержимого результата этапа или None, если объект не хэшируется (тогда используется ключ этапа)"""
+    digest = hashlib.sha256()
+    try:
+        _update_digest(digest, value)
+    except TypeError:
+        return None
+    return digest.hexdigest()[:24]
+
+
+class Pipeline:
+    """
+    Граф этапов с сохранением результатов на диск.
+    Ключ этапа - хэш его имени, версии, настроек (params) и хэшей содержимого входов. Если результат с таким
+    ключом уже есть, этап не выполняется, а сохраненный результат загружается, только когда он нужен
+    следующему этапу. Если после пересчета содержимое не изменилось, следующие этапы тоже не пересчитываются.
+    Независимые ветки выполняются одновременно в пуле потоков.
+    """
+
+    def __init__(self, stages, cache_dir=None, workers=None, memoize=None):
+        self.stages = {stage.name: stage for stage in stages}
+        self.cache_dir = cache_dir or PIPELINE_CONFIG.get("cache_dir") or os.path.join(
+            os.path.dirname(os.path.abspath(DATA_FILE_PATH)), '.cache', 'pipeline')
+        self.workers = PIPELINE_CONFIG.get("workers", 2) if workers is None else workers
+        self.memoize = PIPELINE_CONFIG.get("memoize", True) if memoize is None else memoize
+
+        for stage in stages:
+            missing = [dep for dep in stage.deps if dep not in self.stages]
+            if missing:
+                raise ValueError(f"Этап '{stage.name}' зависит от неизвестных этапов: {missing}")
+
+    def _order(self, targets):
+        """Этапы, нужные для targets, в порядке зависимостей (проверка на циклы)"""
+        order, state = [], {}
+
+        def visit(name):
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise ValueError(f"Цикл в графе этапов: '{name}'")
+            state[name] = 'visiting'
+            for dep in self.stages[name].deps:
+                visit(dep)
+            state[name] = 'done'
+            order.append(name)
+
+        for target in targets:
+            if target not in self.stages:
+                raise ValueError(f"Неизвестный этап: '{target}'. Доступны: {list(self.stages)}")
+            visit(target)
+        return order
+
+    def _key(self, stage, input_hashes):
+        """Ключ результата этапа"""
+        params = stage.params() if stage.params else None
+        payload = json.dumps([stage.name, stage.version, params, input_hashes], sort_keys=True, default=_json_default)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:24]
+
+    def _paths(self, name, key):
+        base = os.path.join(self.cache_dir, f"{name}_{key}")
+        return base + '.pkl', base + '.json'
+
+    def _load_meta(self, name, key):
+        """Метаданные сохраненного результата (хэш содержимого) или None"""
+        value_path, meta_path = self._paths(name, key)
+        if not (os.path.exists(value_path) and os.path.exists(meta_path)):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _load_value(self, name, key):
+        with open(self._paths(name, key)[0], 'rb') as f:
+            return pickle.load(f)
+
+    def _save(self, name, key, value, output_hash, seconds):
+        """Сохранение результата этапа; результаты этапа с другими ключами удаляются"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        value_path, meta_path = self._paths(name, key)
+        tmp_path = f"{value_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, value_path)
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump({'hash': output_hash, 'seconds': seconds}, f)
+        except Exception as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            print(f"⚠️ Не удалось сохранить результат этапа '{name}': {e}")
+            return
+
+        for old_file in os.listdir(self.cache_dir):
+            if old_file.rsplit('_', 1)[0] == name and not old_file.startswith(f"{name}_{key}."):
+                os.remove(os.path.join(self.cache_dir, old_file))
+
+    def _execute(self, stage, inputs):
+        """Выполнение этапа (в пуле потоков или основном потоке): (результат, ошибка, время)"""
+        start = time.perf_counter()
+        try:
+            return stage.func(*inputs), None, time.perf_counter() - start
+        except Exception as e:
+            return None, str(e), time.perf_counter() - start
+
+    def run(self, targets=None, force=()):
+        """
+        Выполнение этапов targets (по умолчанию - всех) и всего, от чего они зависят.
+        force - этапы, которые нужно пересчитать, даже если результат сохранен.
+        Возвращает {этап: результат} для targets или None, если какой-то этап не выполнен.
+        """
+        targets = list(targets or self.stages)
+        order = self._order(targets)
+        values, hashes, keys, failed = {}, {}, {}, set()
+        timings = []
+
+        def value(name):
+            if name not in values:
+                values[name] = self._load_value(name, keys[name])
+            return values[name]
+
+        def finish(name, result, error, seconds):
+            stage = self.stages[name]
+            if error is not None or result is None:
+                print(f"❌ Этап '{name}' не выполнен: {error or 'нет результата'}")
+                failed.add(name)
+                return
+            values[name] = result
+            hashes[name] = content_hash(result) or keys[name]
+            timings.append((name, 'выполнен', seconds))
+            if self.memoize and stage.memoize:
+                self._save(name, keys[name], result, hashes[name], seconds)
+
+        pending = list(order)
+        running = {}
+        pool = ThreadPoolExecutor(max_workers=self.workers) if self.workers > 0 else None
+        try:
+            while pending or running:
+                # Этапы, входы которых готовы; этапы с невыполненными входами пропускаются
+                ready = []
+                for name in list(pending):
+                    deps = self.stages[name].deps
+                    if any(dep in failed for dep in deps):
+                        print(f"⏭️ Этап '{name}' пропущен: не выполнены входные этапы")
+                        failed.add(name)
+                        pending.remove(name)
+                    elif all(dep in hashes for dep in deps):
+                        ready.append(name)
+                        pending.remove(name)
+
+                main_thread = []
+                for name in ready:
+                    stage = self.stages[name]
+                    keys[name] = self._key(stage, [hashes[dep] for dep in stage.deps])
+                    meta = self._load_meta(name, keys[name]) if self.memoize and stage.memoize else None
+                    if meta is not None and name not in force:
+                        hashes[name] = meta['hash']
+                        timings.append((name, 'с диска', 0.0))
+                        continue
+
+                    inputs = [value(dep) for dep in stage.deps]
+                    if pool is None or stage.main_thread:
+                        main_thread.append((name, inputs))
+                    else:
+                        running[pool.submit(self._execute, stage, inputs)] = name
+
+                # Этапы основного потока выполняются, пока ветки в пуле продолжают работать
+                if main_thread:
+                    for name, inputs in main_thread:
+                        finish(name, *self._execute(self.stages[name], inputs))
+                    continue
+
+                if running:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        finish(running.pop(future), *future.result())
+                elif pending and not ready:
+                    break
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        print_pipeline_summary(timings)
+        if any(target in failed for target in targets):
+            return None
+        return {target: value(target) for target in targets}
+
+
+def print_pipeline_summary(timings):
+    """Вывод этапов: выполненные (со временем) и взятые с диска"""
+    print("\n" + "=" * 60)
+    print("🧩 ЭТАПЫ ПАЙПЛАЙНА")
+    print("=" * 60)
+    for name, status, seconds in timings:
+        suffix = f" ({seconds:.2f} с)" if status == 'выполнен' else ''
+        print(f"   {name:<18} {status}{suffix}")
+
+
+def _file_params(file_path):
+    """Настройки этапа загрузки: путь, размер и время изменения файла данных"""
+    stat = os.stat(file_path)
+    return [os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns]
+
+
+def build_sales_pipeline(file_path=DATA_FILE_PATH, config=PROPHET_CONFIG, **kwargs):
+    """
+    Пайплайн анализа и прогноза продаж:
+        load → clean → aggregates → render_eda
+                     → prepare_series → fit → evaluate
+                                            → render_forecast
+    Очистка добавляет временные признаки (Год, Месяц, ...), поэтому отдельного этапа признаков нет;
+    create_prophet_model обучает модель и строит прогноз одним вызовом, поэтому fit возвращает и то и другое.
+    Настройки очистки влияют на ключ clean, PROPHET_CONFIG - только на ключ fit.
+    Результаты каждого файла данных хранятся в своей папке, поэтому разные файлы не вытесняют результаты друг друга.
+    """
+    from read_and_clean import load_data, clean_data, prepare_for_prophet, _source_id
+    from aggregates import build_aggregate_cube
+    from analyze import plot_all_analysis
+    from model_forecast import create_prophet_model, plot_prophet_forecast, evaluate_prophet_model
+
+    def fit(df_prophet):
+        model, forecast = create_prophet_model(df_prophet, config, series_key='total', file_path=file_path)
+        return {'model': model, 'forecast': forecast} if model is not None and forecast is not None else None
+
+    stages = [
+        Stage('load', lambda: load_data(file_path), params=lambda: _file_params(file_path)),
+        Stage('clean', clean_data, deps=['load'], params=lambda: [CLEANING_CONFIG, DTYPE_CONFIG]),
+        Stage('aggregates', build_aggregate_cube, deps=['clean'], version=2),
+        Stage('prepare_series', prepare_for_prophet, deps=['clean']),
+        Stage('fit', fit, deps=['prepare_series'], params=lambda: config),
+        Stage('evaluate', lambda df_prophet, fitted: evaluate_prophet_model(fitted['model'], fitted['forecast'],
+                                                                            df_prophet),
+              deps=['prepare_series', 'fit']),
+        # Графики не сохраняются (результат - только факт построения), поэтому строятся при каждом запуске
+        Stage('render_eda', lambda df, cube: plot_all_analysis(df, cube=cube) or True,
+              deps=['clean', 'aggregates'], memoize=False, main_thread=True),
+        Stage('render_forecast', lambda df_prophet, fitted: plot_prophet_forecast(fitted['model'], fitted['forecast'],
+                                                                                  df_prophet) or True,
+              deps=['prepare_series', 'fit'], memoize=False, main_thread=True),
+    ]
+
+    if kwargs.get('cache_dir') is None:
+        cache_root = PIPELINE_CONFIG.get("cache_dir") or os.path.join(
+            os.path.dirname(os.path.abspath(file_path)), '.cache', 'pipeline')
+        kwargs['cache_dir'] = os.path.join(cache_root, _source_id(file_path))
+    return Pipeline(stages, **kwargs)
+
+
+def run_pipeline(targets=None, force=(), file_path=DATA_FILE_PATH, config=PROPHET_CONFIG, **kwargs):
+    """
+    Запуск пайплайна анализа и прогноза (см. build_sales_pipeline).
+    targets - нужные этапы, например ['evaluate'] - только прогноз и его оценка без графиков.
+    """
+    if not os.path.exists(file_path):
+        print(f"❌ Файл не найден: {file_path}")
+        return None
+
+    print("🚀 Запуск пайплайна анализа и прогнозирования")
+    return build_sales_pipeline(file_path, config, **kwargs).run(targets, force)
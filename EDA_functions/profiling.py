@@ -0,0 +1,329 @@
+import contextlib
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from config import PROFILING_CONFIG
+
+# Замеры этапов: декоратор @stage на публичных функциях загрузки, очистки, анализа и прогноза.
+# При PROFILING_CONFIG["enabled"] = False функция вызывается напрямую, без замеров.
+_records = []
+_local = threading.local()      # Стек вложенных этапов текущего потока
+_log_lock = threading.Lock()
+_profiler_lock = threading.Lock()  # cProfile нельзя запускать вложенно или в двух потоках сразу
+_counters = {}
+
+try:
+    _PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+
+
+def _rss_mb():
+    """Текущий RSS процесса, МБ (Linux - /proc, иначе psutil, если установлен; None - недоступно)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2 ** 20
+    except ImportError:
+        return None
+
+
+def _cpu_times():
+    """
+    Процессорное время, с: процесса (все потоки) и завершившихся дочерних процессов - обучение cmdstan,
+    воркеры пулов после их закрытия. На Windows время дочерних процессов недоступно (0).
+    """
+    times = os.times()
+    return time.process_time(), times.children_user + times.children_system
+
+
+def _rows(value):
+    """Число строк: DataFrame/Series, первый DataFrame кортежа, сумма по словарю рядов; иначе None"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return next((len(item) for item in value if isinstance(item, (pd.DataFrame, pd.Series))), None)
+    if isinstance(value, dict) and value and all(isinstance(item, pd.DataFrame) for item in value.values()):
+        return sum(len(item) for item in value.values())
+    return None
+
+
+def _rows_in(args, kwargs):
+    """Строки первого DataFrame среди аргументов"""
+    for value in list(args) + list(kwargs.values()):
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            return len(value)
+    return None
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+def _write_log(record):
+    log_file = PROFILING_CONFIG.get("log_file")
+    if not log_file:
+        return
+    directory = os.path.dirname(log_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with _log_lock, open(log_file, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+
+def _start_profiler(name):
+    """Профилировщик этапа, если этап выбран в PROFILING_CONFIG и другой профиль сейчас не пишется"""
+    profile_dir = PROFILING_CONFIG.get("profile_dir")
+    selected = PROFILING_CONFIG.get("profile_stages") or []
+    if not profile_dir or (selected and name not in selected):
+        return None
+    if not _profiler_lock.acquire(blocking=False):
+        return None
+
+    try:
+        if PROFILING_CONFIG.get("profiler") == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler
+                profiler = Profiler()
+                profiler.start()
+                return 'pyinstrument', profiler
+            except ImportError:
+                print("⚠️ pyinstrument не установлен, используется cProfile")
+
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return 'cprofile', profiler
+    except Exception:
+        _profiler_lock.release()
+        return None
+
+
+def _stop_profiler(active, name):
+    """Остановка профилировщика и сохранение профиля этапа; возвращает путь к файлу"""
+    kind, profiler = active
+    try:
+        profile_dir = PROFILING_CONFIG.get("profile_dir")
+        os.makedirs(profile_dir, exist_ok=True)
+        number = _counters[name] = _counters.get(name, 0) + 1
+        if kind == 'pyinstrument':
+            profiler.stop()
+            path = os.path.join(profile_dir, f"{name}_{number}.html")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(profiler.output_html())
+        else:
+            profiler.disable()
+            path = os.path.join(profile_dir, f"{name}_{number}.prof")
+            profiler.dump_stats(path)
+        return path
+    finally:
+        _profiler_lock.release()
+
+
+class _Measurement:
+    """Замер одного вызова этапа"""
+
+    def __init__(self, name, module, rows_in):
+        self.name = name
+        self.module = module
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.child_cpu = 0.0
+
+    def __enter__(self):
+        stack = _stack()
+        self.parent = stack[-1].name if stack else None
+        self.depth = len(stack)
+        stack.append(self)
+        self.started_at = datetime.now().isoformat(timespec='milliseconds')
+        self.rss_before = _rss_mb()
+        self.profiler = _start_profiler(self.name)
+        self.resume()
+        return self
+
+    def resume(self):
+        self._wall_start = time.perf_counter()
+        self._cpu_start, self._child_cpu_start = _cpu_times()
+
+    def pause(self):
+        self.wall += time.perf_counter() - self._wall_start
+        cpu, child_cpu = _cpu_times()
+        self.cpu += cpu - self._cpu_start
+        self.child_cpu += child_cpu - self._child_cpu_start
+
+    def __exit__(self, exc_type, exc, tb):
+        self.pause()
+        profile_path = _stop_profiler(self.profiler, self.name) if self.profiler else None
+        _stack().pop()
+
+        rss_after = _rss_mb()
+        record = {
+            'stage': self.name,
+            'module': self.module,
+            'started_at': self.started_at,
+            'wall_s': round(self.wall, 6),
+            'cpu_s': round(self.cpu + self.child_cpu, 6),
+            'child_cpu_s': round(self.child_cpu, 6),
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'rss_mb': round(rss_after, 1) if rss_after is not None else None,
+            'mem_delta_mb': round(rss_after - self.rss_before, 1)
+            if rss_after is not None and self.rss_before is not None else None,
+            'depth': self.depth,
+            'parent': self.parent,
+            'pid': os.getpid(),
+            # GeneratorExit - вызывающий код не дочитал генератор, это не ошибка этапа
+            'error': exc_type.__name__ if exc_type and exc_type is not GeneratorExit else None,
+            'profile': profile_path,
+        }
+        _records.append(record)
+        _write_log(record)
+        return False
+
+
+@contextlib.contextmanager
+def measure(name, rows_in=None, module=None):
+    """
+    Замер произвольного блока кода как этапа. Число строк результата задается через measurement.rows_out:
+        with measure('export') as measurement:
+            measurement.rows_out = len(df)
+    """
+    if not PROFILING_CONFIG.get("enabled", False):
+        yield _Measurement(name, module, rows_in)
+        return
+    with _Measurement(name, module, rows_in) as measurement:
+        yield measurement
+
+
+def stage(func=None, *, name=None):
+    """
+    Декоратор этапа: время выполнения, процессорное время, строки на входе/выходе (первый DataFrame
+    среди аргументов и результат) и изменение RSS. Для генераторов замер охватывает все порции,
+    а время считается только внутри генератора.
+    """
+    if func is None:
+        return functools.partial(stage, name=name)
+
+    stage_name = name or func.__name__
+    module = func.__module__
+
+    if inspect.isgeneratorfunction(func):
+        @functools.wraps(func)
+        def generator_wrapper(*args, **kwargs):
+            if not PROFILING_CONFIG.get("enabled", False):
+                yield from func(*args, **kwargs)
+                return
+
+            measurement = _Measurement(stage_name, module, _rows_in(args, kwargs))
+            measurement.rows_out = 0
+            with measurement:
+                iterator = func(*args, **kwargs)
+                while True:
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        break
+                    measurement.rows_out += _rows(item) or 0
+                    # Пока порцию обрабатывает вызывающий код, время этапа не идет
+                    measurement.pause()
+                    _stack().pop()
+                    try:
+                        yield item
+                    finally:
+                        _stack().append(measurement)
+                        measurement.resume()
+
+        return generator_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not PROFILING_CONFIG.get("enabled", False):
+            return func(*args, **kwargs)
+
+        with _Measurement(stage_name, module, _rows_in(args, kwargs)) as measurement:
+            result = func(*args, **kwargs)
+            measurement.rows_out = _rows(result)
+        return result
+
+    return wrapper
+
+
+def get_profile_records():
+    """Все замеры текущего процесса (DataFrame в порядке завершения этапов)"""
+    return pd.DataFrame(_records, columns=['stage', 'module', 'started_at', 'wall_s', 'cpu_s', 'child_cpu_s',
+                                           'rows_in', 'rows_out',
+                                           'rss_mb', 'mem_delta_mb', 'depth', 'parent', 'pid', 'error', 'profile'])
+
+
+def reset_profile():
+    """Очистка накопленных замеров"""
+    _records.clear()
+    _counters.clear()
+
+
+def print_profile_summary(records=None):
+    """Итоговая таблица по этапам в порядке первого вызова (вложенные этапы - с отступом)"""
+    records = get_profile_records() if records is None else records
+    if records.empty:
+        print("ℹ️ Замеров нет (включите PROFILING_CONFIG[\"enabled\"])")
+        return None
+
+    summary = records.groupby('stage', sort=False).agg(
+        started=('started_at', 'min'),
+        depth=('depth', 'min'),
+        calls=('stage', 'size'),
+        wall_s=('wall_s', 'sum'),
+        cpu_s=('cpu_s', 'sum'),
+        child_cpu_s=('child_cpu_s', 'sum'),
+        rows_in=('rows_in', 'max'),
+        rows_out=('rows_out', 'max'),
+        mem_delta_mb=('mem_delta_mb', 'sum'),
+        errors=('error', 'count'),
+    ).sort_values(['started', 'depth'], kind='stable')  # При совпадении времени старта родитель - выше
+    summary.index = [('  ' * depth) + stage for stage, depth in zip(summary.index, summary['depth'])]
+    summary = summary.drop(columns=['started', 'depth'])
+
+    print("\n" + "=" * 60)
+    print("⏱️ ПРОФИЛЬ ЭТАПОВ")
+    print("=" * 60)
+    print(summary.round(3).to_string())
+    top_level = records[records['depth'] == 0]
+    print(f"\nВсего (верхний уровень): {top_level['wall_s'].sum():.2f} с, CPU {top_level['cpu_s'].sum():.2f} с")
+    return summary
+
+
+@contextlib.contextmanager
+def profiling(log_file=None, profile_dir=None, summary=True):
+    """
+    Включение замеров на время блока с итоговой таблицей в конце:
+        with profiling(profile_dir='../report/profiles'):
+            run_full_analysis()
+    """
+    previous = dict(PROFILING_CONFIG)
+    PROFILING_CONFIG["enabled"] = True
+    if log_file:
+        PROFILING_CONFIG["log_file"] = log_file
+    if profile_dir:
+        PROFILING_CONFIG["profile_dir"] = profile_dir
+    try:
+        yield
+    finally:
+        PROFILING_CONFIG.clear()
+        PROFILING_CONFIG.update(previous)
+        if summary:
+            print_profile_summary()
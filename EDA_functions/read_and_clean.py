@@ -1,16 +1,117 @@
 import pandas as pd
+import numpy as np
+import hashlib
+import json
+import os
 import warnings
 
 warnings.filterwarnings('ignore')
 
-from config import DATA_FILE_PATH, CLEANING_CONFIG
+from config import (DATA_FILE_PATH, CLEANING_CONFIG, CACHE_CONFIG, STREAMING_CONFIG,
+                    DTYPE_CONFIG, PROPHET_CONFIG)
+from profiling import stage
 
 
-def load_data(file_path=DATA_FILE_PATH):
-    """Загрузка данных из Excel файла"""
+def _source_id(file_path):
+    """
+    Имя файла данных с коротким хэшем абсолютного пути: префикс файлов кэша одного источника.
+    Файлы с одинаковым именем из разных папок (при общем cache_dir) не удаляют кэш друг друга.
+    """
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    path_hash = hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()[:8]
+    return f"{name}-{path_hash}"
+
+
+def _cache_path(file_path, stage=None):
+    """
+    Путь к кэш-файлу. Ключ строится из пути, размера и времени изменения исходного файла.
+    stage - промежуточный результат ('clean', 'cube'): в ключ добавляются настройки очистки,
+    поэтому после их изменения результат пересчитывается.
+    """
+    stat = os.stat(file_path)
+    key_source = f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    if stage:
+        settings = json.dumps([CLEANING_CONFIG, DTYPE_CONFIG], sort_keys=True, ensure_ascii=False, default=str)
+        key_source += f"|{stage}|{settings}"
+    key = hashlib.sha1(key_source.encode('utf-8')).hexdigest()[:16]
+
+    cache_dir = CACHE_CONFIG.get("cache_dir") or os.path.join(os.path.dirname(os.path.abspath(file_path)), '.cache')
+    extension = 'feather' if CACHE_CONFIG.get("format") == 'feather' else 'parquet'
+    name = _source_id(file_path)
+    if stage:
+        name += f"_{stage}"
+    return os.path.join(cache_dir, f"{name}_{key}.{extension}")
+
+
+def _read_cache(cache_path):
+    """Чтение данных из кэша"""
+    if cache_path.endswith('.feather'):
+        return pd.read_feather(cache_path)
+    return pd.read_parquet(cache_path)
+
+
+def _write_cache(df, cache_path):
+    """Сохранение данных в кэш. Устаревшие версии того же файла удаляются"""
+    cache_dir = os.path.dirname(cache_path)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # Удаляем кэш от предыдущих версий файла (префикс включает хэш пути к источнику и этап)
+    name = os.path.basename(cache_path).rsplit('_', 1)[0]
+    for old_file in os.listdir(cache_dir):
+        if old_file.rsplit('_', 1)[0] == name:
+            os.remove(os.path.join(cache_dir, old_file))
+
+    tmp_path = cache_path + '.tmp'
     try:
-        df = pd.read_excel(file_path)
+        if cache_path.endswith('.feather'):
+            df.to_feather(tmp_path)
+        else:
+            df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        print(f"⚠️ Не удалось сохранить кэш данных: {e}")
+
+
+def _source_format(file_path):
+    """Формат файла данных по расширению: 'parquet', 'csv' или 'excel'"""
+    extension = os.path.splitext(file_path)[1].lower()
+    return {'.parquet': 'parquet', '.csv': 'csv'}.get(extension, 'excel')
+
+
+@stage
+def load_data(file_path=DATA_FILE_PATH, use_cache=None):
+    """
+    Загрузка данных из Excel файла (с кэшированием в колоночном формате).
+    Файлы .parquet и .csv (например, от генераторов из папки Data) читаются напрямую;
+    parquet уже колоночный, поэтому для него кэш не создается.
+    """
+    if use_cache is None:
+        use_cache = CACHE_CONFIG.get("enabled", False)
+
+    source_format = _source_format(file_path)
+    try:
+        if source_format == 'parquet':
+            df = pd.read_parquet(file_path)
+            print(f"✅ Данные загружены. Размер: {df.shape}")
+            return df
+
+        cache_path = _cache_path(file_path) if use_cache else None
+
+        if cache_path and os.path.exists(cache_path):
+            try:
+                df = _read_cache(cache_path)
+                print(f"✅ Данные загружены из кэша. Размер: {df.shape}")
+                return df
+            except Exception as e:
+                print(f"⚠️ Не удалось прочитать кэш, читаю Excel: {e}")
+
+        df = pd.read_csv(file_path) if source_format == 'csv' else pd.read_excel(file_path)
         print(f"✅ Данные загружены. Размер: {df.shape}")
+
+        if cache_path:
+            _write_cache(df, cache_path)
         return df
     except FileNotFoundError:
         print(f"❌ Файл не найден: {file_path}")
@@ -20,111 +121,391 @@ def load_data(file_path=DATA_FILE_PATH):
         return None
 
 
-def clean_data(df):
-    """Очистка данных на основе конфигурации"""
-    if df is None:
-        return None
+def _iter_excel_chunks(file_path, chunk_size):
+    """Чтение Excel в режиме read-only: строки не загружаются в память целиком"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+
+        buffer = []
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) >= chunk_size:
+                yield pd.DataFrame(buffer, columns=header)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=header)
+    finally:
+        workbook.close()
 
-    df_clean = df.copy()
-    initial_size = len(df_clean)
+
+@stage
+def iter_data_chunks(file_path=DATA_FILE_PATH, chunk_size=None):
+    """
+    Потоковая загрузка данных порциями фиксированного размера.
+    Если для файла уже есть parquet-кэш, порции читаются из него, иначе - напрямую из Excel.
+    Файлы .parquet и .csv читаются порциями напрямую.
+    """
+    if chunk_size is None:
+        chunk_size = STREAMING_CONFIG.get("chunk_size", 100_000)
+
+    if not os.path.exists(file_path):
+        print(f"❌ Файл не найден: {file_path}")
+        return
+
+    source_format = _source_format(file_path)
+    if source_format == 'csv':
+        yield from pd.read_csv(file_path, chunksize=chunk_size)
+        return
+
+    cache_path = file_path if source_format == 'parquet' else (
+        _cache_path(file_path) if CACHE_CONFIG.get("enabled", False) else None)
+    if cache_path and cache_path.endswith('.parquet') and os.path.exists(cache_path):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(cache_path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+        return
+
+    yield from _iter_excel_chunks(file_path, chunk_size)
+
+
+def _clean_frame(df, copy=True):
+    """
+    Очистка одного DataFrame на основе конфигурации.
+    Все правила собираются в одну булеву маску, строки фильтруются один раз.
+    Возвращает очищенные данные и отчет о количестве удаленных строк.
+    """
+    # Поверхностная копия: замена столбцов при преобразовании типов не затрагивает исходный df
+    work = df.copy(deep=False) if copy else df
+    report = {
+        'initial': len(work),
+        'final': 0,
+        'missing_columns': [],
+        'error': None,
+        'nulls': 0,
+        'values': {},
+        'conditions': [],
+        'negative_qty': 0,
+        'negative_sum': 0,
+    }
+    keep = np.ones(len(work), dtype=bool)
+
+    def apply_rule(remove_mask):
+        """Добавляет правило в общую маску, возвращает число строк, удаленных именно им"""
+        remove_mask = keep & remove_mask
+        keep[remove_mask] = False
+        return int(remove_mask.sum())
 
     # 1. Проверка обязательных столбцов
     required_columns = CLEANING_CONFIG.get("required_columns", [])
-    missing_columns = [col for col in required_columns if col not in df_clean.columns]
-    if missing_columns:
-        print(f"❌ Отсутствуют столбцы: {missing_columns}")
-        return None
+    report['missing_columns'] = [col for col in required_columns if col not in work.columns]
+    if report['missing_columns']:
+        return None, report
 
-    # 2. Удаление пропусков
-    removed_nulls = 0
-    for column in required_columns:
-        before = len(df_clean)
-        df_clean = df_clean.dropna(subset=[column])
-        removed_nulls += (before - len(df_clean))
-    if removed_nulls > 0:
-        print(f"✅ Удалено строк с пропусками: {removed_nulls}")
+    # 2. Пропуски (проверяются до преобразования типов, как и раньше)
+    if required_columns:
+        report['nulls'] = apply_rule(work[required_columns].isna().to_numpy().any(axis=1))
 
     # 3. Преобразование типов
     try:
-        if 'Дата продажи' in df_clean.columns:
-            df_clean['Дата продажи'] = pd.to_datetime(df_clean['Дата продажи'], errors='coerce')
-        if 'Кол-во' in df_clean.columns:
-            df_clean['Кол-во'] = pd.to_numeric(df_clean['Кол-во'], errors='coerce')
-        if 'Сумма' in df_clean.columns:
-            df_clean['Сумма'] = pd.to_numeric(df_clean['Сумма'], errors='coerce')
+        if 'Дата продажи' in work.columns:
+            work['Дата продажи'] = pd.to_datetime(work['Дата продажи'], errors='coerce')
+        if 'Кол-во' in work.columns:
+            work['Кол-во'] = pd.to_numeric(work['Кол-во'], errors='coerce')
+        if 'Сумма' in work.columns:
+            work['Сумма'] = pd.to_numeric(work['Сумма'], errors='coerce')
     except Exception as e:
-        print(f"❌ Ошибка преобразования типов: {e}")
-        return None
+        report['error'] = str(e)
+        return None, report
 
     # 4. Удаление по значениям из конфига
     remove_config = CLEANING_CONFIG.get("remove_rows_with_values", {})
-    removed_by_values = 0
     for column, values_to_remove in remove_config.items():
-        if column in df_clean.columns:
-            before = len(df_clean)
-            df_clean = df_clean[~df_clean[column].isin(values_to_remove)]
-            removed = before - len(df_clean)
-            removed_by_values += removed
-            if removed > 0:
-                print(f"✅ Удалено из {column}: {removed}")
-
-    # 5. Удаление по пользовательским условиям
+        if column in work.columns:
+            report['values'][column] = apply_rule(work[column].isin(values_to_remove).to_numpy())
+
+    # 5. Удаление по пользовательским условиям (None - условие не удалось применить)
     custom_conditions = CLEANING_CONFIG.get("custom_conditions", [])
-    removed_by_conditions = 0
     for condition in custom_conditions:
         try:
-            before = len(df_clean)
-            df_clean = df_clean.query(f"not ({condition})")
-            removed = before - len(df_clean)
-            removed_by_conditions += removed
-            if removed > 0:
-                print(f"✅ Удалено по условию '{condition}': {removed}")
+            condition_mask = work.eval(condition)
+            if not pd.api.types.is_bool_dtype(condition_mask):
+                raise ValueError(f"условие не является логическим: {condition}")
+            report['conditions'].append((condition, apply_rule(condition_mask.fillna(False).to_numpy(dtype=bool))))
         except:
-            print(f"⚠️ Не удалось применить условие: {condition}")
+            report['conditions'].append((condition, None))
+
+    # 6. Удаление отрицательных значений (пустые после преобразования тоже удаляются)
+    if 'Кол-во' in work.columns:
+        report['negative_qty'] = apply_rule(~(work['Кол-во'] >= 0).to_numpy())
+    if 'Сумма' in work.columns:
+        report['negative_sum'] = apply_rule(~(work['Сумма'] >= 0).to_numpy())
 
-    # 6. Удаление отрицательных значений
-    if 'Кол-во' in df_clean.columns:
-        before = len(df_clean)
-        df_clean = df_clean[df_clean['Кол-во'] >= 0]
-        removed_negative_qty = before - len(df_clean)
-        if removed_negative_qty > 0:
-            print(f"✅ Удалено с отрицательным количеством: {removed_negative_qty}")
-
-    if 'Сумма' in df_clean.columns:
-        before = len(df_clean)
-        df_clean = df_clean[df_clean['Сумма'] >= 0]
-        removed_negative_sum = before - len(df_clean)
-        if removed_negative_sum > 0:
-            print(f"✅ Удалено с отрицательной суммой: {removed_negative_sum}")
-
-    # 7. Добавление временных признаков
+    # 7. Единственная фильтрация по итоговой маске
+    df_clean = work[keep] if not keep.all() else work.copy(deep=False)
+
+    # 8. Добавление временных признаков
     if 'Дата продажи' in df_clean.columns:
-        df_clean['Год'] = df_clean['Дата продажи'].dt.year
-        df_clean['Месяц'] = df_clean['Дата продажи'].dt.month
-        df_clean['Квартал'] = df_clean['Дата продажи'].dt.quarter
-        df_clean['День недели'] = df_clean['Дата продажи'].dt.dayofweek
+        # Нераспознанные даты (NaT) дают пропуски, которые не помещаются в целый тип
+        downcast = DTYPE_CONFIG.get("downcast_integers", False) and not df_clean['Дата продажи'].isna().any()
+        dates = df_clean['Дата продажи'].dt
+        df_clean['Год'] = dates.year.astype('int16') if downcast else dates.year
+        df_clean['Месяц'] = dates.month.astype('int8') if downcast else dates.month
+        df_clean['Квартал'] = dates.quarter.astype('int8') if downcast else dates.quarter
+        df_clean['День недели'] = dates.dayofweek.astype('int8') if downcast else dates.dayofweek
+
+    # 9. Компактные типы данных
+    _optimize_dtypes(df_clean)
+
+    report['final'] = len(df_clean)
+    return df_clean, report
+
+
+def _optimize_dtypes(df):
+    """Перевод строковых измерений в 'category' и сжатие целочисленного количества"""
+    for column in DTYPE_CONFIG.get("categorical_columns", []):
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype('category')
+
+    # Количество сжимается только если все значения целые (pandas сам проверяет это при downcast)
+    if DTYPE_CONFIG.get("downcast_integers", False) and 'Кол-во' in df.columns:
+        df['Кол-во'] = pd.to_numeric(df['Кол-во'], downcast='integer')
+
+
+def _merge_cleaning_reports(total, report):
+    """Суммирование отчетов об очистке (для порционной обработки)"""
+    if total is None:
+        return {**report, 'values': dict(report['values']), 'conditions': list(report['conditions'])}
+
+    for key in ('initial', 'final', 'nulls', 'negative_qty', 'negative_sum'):
+        total[key] += report[key]
+    for column, removed in report['values'].items():
+        total['values'][column] = total['values'].get(column, 0) + removed
+    total['conditions'] = [
+        (condition, None if removed is None or other is None else removed + other)
+        for (condition, removed), (_, other) in zip(total['conditions'], report['conditions'])
+    ]
+    return total
+
+
+def _print_cleaning_report(report):
+    """Вывод отчета об очистке данных"""
+    if report['missing_columns']:
+        print(f"❌ Отсутствуют столбцы: {report['missing_columns']}")
+        return
 
-    # 8. Итоговая статистика
-    final_size = len(df_clean)
-    print(f"📊 Итоги: {initial_size} → {final_size} строк")
+    if report['nulls'] > 0:
+        print(f"✅ Удалено строк с пропусками: {report['nulls']}")
 
-    return df_clean if final_size > 0 else None
+    if report['error']:
+        print(f"❌ Ошибка преобразования типов: {report['error']}")
+        return
 
+    for column, removed in report['values'].items():
+        if removed > 0:
+            print(f"✅ Удалено из {column}: {removed}")
 
-def prepare_for_prophet(df, target_column='Сумма'):
-    """Подготовка данных для Prophet"""
-    if df is None or 'Дата продажи' not in df.columns or target_column not in df.columns:
+    for condition, removed in report['conditions']:
+        if removed is None:
+            print(f"⚠️ Не удалось применить условие: {condition}")
+        elif removed > 0:
+            print(f"✅ Удалено по условию '{condition}': {removed}")
+
+    if report['negative_qty'] > 0:
+        print(f"✅ Удалено с отрицательным количеством: {report['negative_qty']}")
+    if report['negative_sum'] > 0:
+        print(f"✅ Удалено с отрицательной суммой: {report['negative_sum']}")
+
+    print(f"📊 Итоги: {report['initial']} → {report['final']} строк")
+
+
+@stage
+def clean_data(df):
+    """Очистка данных на основе конфигурации"""
+    if df is None:
+        return None
+
+    df_clean, report = _clean_frame(df)
+    _print_cleaning_report(report)
+
+    if df_clean is None:
+        return None
+    return df_clean if report['final'] > 0 else None
+
+
+@stage
+def load_clean_data(file_path=DATA_FILE_PATH, use_cache=None):
+    """
+    Загрузка и очистка данных (load_data + clean_data) с кэшированием очищенного результата.
+    Повторные запуски берут очищенные данные из кэша без чтения Excel и повторной очистки;
+    кэш пересчитывается при изменении файла данных или настроек CLEANING_CONFIG/DTYPE_CONFIG.
+    """
+    if use_cache is None:
+        use_cache = CACHE_CONFIG.get("enabled", False)
+
+    cache_path = _cache_path(file_path, 'clean') if use_cache and os.path.exists(file_path) else None
+    if cache_path and os.path.exists(cache_path):
+        try:
+            df_clean = _read_cache(cache_path)
+            print(f"✅ Очищенные данные загружены из кэша. Размер: {df_clean.shape}")
+            return df_clean
+        except Exception as e:
+            print(f"⚠️ Не удалось прочитать кэш очищенных данных: {e}")
+
+    df_clean = clean_data(load_data(file_path, use_cache))
+    if df_clean is not None and cache_path:
+        # Индекс после фильтрации не сохраняется (feather поддерживает только индекс по умолчанию)
+        _write_cache(df_clean.reset_index(drop=True), cache_path)
+    return df_clean
+
+
+@stage
+def iter_clean_chunks(chunks):
+    """
+    Очистка данных, поступающих порциями (см. iter_data_chunks).
+    Каждая порция очищается без лишнего копирования, итоговый отчет выводится один раз.
+    """
+    total_report = None
+
+    for chunk in chunks:
+        chunk_clean, report = _clean_frame(chunk, copy=False)
+        if chunk_clean is None:
+            _print_cleaning_report(report)
+            return
+        total_report = _merge_cleaning_reports(total_report, report)
+        if len(chunk_clean) > 0:
+            yield chunk_clean
+
+    if total_report is not None:
+        _print_cleaning_report(total_report)
+
+
+def _daily_totals(df, target_columns):
+    """
+    Суммы целевых столбцов по календарным дням (время внутри дня отбрасывается).
+    Группировка по нормализованной дате дает таблицу размером в число дней, а не строк.
+    """
+    dates = df['Дата продажи']
+    valid = dates.notna()
+    if not valid.all():
+        df, dates = df[valid], dates[valid]
+    return df[target_columns].groupby(dates.dt.normalize().rename('ds')).sum()
+
+
+def _to_prophet_series(daily_totals, target_columns, freq, single):
+    """Приведение дневных сумм к непрерывным рядам Prophet (ds, y) с частотой freq"""
+    # resample по небольшой таблице дней: заполняет пропущенные периоды нулями
+    totals = daily_totals.resample(freq).sum()
+
+    series = {
+        column: pd.DataFrame({'ds': totals.index, 'y': totals[column].to_numpy(dtype='float64')})
+        for column in target_columns
+    }
+    return series[target_columns[0]] if single else series
+
+
+@stage
+def prepare_for_prophet(df, target_column='Сумма', freq=None):
+    """
+    Подготовка данных для Prophet.
+    Продажи суммируются по периодам freq (по умолчанию - PROPHET_CONFIG['forecast_params']['freq']),
+    периоды без продаж заполняются нулями. Если target_column - список столбцов,
+    возвращается словарь {столбец: DataFrame(ds, y)}.
+    """
+    single = isinstance(target_column, str)
+    target_columns = [target_column] if single else list(target_column)
+
+    if df is None or 'Дата продажи' not in df.columns or any(col not in df.columns for col in target_columns):
         print("❌ Недостаточно данных для Prophet")
         return None
 
-    daily_data = df.groupby('Дата продажи')[target_column].sum().reset_index()
-    daily_data.columns = ['ds', 'y']
+    if freq is None:
+        freq = PROPHET_CONFIG.get("forecast_params", {}).get("freq", 'D')
 
-    date_range = pd.date_range(start=daily_data['ds'].min(), end=daily_data['ds'].max(), freq='D')
-    full_range = pd.DataFrame({'ds': date_range})
-    prophet_data = full_range.merge(daily_data, on='ds', how='left')
-    prophet_data['y'] = prophet_data['y'].fillna(0)
+    daily_totals = _daily_totals(df, target_columns)
+    if len(daily_totals) == 0:
+        print("❌ Недостаточно данных для Prophet")
+        return None
+
+    prophet_data = _to_prophet_series(daily_totals, target_columns, freq, single)
 
     print(f"✅ Данные для Prophet подготовлены")
     return prophet_data
 
+
+@stage
+def prepare_for_prophet_from_chunks(chunks, target_column='Сумма', freq=None):
+    """Подготовка данных для Prophet из порций данных (см. iter_clean_chunks)"""
+    single = isinstance(target_column, str)
+    target_columns = [target_column] if single else list(target_column)
+    daily_totals = None
+
+    for chunk in chunks:
+        if 'Дата продажи' not in chunk.columns or any(col not in chunk.columns for col in target_columns):
+            print("❌ Недостаточно данных для Prophet")
+            return None
+        chunk_totals = _daily_totals(chunk, target_columns)
+        daily_totals = chunk_totals if daily_totals is None else daily_totals.add(chunk_totals, fill_value=0)
+
+    if daily_totals is None or len(daily_totals) == 0:
+        print("❌ Недостаточно данных для Prophet")
+        return None
+
+    if freq is None:
+        freq = PROPHET_CONFIG.get("forecast_params", {}).get("freq", 'D')
+
+    prophet_data = _to_prophet_series(daily_totals.sort_index(), target_columns, freq, single)
+
+    print("✅ Данные для Prophet подготовлены")
+    return prophet_data
+
+
+@stage
+def prepare_series_by_group(df, group_column='Категория', target_column='Сумма', freq=None):
+    """
+    Подготовка рядов Prophet сразу для всех значений group_column
+    (категория, регион, продукт, отрасль и т.п.) одной группировкой по (группа, день).
+    Каждый ряд охватывает период от первой до последней продажи своей группы,
+    как при фильтрации данных по группе и вызове prepare_for_prophet.
+    Возвращает словарь {значение группы: DataFrame(ds, y)}.
+    """
+    if df is None or any(col not in df.columns for col in ['Дата продажи', group_column, target_column]):
+        print(f"❌ Недостаточно данных для подготовки рядов по '{group_column}'")
+        return None
+
+    if freq is None:
+        freq = PROPHET_CONFIG.get("forecast_params", {}).get("freq", 'D')
+
+    dates = df['Дата продажи']
+    valid = dates.notna() & df[group_column].notna()
+    if not valid.all():
+        df, dates = df[valid], dates[valid]
+
+    totals = df[target_column].groupby([df[group_column], dates.dt.normalize().rename('ds')],
+                                       observed=True, sort=False).sum()
+    if len(totals) == 0:
+        print(f"❌ Недостаточно данных для подготовки рядов по '{group_column}'")
+        return None
+
+    # Границы рядов - по дням с продажами, а не по нулям, которые добавит unstack
+    days = totals.index.get_level_values('ds')
+    bounds = pd.Series(days).groupby(totals.index.get_level_values(group_column), observed=True).agg(['min', 'max'])
+
+    # Таблица дни × группы: ее размер зависит от числа дней и групп, а не строк
+    daily_table = totals.unstack(group_column, fill_value=0).sort_index()
+
+    series = {}
+    for group in daily_table.columns:
+        start, end = bounds.loc[group, 'min'], bounds.loc[group, 'max']
+        group_totals = daily_table[group].loc[start:end].resample(freq).sum()
+        series[group] = pd.DataFrame({'ds': group_totals.index,
+                                      'y': group_totals.to_numpy(dtype='float64')})
+
+    print(f"✅ Данные для Prophet подготовлены: {len(series)} рядов по '{group_column}'")
+    return series
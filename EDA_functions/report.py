@@ -0,0 +1,224 @@
+import contextlib
+import html
+from concurrent.futures import ProcessPoolExecutor
+import os
+import re
+import sys
+from datetime import datetime
+
+from config import REPORT_CONFIG
+
+# Текущий пакетный отчет (None - обычный интерактивный режим с plt.show())
+_active_report = None
+
+# Параметры стиля, которые передаются в процессы отрисовки (см. analyze.setup_visuals)
+_STYLE_KEYS = ['figure.figsize', 'font.size', 'axes.prop_cycle']
+
+
+class _Tee:
+    """Дублирует вывод print в консоль и в журнал отчета"""
+
+    def __init__(self, stream, buffer):
+        self.stream = stream
+        self.buffer = buffer
+
+    def write(self, text):
+        self.buffer.append(text)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        # isatty, encoding, fileno и т.д. - как у исходного потока (их проверяют tqdm, cmdstanpy, logging)
+        return getattr(self.stream, name)
+
+
+def _slugify(name):
+    """Имя файла из названия графика"""
+    return re.sub(r'\W+', '_', str(name)).strip('_') or 'figure'
+
+
+def output_path(filename):
+    """Путь для сохранения артефакта: в папке отчета в пакетном режиме, иначе как есть"""
+    if _active_report is None:
+        return filename
+    return os.path.join(_active_report['output_dir'], filename)
+
+
+def _add_figure_block(report, name):
+    """Резервирует имя файла для графика и место в отчете после уже выведенного текста"""
+    report['counter'] += 1
+    filename = f"{report['counter']:02d}_{_slugify(name)}.{report['image_format']}"
+
+    report['blocks'].append(('text', ''.join(report['log'])))
+    report['blocks'].append(('figure', filename))
+    report['log'].clear()
+    return filename
+
+
+def show_figure(name='figure'):
+    """
+    Показ построенных графиков.
+    В пакетном режиме каждый открытый график сохраняется в файл отчета и сразу закрывается.
+    """
+    import matplotlib.pyplot as plt
+    if _active_report is None:
+        plt.show()
+        return
+
+    report = _active_report
+    for number in plt.get_fignums():
+        fig = plt.figure(number)
+        filename = _add_figure_block(report, name)
+        fig.savefig(os.path.join(report['output_dir'], filename), dpi=report['dpi'], bbox_inches='tight')
+        if report['pdf'] is not None:
+            report['pdf'].savefig(fig, bbox_inches='tight')
+        plt.close(fig)
+
+
+def render_figure(name, draw, *args, **kwargs):
+    """
+    Построение графика функцией draw(*args, **kwargs) и его показ/сохранение.
+    В пакетном режиме с render_workers > 0 построение откладывается до закрытия отчета
+    и выполняется в пуле процессов - между процессами передаются только аргументы draw
+    (небольшие агрегаты), а не исходные данные.
+    """
+    report = _active_report
+    if report is None or report['render_tasks'] is None:
+        draw(*args, **kwargs)
+        show_figure(name)
+        return
+
+    filename = _add_figure_block(report, name)
+    report['render_tasks'].append((os.path.join(report['output_dir'], filename), draw, args, kwargs))
+
+
+def _init_render_worker(style):
+    """Инициализация процесса отрисовки: бэкенд Agg и стиль основного процесса"""
+    import matplotlib.pyplot as plt
+    plt.switch_backend('Agg')
+    plt.rcParams.update(style)
+
+
+def _render_task(task, dpi):
+    """Отрисовка одного графика в процессе пула и сохранение его в файл"""
+    import matplotlib.pyplot as plt
+    path, draw, args, kwargs = task
+    draw(*args, **kwargs)
+    for number in plt.get_fignums():
+        fig = plt.figure(number)
+        fig.savefig(path, dpi=dpi, bbox_inches='tight')
+        plt.close(fig)
+    return path
+
+
+def _render_pending(report):
+    """Параллельная отрисовка отложенных графиков"""
+    import matplotlib.pyplot as plt
+    tasks = report['render_tasks']
+    style = {key: plt.rcParams[key] for key in _STYLE_KEYS}
+    workers = min(report['render_workers'], len(tasks))
+
+    print(f"🎨 Отрисовка {len(tasks)} графиков в {workers} процессах...")
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_render_worker, initargs=(style,)) as pool:
+        list(pool.map(_render_task, tasks, [report['dpi']] * len(tasks)))
+
+
+def _write_html(report, title):
+    """Сборка HTML-отчета из журнала и сохраненных графиков"""
+    parts = [
+        '<!DOCTYPE html>',
+        '<html lang="ru"><head><meta charset="utf-8">',
+        f'<title>{html.escape(title)}</title>',
+        '<style>body{font-family:sans-serif;max-width:1200px;margin:auto}'
+        'pre{background:#f6f6f6;padding:8px;white-space:pre-wrap}img{max-width:100%}</style>',
+        '</head><body>',
+        f'<h1>{html.escape(title)}</h1>',
+        f'<p>Сформирован: {datetime.now():%Y-%m-%d %H:%M:%S}</p>',
+    ]
+    if report.get('error'):
+        parts.append(f'<p><b>⚠️ Отчет неполный: выполнение прервано ошибкой {html.escape(report["error"])}</b></p>')
+    for kind, content in report['blocks']:
+        if kind == 'text' and content.strip():
+            parts.append(f'<pre>{html.escape(content)}</pre>')
+        # Отложенные графики, которые не успели отрисовать из-за ошибки, в отчет не попадают
+        elif kind == 'figure' and os.path.exists(os.path.join(report['output_dir'], content)):
+            parts.append(f'<p><img src="{html.escape(content)}" alt="{html.escape(content)}"></p>')
+    parts.append('</body></html>')
+
+    report_path = os.path.join(report['output_dir'], 'report.html')
+    with open(report_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(parts))
+    return report_path
+
+
+@contextlib.contextmanager
+def batch_report(output_dir=None, title='Анализ и прогноз продаж'):
+    """
+    Пакетный (headless) режим: графики рисуются на бэкенде Agg и сохраняются в output_dir,
+    весь вывод print попадает в журнал, а в конце собирается единый HTML или PDF отчет.
+    При REPORT_CONFIG["render_workers"] > 0 графики анализа рисуются параллельно в пуле процессов.
+    Если блок прерван ошибкой, отчет все равно сохраняется и помечается как неполный.
+    После выхода из блока восстанавливается прежний бэкенд matplotlib.
+    Пример:
+        with batch_report('../report'):
+            run_full_analysis()
+    """
+    import matplotlib
+    import matplotlib.pyplot as plt
+    global _active_report
+
+    output_dir = output_dir or REPORT_CONFIG.get("output_dir", "report")
+    os.makedirs(output_dir, exist_ok=True)
+    previous_backend = matplotlib.get_backend()
+    plt.switch_backend('Agg')
+
+    report_format = REPORT_CONFIG.get("report_format", "html")
+    render_workers = REPORT_CONFIG.get("render_workers", 0) or 0
+    pdf = None
+    if report_format == 'pdf':
+        from matplotlib.backends.backend_pdf import PdfPages
+        pdf = PdfPages(os.path.join(output_dir, 'report.pdf'))
+
+    report = {
+        'output_dir': output_dir,
+        'image_format': REPORT_CONFIG.get("image_format", "png"),
+        'dpi': REPORT_CONFIG.get("dpi", 100),
+        'pdf': pdf,
+        # Отложенные графики для пула процессов (для PDF графики рисуются сразу)
+        'render_tasks': [] if render_workers > 0 and pdf is None else None,
+        'render_workers': render_workers,
+        'counter': 0,
+        'blocks': [],
+        'log': [],
+        'error': None,
+    }
+    previous_report, _active_report = _active_report, report
+    stdout = sys.stdout
+    sys.stdout = _Tee(stdout, report['log'])
+    try:
+        yield report
+        if report['render_tasks']:
+            _render_pending(report)
+    except BaseException as e:
+        report['error'] = type(e).__name__
+        raise
+    finally:
+        sys.stdout = stdout
+        _active_report = previous_report
+        plt.close('all')
+        # Интерактивный бэкенд может быть недоступен (нет дисплея) - тогда остается Agg
+        with contextlib.suppress(ImportError):
+            plt.switch_backend(previous_backend)
+
+        if report['error']:
+            report['log'].append(f"\n⚠️ Отчет неполный: выполнение прервано ошибкой {report['error']}\n")
+        report['blocks'].append(('text', ''.join(report['log'])))
+        if pdf is not None:
+            pdf.close()
+            with open(os.path.join(output_dir, 'report_log.txt'), 'w', encoding='utf-8') as f:
+                f.write(''.join(text for kind, text in report['blocks'] if kind == 'text'))
+            print(f"💾 Отчет сохранен: {os.path.join(output_dir, 'report.pdf')}")
+        else:
+            print(f"💾 Отчет сохранен: {_write_html(report, title)}")
@@ -0,0 +1,7 @@
+# Пакетный запуск полного анализа без участия пользователя (например, по cron):
+# графики и текстовый вывод сохраняются в папку REPORT_CONFIG["output_dir"]
+from report import batch_report
+from model_forecast import run_full_analysis
+
+with batch_report():
+    run_full_analysis()
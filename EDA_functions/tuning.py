@@ -0,0 +1,252 @@
+import copy
+import itertools
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from config import DATA_FILE_PATH, PROPHET_CONFIG, PARALLEL_CONFIG, CACHE_CONFIG, BACKTEST_CONFIG, TUNING_CONFIG
+from backtest import METRICS, make_cutoffs, fit_fold
+from model_store import fold_cache_key, load_fold_forecast, save_fold_forecast
+
+
+def _sample_value(space, rng):
+    """Случайное значение параметра: список - выбор из вариантов, (min, max) - лог-равномерно"""
+    if isinstance(space, tuple):
+        low, high = space
+        if low > 0:
+            return float(np.exp(rng.uniform(np.log(low), np.log(high))))
+        return float(rng.uniform(low, high))
+    return space[rng.integers(len(space))]
+
+
+def make_candidates(param_grid, search='grid', n_candidates=20, seed=42):
+    """
+    Кандидаты параметров model_params.
+    search='grid' - все комбинации значений из списков param_grid;
+    search='random' - n_candidates случайных комбинаций (для кортежей (min, max) - лог-равномерно).
+    """
+    names = list(param_grid)
+    if search == 'grid':
+        grid = [list(param_grid[name]) for name in names]
+        return [dict(zip(names, values)) for values in itertools.product(*grid)]
+
+    if search == 'random':
+        rng = np.random.default_rng(seed)
+        candidates, seen = [], set()
+        # Ограничение числа попыток: в небольшом дискретном пространстве уникальных комбинаций может не хватить
+        for _ in range(n_candidates * 20):
+            candidate = {name: _sample_value(param_grid[name], rng) for name in names}
+            marker = json.dumps(candidate, sort_keys=True, default=str)
+            if marker not in seen:
+                seen.add(marker)
+                candidates.append(candidate)
+            if len(candidates) == n_candidates:
+                break
+        return candidates
+
+    raise ValueError(f"Неизвестный тип поиска: '{search}'. Доступны: 'grid', 'random'")
+
+
+def _candidate_config(config, params):
+    """Конфиг кандидата: model_params из config, дополненные параметрами кандидата"""
+    candidate_config = copy.deepcopy(config)
+    candidate_config["model_params"] = {**config.get("model_params", {}), **params}
+    return candidate_config
+
+
+def _rung_sizes(n_folds, reduction_factor):
+    """Число фолдов на каждом этапе отбора: 1, η, η², ... и в конце все фолды"""
+    sizes, size = [], 1
+    while size < n_folds:
+        sizes.append(size)
+        size *= reduction_factor
+    sizes.append(n_folds)
+    return sizes
+
+
+def tune_prophet_params(df_prophet, config=PROPHET_CONFIG, param_grid=None, search=None, n_candidates=None,
+                        metric=None, workers=None, initial=None, horizon=None, step=None, output_file=None,
+                        file_path=DATA_FILE_PATH):
+    """
+    Подбор параметров model_params на фолдах бэктеста (см. TUNING_CONFIG и BACKTEST_CONFIG).
+    Отбор идет этапами (successive halving): сначала все кандидаты проверяются на последнем фолде,
+    дальше проходит лучшая 1/reduction_factor часть, которая проверяется на большем числе фолдов,
+    и так до полного набора фолдов. Плохие кандидаты отсекаются рано и не тратят время на обучение.
+    Все обучения этапа выполняются в пуле из workers процессов; прогнозы фолдов кэшируются,
+    поэтому прерванный подбор продолжается без повторного обучения.
+    Лучшие параметры сохраняются в JSON (TUNING_CONFIG["output_file"]).
+    file_path - файл данных ряда: рядом с ним хранится кэш прогнозов фолдов.
+    Возвращает (лучшие model_params, таблица всех кандидатов) или (None, None).
+    """
+    param_grid = param_grid or TUNING_CONFIG.get("param_grid", {})
+    search = search or TUNING_CONFIG.get("search", 'grid')
+    n_candidates = n_candidates or TUNING_CONFIG.get("n_candidates", 20)
+    metric = metric or TUNING_CONFIG.get("metric", 'mape')
+    reduction_factor = max(int(TUNING_CONFIG.get("reduction_factor", 3)), 2)
+    initial = initial or BACKTEST_CONFIG.get("initial", 180)
+    horizon = horizon or BACKTEST_CONFIG.get("horizon", 30)
+    step = step or BACKTEST_CONFIG.get("step", horizon)
+    if workers is None:
+        workers = PARALLEL_CONFIG.get("forecast_workers", 0) or 0
+    use_cache = CACHE_CONFIG.get("model_cache", False)
+
+    if metric not in METRICS:
+        print(f"❌ Неизвестная метрика: '{metric}'. Доступны: {list(METRICS)}")
+        return None, None
+
+    if df_prophet is None:
+        print("❌ Нет данных для подбора параметров")
+        return None, None
+
+    df_prophet = df_prophet.reset_index(drop=True)
+    # Фолды от последнего к первому: на ранних этапах кандидаты проверяются на самых свежих данных
+    cutoffs = sorted(make_cutoffs(len(df_prophet), initial, horizon, step), reverse=True)
+    if not cutoffs:
+        print(f"❌ Недостаточно данных для подбора: {len(df_prophet)} точек (требуется > {initial + horizon})")
+        return None, None
+
+    candidates = make_candidates(param_grid, search, n_candidates, TUNING_CONFIG.get("seed", 42))
+    if not candidates:
+        print("❌ Нет кандидатов для подбора параметров")
+        return None, None
+
+    rungs = _rung_sizes(len(cutoffs), reduction_factor)
+    print(f"🎛️ Подбор параметров: {len(candidates)} кандидатов ({search}), {len(cutoffs)} фолдов, "
+          f"метрика {metric}, этапы по фолдам: {rungs}")
+
+    configs = [_candidate_config(config, params) for params in candidates]
+    scores = {index: {} for index in range(len(candidates))}  # кандидат → {cutoff: метрика}
+    pruned_at = {}
+    alive = list(range(len(candidates)))
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+    try:
+        for rung, n_folds in enumerate(rungs):
+            jobs = []
+            for index in alive:
+                for cutoff in cutoffs[:n_folds]:
+                    if cutoff in scores[index]:
+                        continue
+                    train = df_prophet.iloc[:cutoff]
+                    test = df_prophet.iloc[cutoff:cutoff + horizon]
+                    cache_key = fold_cache_key(train, test['ds'], configs[index]) if use_cache else None
+                    fold_forecast = load_fold_forecast(cache_key, file_path) if cache_key else None
+                    if fold_forecast is not None:
+                        scores[index][cutoff] = METRICS[metric](fold_forecast['y'].to_numpy(),
+                                                                fold_forecast['yhat'].to_numpy())
+                    else:
+                        jobs.append((index, cutoff, train, test, cache_key))
+
+            cache_keys = {(index, cutoff): cache_key for index, cutoff, _, _, cache_key in jobs}
+            if pool is None:
+                fitted = [fit_fold(index, cutoff, train, test, configs[index])
+                          for index, cutoff, train, test, _ in jobs]
+            else:
+                futures = [pool.submit(fit_fold, index, cutoff, train, test, configs[index])
+                           for index, cutoff, train, test, _ in jobs]
+                fitted = [future.result() for future in as_completed(futures)]
+
+            for index, cutoff, fold_forecast, error in fitted:
+                if error is not None:
+                    # Кандидат с ошибкой обучения (например, недопустимые параметры) выбывает
+                    scores[index][cutoff] = float('inf')
+                    continue
+                if cache_keys[(index, cutoff)]:
+                    save_fold_forecast(cache_keys[(index, cutoff)], fold_forecast, file_path)
+                scores[index][cutoff] = METRICS[metric](fold_forecast['y'].to_numpy(),
+                                                        fold_forecast['yhat'].to_numpy())
+
+            # Отбор: средняя метрика по фолдам этапа, меньше - лучше
+            rung_score = {index: np.nanmean([scores[index][cutoff] for cutoff in cutoffs[:n_folds]])
+                          for index in alive}
+            ranked = sorted(alive, key=lambda index: (not np.isfinite(rung_score[index]), rung_score[index]))
+            if rung < len(rungs) - 1:
+                keep = max(1, math.ceil(len(ranked) / reduction_factor))
+                for index in ranked[keep:]:
+                    pruned_at[index] = rung + 1
+                alive = ranked[:keep]
+            else:
+                alive = ranked
+
+            print(f"   Этап {rung + 1}/{len(rungs)}: {n_folds} фолд(ов), обучено моделей: {len(jobs)}, "
+                  f"лучший {metric}: {rung_score[ranked[0]]:.2f}, дальше проходят: {len(alive)}")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    # Таблица кандидатов
+    rows = []
+    for index, params in enumerate(candidates):
+        evaluated = list(scores[index].values())
+        rows.append({**params,
+                     metric: np.nanmean(evaluated) if evaluated else np.nan,
+                     'folds': len(evaluated),
+                     'pruned_at_rung': pruned_at.get(index)})
+    results = pd.DataFrame(rows).sort_values(['folds', metric], ascending=[False, True], ignore_index=True)
+
+    best_index = alive[0]
+    best_score = np.nanmean(list(scores[best_index].values()))
+    if not np.isfinite(best_score):
+        print("❌ Ни один кандидат не обучился без ошибок")
+        return None, results
+
+    best_params = _candidate_config(config, candidates[best_index])["model_params"]
+    print_tuning_summary(results, best_params, metric, best_score)
+    save_tuned_params(best_params, metric, best_score, len(cutoffs), output_file)
+    return best_params, results
+
+
+def print_tuning_summary(results, best_params, metric, best_score):
+    """Вывод лучших кандидатов и итоговых параметров"""
+    print("\n" + "=" * 60)
+    print("🎛️ РЕЗУЛЬТАТЫ ПОДБОРА ПАРАМЕТРОВ")
+    print("=" * 60)
+    print("🏆 Лучшие кандидаты:")
+    print(results.head(10).round(4).to_string(index=False))
+    print(f"\n✅ Лучшие параметры ({metric} = {best_score:.2f}):")
+    for name, value in best_params.items():
+        print(f"   \"{name}\": {value!r},")
+
+
+def save_tuned_params(model_params, metric, score, n_folds, output_file=None):
+    """
+    Сохранение подобранных model_params в JSON (путь - TUNING_CONFIG["output_file"]).
+    Путь не зависит от пакетного отчета: load_tuned_config читает файл по тому же пути.
+    """
+    path = output_file or TUNING_CONFIG.get("output_file", 'best_prophet_params.json')
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    payload = {
+        "model_params": model_params,
+        "metric": metric,
+        "score": float(score),
+        "folds": n_folds,
+        "tuned_at": datetime.now().isoformat(timespec='seconds'),
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=4, default=str)
+    print(f"💾 Подобранные параметры сохранены: {path}")
+    return path
+
+
+def load_tuned_config(path=None, config=PROPHET_CONFIG):
+    """
+    Конфиг Prophet с подобранными model_params из JSON (см. save_tuned_params).
+    Если файла нет, возвращается исходный конфиг.
+    """
+    path = path or TUNING_CONFIG.get("output_file", 'best_prophet_params.json')
+    if not os.path.exists(path):
+        print(f"⚠️ Файл с подобранными параметрами не найден: {path}")
+        return config
+
+    with open(path, 'r', encoding='utf-8') as f:
+        payload = json.load(f)
+    print(f"✅ Загружены подобранные параметры ({payload.get('metric')} = {payload.get('score', float('nan')):.2f})")
+    return _candidate_config(config, payload.get("model_params", {}))
@@ -0,0 +1,105 @@
+# Время импорта модулей EDA_functions и проверка, что тяжелые библиотеки (Prophet, matplotlib, seaborn, plotly)
+# не загружаются без обучения моделей и построения графиков.
+# Каждый импорт выполняется в отдельном процессе, берется лучшее из --repeat запусков.
+# Код возврата 1, если путь статистики превышает бюджет или модули загружают тяжелые библиотеки при импорте.
+# Запуск: python benchmarks/bench_imports.py --budget 1.0 [--importtime]
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+EDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'EDA_functions')
+
+# Бюджет (секунды) на импорт пути статистики: загрузка, очистка и базовые метрики без прогнозов и графиков
+IMPORT_BUDGET_SECONDS = 1.0
+HEAVY_MODULES = ['prophet', 'cmdstanpy', 'matplotlib', 'seaborn', 'plotly']
+
+# Сценарий: (название, импортируемые модули, проверка)
+# 'budget' - время не больше бюджета и без тяжелых библиотек; 'light' - без тяжелых библиотек; None - только замер
+SCENARIOS = [
+    ("Статистика (read_and_clean, basic_stats)", ['read_and_clean', 'basic_stats'], 'budget'),
+    ("Хранилище прогнозов (forecast_store)", ['forecast_store'], 'budget'),
+    ("Модуль прогнозов без обучения (model_forecast)", ['model_forecast'], 'light'),
+    ("Анализ и бэктест (analyze, backtest, tuning, hierarchy)", ['analyze', 'backtest', 'tuning', 'hierarchy'], 'light'),
+    ("Prophet (для сравнения)", ['prophet'], None),
+]
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'heavy': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(modules, repeat):
+    """Лучшее время импорта modules в новом процессе и список загруженных тяжелых библиотек"""
+    best = None
+    env = {**os.environ, 'PYTHONPATH': EDA_DIR}
+    for _ in range(repeat):
+        completed = subprocess.run([sys.executable, '-c', _PROBE.format(modules=modules, heavy=HEAVY_MODULES)],
+                                   cwd=EDA_DIR, env=env, capture_output=True, text=True)
+        if completed.returncode != 0:
+            return None, completed.stderr.strip().splitlines()[-1:]
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        if best is None or result['seconds'] < best['seconds']:
+            best = result
+    return best['seconds'], best['heavy']
+
+
+def print_importtime(modules, top=15):
+    """Самые медленные модули по данным python -X importtime (накопленное время)"""
+    env = {**os.environ, 'PYTHONPATH': EDA_DIR}
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {', '.join(modules)}"],
+                               cwd=EDA_DIR, env=env, capture_output=True, text=True)
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        rows.append((int(cumulative), name))
+    print(f"\nСамые медленные импорты ({', '.join(modules)}):")
+    for cumulative, name in sorted(rows, reverse=True)[:top]:
+        print(f"   {cumulative / 1e6:>7.3f} с  {name.strip()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк времени импорта')
+    parser.add_argument('--budget', type=float, default=IMPORT_BUDGET_SECONDS, help='бюджет пути статистики, с')
+    parser.add_argument('--repeat', type=int, default=3, help='число запусков каждого импорта')
+    parser.add_argument('--importtime', action='store_true', help='разбивка пути статистики по модулям')
+    args = parser.parse_args()
+
+    print(f"Бюджет импорта: {args.budget:.2f} с")
+    print("=" * 80)
+    failures = []
+    for title, modules, check in SCENARIOS:
+        seconds, heavy = measure_import(modules, args.repeat)
+        if seconds is None:
+            print(f"{title:<58} ошибка импорта: {' '.join(heavy)}")
+            if check:
+                failures.append(f"{title}: ошибка импорта")
+            continue
+
+        print(f"{title:<58} {seconds:>6.3f} с  {', '.join(heavy) or '-'}")
+        if check == 'budget' and seconds > args.budget:
+            failures.append(f"{title}: {seconds:.3f} с > {args.budget:.2f} с")
+        if check and heavy:
+            failures.append(f"{title}: загружены {', '.join(heavy)}")
+
+    if args.importtime:
+        print_importtime(SCENARIOS[0][1])
+
+    if failures:
+        print("\n❌ Бюджет импорта нарушен:")
+        for failure in failures:
+            print(f"   {failure}")
+        sys.exit(1)
+    print("\n✅ Путь статистики укладывается в бюджет, тяжелые библиотеки при импорте не загружаются")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+# Сравнение подготовки ряда для Prophet: прежняя реализация (groupby по метке времени + merge)
+# и текущая (группировка по дням + resample) на синтетических данных.
+# Запуск: python benchmarks/bench_prepare.py --rows 10000000
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'EDA_functions'))
+
+from read_and_clean import prepare_for_prophet
+
+
+def legacy_prepare_for_prophet(df, target_column='Сумма'):
+    """Прежняя реализация prepare_for_prophet (для сравнения)"""
+    daily_data = df.groupby('Дата продажи')[target_column].sum().reset_index()
+    daily_data.columns = ['ds', 'y']
+
+    date_range = pd.date_range(start=daily_data['ds'].min(), end=daily_data['ds'].max(), freq='D')
+    full_range = pd.DataFrame({'ds': date_range})
+    prophet_data = full_range.merge(daily_data, on='ds', how='left')
+    prophet_data['y'] = prophet_data['y'].fillna(0)
+    return prophet_data
+
+
+def make_sales(rows, days=3 * 365, seed=42):
+    """Синтетические продажи с полной меткой времени (как в генераторах из Data/)"""
+    rng = np.random.default_rng(seed)
+    seconds = rng.integers(0, days * 86_400, rows)
+    return pd.DataFrame({
+        'Дата продажи': pd.Timestamp('2022-01-01') + pd.to_timedelta(seconds, unit='s'),
+        'Кол-во': rng.integers(1, 101, rows),
+        'Сумма': rng.uniform(100, 10_000, rows).round(2),
+    })
+
+
+def measure(title, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{title:<45} {time.perf_counter() - start:>8.3f} с")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк prepare_for_prophet')
+    parser.add_argument('--rows', type=int, default=10_000_000, help='число строк')
+    args = parser.parse_args()
+
+    df = make_sales(args.rows)
+    print(f"Строк: {len(df):,}")
+    print("=" * 55)
+
+    measure("Прежняя реализация (groupby + merge)", lambda: legacy_prepare_for_prophet(df))
+    measure("prepare_for_prophet, freq='D'", lambda: prepare_for_prophet(df))
+    measure("prepare_for_prophet, freq='W'", lambda: prepare_for_prophet(df, freq='W'))
+    measure("prepare_for_prophet, ['Сумма', 'Кол-во']", lambda: prepare_for_prophet(df, ['Сумма', 'Кол-во']))
+
+
+if __name__ == '__main__':
+    main()
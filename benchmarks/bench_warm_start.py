@@ -0,0 +1,65 @@
+# Сравнение времени дообучения Prophet с warm start и обучения с нуля
+# на ежедневно растущем ряде (имитация ежедневного запуска).
+# Запуск: python benchmarks/bench_warm_start.py --days 1095 --steps 5
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'EDA_functions'))
+
+from config import PROPHET_CONFIG
+from model_forecast import _fit_prophet
+from model_store import warm_start_params
+
+
+def make_daily_series(days, seed=42):
+    """Синтетический дневной ряд выручки: тренд + недельная и годовая сезонность + шум"""
+    rng = np.random.default_rng(seed)
+    ds = pd.date_range('2022-01-01', periods=days, freq='D')
+    t = np.arange(days)
+    y = (50_000 + 20 * t
+         + 8_000 * np.sin(2 * np.pi * t / 7)
+         + 15_000 * np.sin(2 * np.pi * t / 365.25)
+         + rng.normal(0, 3_000, days))
+    return pd.DataFrame({'ds': ds, 'y': np.clip(y, 0, None)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Warm start против обучения с нуля')
+    parser.add_argument('--days', type=int, default=3 * 365, help='длина истории в днях')
+    parser.add_argument('--steps', type=int, default=5, help='сколько раз дописать по одному дню')
+    args = parser.parse_args()
+
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+    series = make_daily_series(args.days + args.steps)
+
+    model = _fit_prophet(series.iloc[:args.days], PROPHET_CONFIG)
+    cold_times, warm_times = [], []
+
+    for step in range(1, args.steps + 1):
+        history = series.iloc[:args.days + step]
+
+        start = time.perf_counter()
+        _fit_prophet(history, PROPHET_CONFIG)
+        cold_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        model = _fit_prophet(history, PROPHET_CONFIG, init=warm_start_params(model))
+        warm_times.append(time.perf_counter() - start)
+
+    cold, warm = statistics.median(cold_times), statistics.median(warm_times)
+    print("\n" + "=" * 50)
+    print(f"История: {args.days} дней, дописано дней: {args.steps}")
+    print(f"Обучение с нуля (медиана): {cold:.3f} с")
+    print(f"Warm start (медиана):      {warm:.3f} с")
+    print(f"Ускорение: {cold / warm:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
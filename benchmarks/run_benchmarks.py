@@ -0,0 +1,280 @@
+# Набор бенчмарков основных этапов (загрузка, очистка, статистика, агрегаты, подготовка ряда, прогнозы)
+# на синтетических данных разного объема. Каждый замер выполняется в отдельном процессе:
+# время - лучшее из --repeat вызовов, память - пиковый RSS процесса во время вызовов.
+# Результаты сохраняются в JSON и сравниваются с базовой линией; при регрессии код возврата 1.
+# Запуск:
+#   python benchmarks/run_benchmarks.py --scales 10k 1m 10m
+#   python benchmarks/run_benchmarks.py --scales 10k --cases clean_data prepare_for_prophet --save-baseline
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(BENCH_DIR, '..')
+sys.path.insert(0, os.path.join(ROOT_DIR, 'EDA_functions'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'Data'))
+
+SCALES = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+
+# Измерения синтетических данных (с типом клиента и отраслью - для всех разрезов анализа)
+DIMENSIONS = {
+    'clients': [f"Клиент {i}" for i in range(1, 1001)],
+    'regions': [f"Регион {i}" for i in range(1, 21)],
+    'products': [f"Продукт {i}" for i in range(1, 201)],
+    'categories': [f"Категория {i}" for i in range(1, 9)],
+    'client_types': ["Физическое лицо", "Юр.лицо", "ИП", "Гос.предприятие"],
+    'industries': ["IT", "Медицина", "Лёгкая промышленность", "Тяжёлая промышленность", "Образование"],
+}
+
+
+# --- Замеры (выполняются в дочернем процессе) ---
+
+def _disable_caches():
+    """Кэши моделей и хранилище прогнозов отключаются: каждый вызов считает заново"""
+    from config import CACHE_CONFIG, FORECAST_STORE_CONFIG
+
+    CACHE_CONFIG.update({"enabled": False, "model_cache": False, "warm_start": False})
+    FORECAST_STORE_CONFIG["enabled"] = False
+
+
+def _clean(path):
+    from read_and_clean import load_data, clean_data
+    return clean_data(load_data(path, use_cache=False))
+
+
+def _series(path):
+    from read_and_clean import prepare_for_prophet
+    return prepare_for_prophet(_clean(path))
+
+
+def _fast_config():
+    from config import PROPHET_CONFIG
+    return {**PROPHET_CONFIG, "engine": 'fourier'}
+
+
+def _forecast_by_category(df_clean, config=None):
+    """forecast_by_category в пакетном режиме (графики сохраняются во временную папку), без пула процессов"""
+    import tempfile
+    from config import PROPHET_CONFIG
+    from report import batch_report
+    from model_forecast import forecast_by_category
+
+    with tempfile.TemporaryDirectory() as output_dir, batch_report(output_dir):
+        return forecast_by_category(df_clean, config or PROPHET_CONFIG, workers=0)
+
+
+def _case_functions():
+    """Замер: (подготовка входа по пути к данным - не измеряется, измеряемая функция)"""
+    from read_and_clean import load_data, clean_data, prepare_for_prophet
+    from basic_stats import calculate_basic_stats
+    from aggregates import build_aggregate_cube
+    from model_forecast import create_prophet_model
+
+    return {
+        'load_data': (lambda path: path, lambda path: load_data(path, use_cache=False)),
+        'clean_data': (lambda path: load_data(path, use_cache=False), clean_data),
+        'calculate_basic_stats': (_clean, calculate_basic_stats),
+        'calculate_basic_stats_hll': (_clean, lambda df: calculate_basic_stats(df, unique_method='hll')),
+        'aggregate_cube': (_clean, build_aggregate_cube),
+        'prepare_for_prophet': (_clean, prepare_for_prophet),
+        'create_prophet_model': (_series, lambda series: create_prophet_model(series, use_cache=False)),
+        'create_fast_model': (_series, lambda series: create_prophet_model(series, _fast_config(), use_cache=False)),
+        'forecast_by_category': (_clean, _forecast_by_category),
+        'forecast_by_category_fast': (_clean, lambda df: _forecast_by_category(df, _fast_config())),
+    }
+
+
+CASES = ['load_data', 'clean_data', 'calculate_basic_stats', 'calculate_basic_stats_hll', 'aggregate_cube',
+         'prepare_for_prophet', 'create_prophet_model', 'create_fast_model', 'forecast_by_category',
+         'forecast_by_category_fast']
+
+
+def _reset_peak_rss():
+    """Сброс пикового RSS процесса (Linux: /proc/self/clear_refs), чтобы не учитывать подготовку входа"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb():
+    """Пиковый RSS процесса, МБ (VmHWM на Linux, иначе ru_maxrss)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def run_case(case, path, repeat):
+    """Замер одного случая в текущем процессе: время каждого вызова и пиковый RSS"""
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+    _disable_caches()
+    setup, func = _case_functions()[case]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        prepared = setup(path)
+        _reset_peak_rss()
+        seconds = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func(prepared)
+            seconds.append(time.perf_counter() - start)
+            del result
+
+    return {'seconds': min(seconds), 'median': statistics.median(seconds), 'first': seconds[0],
+            'peak_rss_mb': round(_peak_rss_mb(), 1)}
+
+
+# --- Запуск набора (основной процесс) ---
+
+def dataset_path(scale, seed, data_dir):
+    """Синтетический набор данных объема scale (parquet); создается один раз и переиспользуется"""
+    from sales_generator import SalesGenerator, generate_sales
+
+    path = os.path.join(data_dir, f"sales_{scale}_seed{seed}.parquet")
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        print(f"🛠️ Генерация данных {scale} ({SCALES[scale]:,} строк)...")
+        generator = SalesGenerator(DIMENSIONS, seed=seed, days=730, end='2025-12-31')
+        generate_sales(path, SCALES[scale], generator)
+    return path
+
+
+def _environment():
+    """Версии и параметры окружения (результаты разных машин между собой не сравниваются)"""
+    import numpy as np
+    import pandas as pd
+
+    environment = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+    }
+    with contextlib.suppress(ImportError):
+        import prophet
+        environment['prophet'] = prophet.__version__
+    return environment
+
+
+def compare_with_baseline(results, baseline, time_tolerance, memory_tolerance, min_seconds):
+    """
+    Регрессии относительно базовой линии: время больше на time_tolerance (доля) и не меньше чем на min_seconds,
+    или пиковый RSS больше на memory_tolerance. Возвращает список описаний регрессий.
+    """
+    regressions = []
+    print("\n📊 Сравнение с базовой линией:")
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"   {name:<36} нет в базовой линии")
+            continue
+
+        time_ratio = current['seconds'] / base['seconds'] if base['seconds'] else float('inf')
+        memory_ratio = current['peak_rss_mb'] / base['peak_rss_mb'] if base['peak_rss_mb'] else float('inf')
+        slow = time_ratio > 1 + time_tolerance and current['seconds'] - base['seconds'] >= min_seconds
+        heavy = memory_ratio > 1 + memory_tolerance
+        mark = '❌' if slow or heavy else '✅'
+        print(f"   {mark} {name:<34} время x{time_ratio:.2f}, память x{memory_ratio:.2f}")
+        if slow:
+            regressions.append(f"{name}: {base['seconds']:.3f} с → {current['seconds']:.3f} с")
+        if heavy:
+            regressions.append(f"{name}: {base['peak_rss_mb']:.0f} МБ → {current['peak_rss_mb']:.0f} МБ")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарки этапов анализа и прогнозирования')
+    parser.add_argument('--scales', nargs='+', choices=list(SCALES), default=list(SCALES), help='объемы данных')
+    parser.add_argument('--cases', nargs='+', choices=CASES, default=CASES, help='замеры')
+    parser.add_argument('--repeat', type=int, default=3, help='вызовов в каждом замере (берется лучшее время)')
+    parser.add_argument('--seed', type=int, default=42, help='зерно генератора данных')
+    parser.add_argument('--data-dir', default=os.path.join(BENCH_DIR, '.data'), help='папка синтетических данных')
+    parser.add_argument('--output', default=os.path.join(BENCH_DIR, 'benchmark_results.json'), help='файл результатов')
+    parser.add_argument('--baseline', default=os.path.join(BENCH_DIR, 'baseline.json'), help='файл базовой линии')
+    parser.add_argument('--save-baseline', action='store_true', help='сохранить результаты как базовую линию')
+    parser.add_argument('--time-tolerance', type=float, default=0.2, help='допустимое замедление, доля')
+    parser.add_argument('--memory-tolerance', type=float, default=0.2, help='допустимый рост памяти, доля')
+    parser.add_argument('--min-seconds', type=float, default=0.05,
+                        help='замедление меньше этого значения не считается регрессией (шум)')
+    parser.add_argument('--run-case', help=argparse.SUPPRESS)
+    parser.add_argument('--data', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Дочерний процесс: один замер, результат - JSON в stdout
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case, args.data, args.repeat)))
+        return
+
+    results = {}
+    print(f"{'Замер':<38} {'время, с':>10} {'медиана, с':>11} {'RSS, МБ':>9}")
+    print("=" * 72)
+    for scale in args.scales:
+        path = dataset_path(scale, args.seed, args.data_dir)
+        for case in args.cases:
+            name = f"{scale}/{case}"
+            completed = subprocess.run([sys.executable, os.path.abspath(__file__), '--run-case', case,
+                                        '--data', path, '--repeat', str(args.repeat)],
+                                       capture_output=True, text=True, cwd=os.path.join(ROOT_DIR, 'EDA_functions'))
+            if completed.returncode != 0:
+                print(f"{name:<38} ошибка: {(completed.stderr.strip().splitlines() or ['?'])[-1]}")
+                continue
+            results[name] = {**json.loads(completed.stdout.strip().splitlines()[-1]), 'rows': SCALES[scale]}
+            result = results[name]
+            print(f"{name:<38} {result['seconds']:>10.3f} {result['median']:>11.3f} {result['peak_rss_mb']:>9.0f}")
+
+    payload = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'environment': _environment(),
+        'repeat': args.repeat,
+        'seed': args.seed,
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 Результаты сохранены: {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+        print(f"💾 Базовая линия сохранена: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"ℹ️ Базовой линии нет ({args.baseline}): сохраните ее флагом --save-baseline")
+        return
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('environment') != payload['environment']:
+        print("⚠️ Базовая линия снята в другом окружении - сравнение может быть неточным")
+
+    regressions = compare_with_baseline(results, baseline.get('results', {}), args.time_tolerance,
+                                        args.memory_tolerance, args.min_seconds)
+    if regressions:
+        print("\n❌ Регрессии:")
+        for regression in regressions:
+            print(f"   {regression}")
+        sys.exit(1)
+    print("\n✅ Регрессий нет")
+
+
+if __name__ == '__main__':
+    main()